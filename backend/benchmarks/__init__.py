@@ -0,0 +1,4 @@
+"""Benchmark suite: HTTP load scenarios and microbenchmarks.
+
+Run from the backend directory with ``python -m benchmarks.run``.
+"""
@@ -0,0 +1,54 @@
+"""Exporting a project's briefs: one request per brief versus the batch endpoint.
+
+Runs the API against ``fake_destination`` with a per-request latency (and
+optionally a rate limit), so the numbers reflect round trips to the
+provider rather than local work.
+"""
+import time
+
+import httpx
+
+from benchmarks.harness import Recorder, running_server
+from benchmarks.load import new_user, random_brief
+
+QUICK = {"briefs": 30, "latency": 0.05}
+FULL = {"briefs": 200, "latency": 0.2}
+DESTINATIONS = ("asana", "clickup", "sheets")
+
+
+async def run_export(recorder: Recorder, scale: dict, rate_limit: float = 0):
+    fake_env = {"FAKE_DESTINATION_LATENCY_SECONDS": str(scale["latency"]),
+                "FAKE_DESTINATION_RATE_LIMIT": str(rate_limit)}
+    async with running_server(fake_env, app="fake_destination:app", probe_path="/stats") as destination_url, \
+            running_server({"EXPORT_DESTINATION_URL": destination_url}) as base_url, \
+            httpx.AsyncClient(base_url=base_url, timeout=600.0) as client:
+        headers = await new_user(client, "export")
+        brief_ids = []
+        for i in range(scale["briefs"]):
+            response = await client.post("/api/briefs", json=random_brief(i), headers=headers)
+            response.raise_for_status()
+            brief_ids.append(response.json()["id"])
+        items = [{"brief_id": brief_id, "destination": d} for d in DESTINATIONS for brief_id in brief_ids]
+        label = f"export {len(items)} (brief, destination) pairs"
+
+        started = time.perf_counter()
+        for item in items:
+            response = await client.post("/api/export", json=item, headers=headers)
+            recorder.record("POST /export", response.elapsed.total_seconds(), response.status_code)
+        sequential = time.perf_counter() - started
+
+        started = time.perf_counter()
+        response = await client.post("/api/export/batch", json={"items": items}, headers=headers)
+        batch = time.perf_counter() - started
+        recorder.record("POST /export/batch", batch, response.status_code)
+        body = response.json()
+        adapters = (await client.get("/api/health")).json()["export_adapters"]
+        async with httpx.AsyncClient(base_url=destination_url) as destination:
+            provider = (await destination.get("/stats")).json()
+
+    recorder.annotate(f"{label}, one request each", seconds=round(sequential, 3),
+                      items_per_s=round(len(items) / sequential, 1))
+    recorder.annotate(f"{label}, batch", seconds=round(batch, 3), items_per_s=round(len(items) / batch, 1),
+                      exported=body["exported"], failed=body["failed"], speedup=round(sequential / batch, 1),
+                      provider_requests=provider["requests"], throttled=provider["throttled"],
+                      batch_requests=sum(a["requests"] for a in adapters.values()) - len(items))
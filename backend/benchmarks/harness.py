@@ -0,0 +1,215 @@
+"""Shared plumbing: latency recording, a throwaway server, result files."""
+import asyncio
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Lower is better for latencies, higher for throughput
+COMPARED_METRICS = {"p50_ms": -1, "p95_ms": -1, "p99_ms": -1, "throughput_per_s": 1}
+SUMMARY_FIELDS = {"count", "errors", "throughput_per_s", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Recorder:
+    """Latency samples and status counts per named operation."""
+
+    def __init__(self):
+        self._samples: Dict[str, List[float]] = {}
+        self._statuses: Dict[str, Dict[str, int]] = {}
+        self._errors: Dict[str, int] = {}
+        self._windows: Dict[str, List[float]] = {}
+        self._extra: Dict[str, dict] = {}
+
+    def record(self, name: str, seconds: float, status: Optional[int] = None, ok: Optional[bool] = None):
+        now = time.perf_counter()
+        self._samples.setdefault(name, []).append(seconds)
+        window = self._windows.setdefault(name, [now - seconds, now])
+        window[0] = min(window[0], now - seconds)
+        window[1] = max(window[1], now)
+        if status is not None:
+            statuses = self._statuses.setdefault(name, {})
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        if ok is None:
+            ok = status is None or status < 400
+        if not ok:
+            self._errors[name] = self._errors.get(name, 0) + 1
+
+    @contextmanager
+    def time(self, name: str):
+        started = time.perf_counter()
+        yield
+        self.record(name, time.perf_counter() - started)
+
+    def annotate(self, name: str, **extra):
+        self._extra.setdefault(name, {}).update(extra)
+
+    def summary(self) -> Dict[str, dict]:
+        results = {}
+        for name, samples in self._samples.items():
+            ordered = sorted(samples)
+            started, finished = self._windows[name]
+            elapsed = finished - started
+            results[name] = {
+                "count": len(samples),
+                "errors": self._errors.get(name, 0),
+                "throughput_per_s": round(len(samples) / elapsed, 2) if elapsed > 0 else 0.0,
+                "mean_ms": round(sum(samples) / len(samples) * 1000, 4),
+                "p50_ms": round(percentile(ordered, 50) * 1000, 4),
+                "p95_ms": round(percentile(ordered, 95) * 1000, 4),
+                "p99_ms": round(percentile(ordered, 99) * 1000, 4),
+                "max_ms": round(ordered[-1] * 1000, 4),
+                **({"statuses": self._statuses[name]} if name in self._statuses else {}),
+                **self._extra.get(name, {})
+            }
+        for name, extra in self._extra.items():
+            results.setdefault(name, dict(extra))
+        return results
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@asynccontextmanager
+async def running_server(
+    env: Optional[dict] = None,
+    workers: int = 1,
+    startup_timeout: float = 30.0,
+    app: str = "server:app",
+    probe_path: str = "/api/"
+):
+    """Boot ``app`` (the API by default, in mock-DB mode) under uvicorn and yield its base URL."""
+    port = free_port()
+    server_env = {
+        **os.environ,
+        "USE_MOCK_DB": "true",
+        "RESPONSE_CACHE_BACKEND": "memory",
+        "JWT_SECRET": "benchmark-secret",
+        # Every scenario comes from one IP and some from one user: keep the
+        # limiters in the request path but out of the way
+        "RATE_LIMIT_AUTH_PER_MINUTE": "1000000",
+        "RATE_LIMIT_AUTH_BURST": "1000000",
+        "RATE_LIMIT_CHAT_PER_MINUTE": "1000000",
+        "RATE_LIMIT_CHAT_BURST": "1000000",
+        "LLM_DAILY_TOKEN_QUOTA": "1000000000",
+        "LLM_DAILY_COST_QUOTA_USD": "1000000",
+        **(env or {})
+    }
+    command = [
+        sys.executable, "-m", "uvicorn", app,
+        "--host", "127.0.0.1", "--port", str(port),
+        "--log-level", "warning", "--workers", str(workers),
+        # Keep idle client connections (and so their worker) across benchmark phases
+        "--timeout-keep-alive", "120"
+    ]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=server_env)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + startup_timeout
+        async with httpx.AsyncClient(base_url=base_url) as probe:
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f"Server exited with code {process.returncode}")
+                try:
+                    if (await probe.get(probe_path)).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError("Server did not start in time")
+                await asyncio.sleep(0.1)
+        yield base_url
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(results: Dict[str, dict], settings: dict, path: Optional[Path] = None) -> Path:
+    commit = git_commit()
+    if path is None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        path = RESULTS_DIR / f"{stamp}-{commit or 'nogit'}.json"
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    document = {
+        "meta": {
+            "commit": commit,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "settings": settings
+        },
+        "results": results
+    }
+    path.write_text(json.dumps(document, indent=2, sort_keys=True), encoding="utf-8")
+    return path
+
+
+def compare(results: Dict[str, dict], baseline_path: Path, threshold_pct: float) -> List[str]:
+    """Lines describing every compared metric that got worse by more than ``threshold_pct``."""
+    baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))["results"]
+    regressions = []
+    for name, current in sorted(results.items()):
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric, better in COMPARED_METRICS.items():
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            if change * better < -threshold_pct:
+                regressions.append(f"{name} {metric}: {old} -> {new} ({change:+.1f}%)")
+    return regressions
+
+
+def format_table(results: Dict[str, dict]) -> str:
+    header = f"{'benchmark':<56} {'count':>7} {'err':>5} {'ops/s':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}"
+    lines = [header, "-" * len(header)]
+    for name, r in sorted(results.items()):
+        extras = ", ".join(f"{k}={v}" for k, v in sorted(r.items()) if k not in SUMMARY_FIELDS)
+        if "count" not in r:
+            lines.append(f"{name:<56} {extras}")
+            continue
+        lines.append(
+            f"{name:<56} {r['count']:>7} {r['errors']:>5} {r['throughput_per_s']:>10} "
+            f"{r['p50_ms']:>10} {r['p95_ms']:>10} {r['p99_ms']:>10}" + (f"  {extras}" if extras else "")
+        )
+    return "\n".join(lines)
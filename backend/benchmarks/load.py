@@ -0,0 +1,373 @@
+"""HTTP load scenarios against a real uvicorn process in mock-DB mode.
+
+Every scenario gets its own users, so they can run in any order against one
+server. Latencies are measured client-side per endpoint; 304s and the 503s
+that admission control is expected to return are recorded by status.
+"""
+import asyncio
+import random
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+import httpx
+
+from benchmarks.harness import Recorder
+
+QUICK = {
+    "login_users": 10, "login_burst": 100, "login_baseline_seconds": 3, "auth_me_requests": 500,
+    "crud_workers": 10, "crud_iterations": 10, "listing_briefs": 500,
+    "chat_users": 10, "chat_requests": 60, "stream_requests": 20,
+    "conversation_turns": 20, "overload_burst": 150, "search_briefs": 300,
+    "search_queries": 200, "export_jobs": 100, "mixed_users": 20, "mixed_seconds": 10
+}
+FULL = {
+    "login_users": 50, "login_burst": 500, "login_baseline_seconds": 10, "auth_me_requests": 5000,
+    "crud_workers": 50, "crud_iterations": 40, "listing_briefs": 5000,
+    "chat_users": 50, "chat_requests": 500, "stream_requests": 100,
+    "conversation_turns": 120, "overload_burst": 400, "search_briefs": 3000,
+    "search_queries": 1000, "export_jobs": 1000, "mixed_users": 100, "mixed_seconds": 60
+}
+
+VOCABULARY = (
+    "campaign launch newsletter landing page social video budget audience brand awareness "
+    "signup retention onboarding webinar podcast press release partner referral pricing "
+    "holiday spring summer autumn winter product feature roadmap design review copy legal"
+).split()
+
+PASSWORD = "benchmark-pw"
+LARGE_SOURCE = "Slack thread export. " * 250  # ~5KB of source_content per brief
+
+
+async def timed(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    name: str,
+    method: str,
+    url: str,
+    ok_statuses: Optional[Iterable[int]] = None,
+    **kwargs
+) -> Optional[httpx.Response]:
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except httpx.TransportError:
+        recorder.record(name, time.perf_counter() - started, 599)
+        return None
+    status = response.status_code
+    ok = status in ok_statuses if ok_statuses is not None else None
+    recorder.record(name, time.perf_counter() - started, status, ok=ok)
+    return response
+
+
+async def register(client: httpx.AsyncClient, label: str) -> Tuple[str, Dict[str, str]]:
+    email = f"{label}-{uuid.uuid4().hex[:12]}@bench.example.com"
+    response = await client.post("/api/auth/register", json={"email": email, "password": PASSWORD, "name": label})
+    response.raise_for_status()
+    return email, {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def new_user(client: httpx.AsyncClient, label: str) -> Dict[str, str]:
+    return (await register(client, label))[1]
+
+
+async def run_workers(concurrency: int, worker: Callable[[int], Awaitable[None]]):
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+
+
+def random_brief(i: int, source_content: str = "") -> dict:
+    words = random.sample(VOCABULARY, 6)
+    return {
+        "title": f"{words[0].title()} {words[1]} brief {i}",
+        "objective": " ".join(random.choices(VOCABULARY, k=20)),
+        "deliverables": [" ".join(random.choices(VOCABULARY, k=3)) for _ in range(3)],
+        "deadline": "2025-06-30",
+        "open_questions": [f"What is the {words[2]} for {words[3]}?"],
+        "source_content": source_content
+    }
+
+
+# ---- scenarios ----
+
+# Cheap authenticated reads whose latency should not depend on login load
+LOGIN_BURST_PROBES = (
+    ("GET /health", "/api/health"),
+    ("GET /briefs", "/api/briefs"),
+    ("GET /auth/me", "/api/auth/me"),
+)
+
+
+async def probe_until(client, recorder, headers, label: str, stop: asyncio.Event):
+    """Loop over the probe endpoints, recording each as "<endpoint> (<label>)", until ``stop`` is set."""
+    async def probe(name, url):
+        while not stop.is_set():
+            await timed(client, recorder, f"{name} ({label})", "GET", url, params={"limit": 20}, headers=headers)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(probe(name, url) for name, url in LOGIN_BURST_PROBES))
+
+
+async def login_burst(client, recorder, scale):
+    """Concurrent logins next to other traffic.
+
+    bcrypt runs on a bounded pool, so overflow should be a fast 503 and the
+    non-auth probes should keep the p99 they had before the burst (compare
+    "(idle)" with "(login burst)").
+    """
+    emails = [(await register(client, "login"))[0] for _ in range(scale["login_users"])]
+    headers = await new_user(client, "login-probe")
+
+    stop = asyncio.Event()
+    probes = asyncio.create_task(probe_until(client, recorder, headers, "idle", stop))
+    await asyncio.sleep(scale["login_baseline_seconds"])
+    stop.set()
+    await probes
+
+    async def login(i):
+        await timed(client, recorder, "POST /auth/login (burst)", "POST", "/api/auth/login",
+                    ok_statuses=(200, 503), json={"email": emails[i % len(emails)], "password": PASSWORD})
+
+    stop = asyncio.Event()
+    probes = asyncio.create_task(probe_until(client, recorder, headers, "login burst", stop))
+    await asyncio.gather(*(login(i) for i in range(scale["login_burst"])))
+    stop.set()
+    await probes
+
+
+async def principal_round_trips(client, recorder, scale):
+    """GET /auth/me repeatedly with one token: the principal cache path."""
+    headers = await new_user(client, "me")
+    remaining = scale["auth_me_requests"]
+
+    async def worker(_):
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            await timed(client, recorder, "GET /auth/me", "GET", "/api/auth/me", headers=headers)
+
+    await run_workers(20, worker)
+
+
+async def brief_crud(client, recorder, scale):
+    async def worker(i):
+        headers = await new_user(client, f"crud{i}")
+        for n in range(scale["crud_iterations"]):
+            created = await timed(client, recorder, "POST /briefs", "POST", "/api/briefs",
+                                  json=random_brief(n), headers=headers)
+            if created is None or created.status_code != 200:
+                continue
+            brief = created.json()
+            await timed(client, recorder, "GET /briefs/{id}", "GET", f"/api/briefs/{brief['id']}", headers=headers)
+            await timed(client, recorder, "PUT /briefs/{id}", "PUT", f"/api/briefs/{brief['id']}",
+                        json={"objective": "Updated objective"},
+                        headers={**headers, "If-Match": f'"{brief["version"]}"'})
+            await timed(client, recorder, "GET /briefs?limit=20", "GET", "/api/briefs",
+                        params={"limit": 20}, headers=headers)
+            if n % 2:
+                await timed(client, recorder, "DELETE /briefs/{id}", "DELETE", f"/api/briefs/{brief['id']}",
+                            headers=headers)
+
+    await run_workers(scale["crud_workers"], worker)
+
+
+async def large_listing(client, recorder, scale):
+    """Page through many large briefs: full documents, projected fields, and 304 revalidation."""
+    headers = await new_user(client, "listing")
+    count = scale["listing_briefs"]
+    semaphore = asyncio.Semaphore(20)
+
+    async def seed(i):
+        async with semaphore:
+            await client.post("/api/briefs", json=random_brief(i, LARGE_SOURCE), headers=headers)
+
+    await asyncio.gather(*(seed(i) for i in range(count)))
+
+    for label, params in (("full", {}), ("fields", {"fields": "title,status"})):
+        cursor, pages, payload = None, 0, 0
+        while True:
+            page_params = {"limit": 50, **params, **({"cursor": cursor} if cursor else {})}
+            response = await timed(client, recorder, f"GET /briefs page ({label})", "GET", "/api/briefs",
+                                   params=page_params, headers=headers)
+            pages += 1
+            payload += len(response.content)
+            cursor = response.headers.get("x-next-cursor")
+            if not cursor:
+                break
+        recorder.annotate(f"GET /briefs page ({label})", pages=pages, bytes_per_page=payload // pages)
+
+    first = await client.get("/api/briefs", params={"limit": 50}, headers=headers)
+    etag = first.headers.get("etag")
+    for _ in range(100):
+        await timed(client, recorder, "GET /briefs (If-None-Match)", "GET", "/api/briefs", ok_statuses=(304,),
+                    params={"limit": 50}, headers={**headers, "If-None-Match": etag})
+
+
+async def chat(client, recorder, scale):
+    """Unique prompts (LLM calls) and one repeated prompt (response cache hits)."""
+    users = [await new_user(client, f"chat{i}") for i in range(scale["chat_users"])]
+    remaining = scale["chat_requests"]
+
+    async def worker(i):
+        nonlocal remaining
+        headers = users[i]
+        while remaining > 0:
+            remaining -= 1
+            await timed(client, recorder, "POST /chat", "POST", "/api/chat",
+                        json={"message": f"Brief for {uuid.uuid4()}"}, headers=headers)
+            await timed(client, recorder, "POST /chat (cached)", "POST", "/api/chat",
+                        json={"message": "Plan the spring newsletter"}, headers=headers)
+
+    await run_workers(len(users), worker)
+
+
+async def chat_stream_ttfb(client, recorder, scale):
+    """Time to the first SSE token versus time to the final event."""
+    headers = await new_user(client, "stream")
+    for i in range(scale["stream_requests"]):
+        started = time.perf_counter()
+        first_token = None
+        async with client.stream("POST", "/api/chat/stream", json={"message": f"Stream {uuid.uuid4()}"},
+                                 headers=headers) as response:
+            async for line in response.aiter_lines():
+                if first_token is None and line == "event: token":
+                    first_token = time.perf_counter() - started
+                    recorder.record("POST /chat/stream TTFB", first_token)
+        recorder.record("POST /chat/stream total", time.perf_counter() - started, response.status_code)
+
+
+async def conversation_history(client, recorder, scale):
+    """Build one long conversation, then read it: list, summary page, and backwards paging."""
+    headers = await new_user(client, "history")
+    conversation_id = None
+    for i in range(scale["conversation_turns"]):
+        response = await timed(client, recorder, "POST /chat (growing conversation)", "POST", "/api/chat",
+                               json={"message": f"Turn {i}: refine {uuid.uuid4()}", "conversation_id": conversation_id},
+                               headers=headers)
+        conversation_id = response.json()["conversation_id"]
+    for _ in range(50):
+        await timed(client, recorder, "GET /conversations", "GET", "/api/conversations", headers=headers)
+        response = await timed(client, recorder, "GET /conversations/{id}", "GET",
+                               f"/api/conversations/{conversation_id}", params={"limit": 20}, headers=headers)
+        recorder.annotate("GET /conversations/{id}", bytes=len(response.content))
+        cursor = response.json().get("next_cursor")
+        while cursor:
+            page = await timed(client, recorder, "GET /conversations/{id}/messages", "GET",
+                               f"/api/conversations/{conversation_id}/messages",
+                               params={"before": cursor, "limit": 20}, headers=headers)
+            cursor = page.json().get("next_cursor")
+
+
+async def llm_overload(client, recorder, scale):
+    """A burst of chats from distinct users beyond LLM concurrency plus queue capacity."""
+    users = [await new_user(client, f"overload{i}") for i in range(scale["overload_burst"])]
+
+    async def send(headers):
+        started = time.perf_counter()
+        try:
+            response = await client.post("/api/chat", json={"message": f"Overload {uuid.uuid4()}"}, headers=headers)
+        except httpx.TransportError:
+            recorder.record("POST /chat (overload, error)", time.perf_counter() - started, 599)
+            return
+        status = response.status_code
+        name = {200: "admitted", 503: "shed"}.get(status, "error")
+        recorder.record(f"POST /chat (overload, {name})", time.perf_counter() - started, status, ok=name != "error")
+
+    await asyncio.gather(*(send(headers) for headers in users))
+
+
+async def search(client, recorder, scale):
+    headers = await new_user(client, "search")
+    semaphore = asyncio.Semaphore(20)
+
+    async def seed(i):
+        async with semaphore:
+            await client.post("/api/briefs", json=random_brief(i), headers=headers)
+
+    await asyncio.gather(*(seed(i) for i in range(scale["search_briefs"])))
+    for _ in range(scale["search_queries"]):
+        query = " ".join(random.sample(VOCABULARY, 2))
+        await timed(client, recorder, "GET /search", "GET", "/api/search",
+                    params={"q": query, "type": "briefs"}, headers=headers)
+
+
+async def export_jobs(client, recorder, scale):
+    """Queue exports, then poll until the job queue drains; reports jobs/s end to end."""
+    headers = await new_user(client, "jobs")
+    brief = (await client.post("/api/briefs", json=random_brief(0), headers=headers)).json()
+    started = time.perf_counter()
+    job_ids = []
+    for _ in range(scale["export_jobs"]):
+        response = await timed(client, recorder, "POST /export/jobs", "POST", "/api/export/jobs",
+                               json={"brief_id": brief["id"], "destination": "asana"}, headers=headers)
+        job_ids.append(response.json()["id"])
+    pending = set(job_ids)
+    while pending:
+        for job_id in list(pending):
+            job = (await client.get(f"/api/jobs/{job_id}", headers=headers)).json()
+            if job["status"] in ("succeeded", "failed"):
+                pending.discard(job_id)
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    recorder.annotate("export jobs drained", jobs=len(job_ids), seconds=round(elapsed, 3),
+                      jobs_per_s=round(len(job_ids) / elapsed, 2))
+
+
+async def mixed(client, recorder, scale):
+    """Virtual users picking weighted actions for a fixed time."""
+    deadline = time.perf_counter() + scale["mixed_seconds"]
+
+    async def user(i):
+        headers = await new_user(client, f"mixed{i}")
+        briefs = []
+        for n in range(5):
+            created = await client.post("/api/briefs", json=random_brief(n), headers=headers)
+            briefs.append(created.json())
+        actions = [
+            (30, lambda: timed(client, recorder, "mixed GET /briefs", "GET", "/api/briefs",
+                               params={"limit": 20}, headers=headers)),
+            (20, lambda: timed(client, recorder, "mixed GET /briefs/{id}", "GET",
+                               f"/api/briefs/{random.choice(briefs)['id']}", headers=headers)),
+            (10, lambda: timed(client, recorder, "mixed PUT /briefs/{id}", "PUT",
+                               f"/api/briefs/{random.choice(briefs)['id']}", json={"deadline": "2025-12-31"},
+                               headers=headers)),
+            (10, lambda: timed(client, recorder, "mixed POST /briefs", "POST", "/api/briefs",
+                               json=random_brief(0), headers=headers)),
+            (10, lambda: timed(client, recorder, "mixed POST /chat", "POST", "/api/chat", ok_statuses=(200, 503),
+                               json={"message": random.choice(VOCABULARY) + " brief"}, headers=headers)),
+            (10, lambda: timed(client, recorder, "mixed GET /conversations", "GET", "/api/conversations",
+                               headers=headers)),
+            (5, lambda: timed(client, recorder, "mixed GET /search", "GET", "/api/search",
+                              params={"q": random.choice(VOCABULARY)}, headers=headers)),
+            (5, lambda: timed(client, recorder, "mixed GET /auth/me", "GET", "/api/auth/me", headers=headers)),
+        ]
+        weights = [w for w, _ in actions]
+        while time.perf_counter() < deadline:
+            _, action = random.choices(actions, weights=weights)[0]
+            await action()
+
+    await run_workers(scale["mixed_users"], user)
+
+
+SCENARIOS = {
+    "login_burst": login_burst,
+    "principal_round_trips": principal_round_trips,
+    "brief_crud": brief_crud,
+    "large_listing": large_listing,
+    "chat": chat,
+    "chat_stream_ttfb": chat_stream_ttfb,
+    "conversation_history": conversation_history,
+    "llm_overload": llm_overload,
+    "search": search,
+    "export_jobs": export_jobs,
+    "mixed": mixed,
+}
+
+
+async def run_load(base_url: str, recorder: Recorder, scale: dict, names: Iterable[str]):
+    limits = httpx.Limits(max_connections=1000, max_keepalive_connections=200)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120.0) as client:
+        for name in names:
+            print(f"  load: {name}", flush=True)
+            started = time.perf_counter()
+            await SCENARIOS[name](client, recorder, scale)
+            recorder.annotate(f"scenario {name}", seconds=round(time.perf_counter() - started, 3))
@@ -0,0 +1,379 @@
+"""In-process microbenchmarks for the hot helpers behind the API."""
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+import uuid
+import zlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List
+
+from benchmarks.harness import Recorder
+from blob_store import BlobStore
+from benchmarks.load import VOCABULARY
+from brief_dedup import best_match, fingerprint, jaccard, shingles
+from brief_parser import BriefParser, parse_briefs
+from context_builder import ContextBuilder, estimate_tokens
+from emergentintegrations.llm.chat import DUMMY_RESPONSE
+from fast_json import DocumentShaper, json_response
+from job_queue import CollectionJobStore, JobQueue, MemoryJobStore
+from message_store import append_messages, read_messages
+from metrics import Histogram
+from mock_db import MockDB, _sort_docs, matches
+from rate_limit import RateLimit, RateLimiter, UsageMeter
+from response_cache import cache_key
+from shared_state import MemorySharedState, SqliteSharedState
+
+QUICK = {"iterations": 2000, "docs": 20000, "users": 200, "text_docs": 20000,
+         "conversation_lengths": (10, 100, 500), "jobs": 2000, "briefs_per_user": 2000}
+FULL = {"iterations": 20000, "docs": 100000, "users": 1000, "text_docs": 100000,
+        "conversation_lengths": (10, 100, 1000, 5000), "jobs": 20000, "briefs_per_user": 10000}
+
+
+def bench(recorder: Recorder, name: str, fn, iterations: int):
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        recorder.record(name, time.perf_counter() - started)
+
+
+async def abench(recorder: Recorder, name: str, fn, iterations: int):
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await fn()
+        recorder.record(name, time.perf_counter() - started)
+
+
+class LinearCollection:
+    """The pre-index mock: every query scans and sorts the whole list."""
+
+    def __init__(self, docs):
+        self.docs = list(docs)
+
+    def find(self, query, sort=None, limit=0):
+        found = [d for d in self.docs if matches(d, query)]
+        if sort:
+            found = _sort_docs(found, sort)
+        return found[:limit] if limit else found
+
+    def find_one(self, query):
+        return next((d for d in self.docs if matches(d, query)), None)
+
+
+def brief_docs(count: int, users: int):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for i in range(count):
+        yield {
+            "id": str(uuid.uuid4()),
+            "user_id": f"user-{i % users}",
+            "title": " ".join(random.choices(VOCABULARY, k=4)),
+            "objective": " ".join(random.choices(VOCABULARY, k=20)),
+            "deliverables": [" ".join(random.choices(VOCABULARY, k=3)) for _ in range(3)],
+            "open_questions": [],
+            "status": "draft",
+            "updated_at": (start + timedelta(seconds=i)).isoformat(),
+        }
+
+
+def parser(recorder: Recorder, scale: dict):
+    iterations = scale["iterations"]
+    bench(recorder, "parse_briefs (1 brief)", lambda: parse_briefs(DUMMY_RESPONSE), iterations)
+    many = "\n\n".join([DUMMY_RESPONSE] * 5)
+    bench(recorder, "parse_briefs (5 briefs)", lambda: parse_briefs(many), iterations)
+    words = [w + " " for w in DUMMY_RESPONSE.split(" ")]
+
+    def stream():
+        p = BriefParser()
+        for word in words:
+            p.feed(word)
+        p.close()
+
+    bench(recorder, "BriefParser streamed word by word", stream, iterations)
+
+
+async def mock_collection(recorder: Recorder, scale: dict):
+    docs = list(brief_docs(scale["docs"], scale["users"]))
+    db = MockDB()
+    await db.briefs.create_index([("user_id", 1), ("updated_at", -1), ("id", -1)], name="user_updated_id")
+    await db.briefs.create_index([("id", 1), ("user_id", 1)], name="id_user", unique=True)
+    started = time.perf_counter()
+    await db.briefs.insert_many([dict(d) for d in docs])
+    recorder.annotate("mock insert_many", docs=len(docs), seconds=round(time.perf_counter() - started, 3))
+    linear = LinearCollection(docs)
+    sort = [("updated_at", -1), ("id", -1)]
+    users = [f"user-{random.randrange(scale['users'])}" for _ in range(200)]
+    ids = [random.choice(docs)["id"] for _ in range(200)]
+    n = scale["docs"]
+
+    async def indexed_listing():
+        await db.briefs.find({"user_id": random.choice(users)}, {"_id": 0}).sort(sort).to_list(50)
+
+    async def indexed_get():
+        await db.briefs.find_one({"id": random.choice(ids), "user_id": {"$exists": True}})
+
+    await abench(recorder, f"mock find user sorted limit 50 ({n} docs, indexed)", indexed_listing, 500)
+    bench(recorder, f"mock find user sorted limit 50 ({n} docs, linear)",
+          lambda: linear.find({"user_id": random.choice(users)}, sort, 50), 20)
+    await abench(recorder, f"mock find_one by id ({n} docs, indexed)", indexed_get, 500)
+    bench(recorder, f"mock find_one by id ({n} docs, linear)", lambda: linear.find_one({"id": random.choice(ids)}), 20)
+
+    async def insert_one():
+        await db.briefs.insert_one(next(brief_docs(1, scale["users"])))
+
+    await abench(recorder, "mock insert_one (indexed)", insert_one, 500)
+
+
+async def text_index(recorder: Recorder, scale: dict):
+    db = MockDB()
+    await db.briefs.create_index([("user_id", 1), ("title", "text"), ("objective", "text")],
+                                 name="user_text", weights={"title": 10, "objective": 5})
+    started = time.perf_counter()
+    await db.briefs.insert_many(list(brief_docs(scale["text_docs"], 10)))
+    recorder.annotate("text index build", docs=scale["text_docs"], seconds=round(time.perf_counter() - started, 3))
+
+    async def query():
+        terms = " ".join(random.sample(VOCABULARY, 2))
+        await db.briefs.find(
+            {"user_id": "user-1", "$text": {"$search": terms}},
+            {"_id": 0, "id": 1, "score": {"$meta": "textScore"}}
+        ).sort([("score", {"$meta": "textScore"})]).limit(20).to_list(None)
+
+    await abench(recorder, f"mock $text search ({scale['text_docs']} docs)", query, 200)
+
+
+async def conversations(recorder: Recorder, scale: dict):
+    """Context building and history reads as a conversation grows."""
+    for length in scale["conversation_lengths"]:
+        db = MockDB()
+        await db.conversations.create_index([("id", 1)], name="id_unique", unique=True)
+        await db.messages.create_index([("conversation_id", 1), ("user_id", 1), ("bucket", 1)],
+                                       name="conversation_user_bucket", unique=True)
+        await db.legacy.create_index([("id", 1)], name="id_unique", unique=True)
+        conversation_id, user_id = str(uuid.uuid4()), "user"
+        await db.conversations.insert_one({"id": conversation_id, "user_id": user_id, "message_count": 0})
+        messages = []
+        for i in range(length):
+            role = "user" if i % 2 == 0 else "assistant"
+            content = f"Turn {i}: " + " ".join(random.choices(VOCABULARY, k=30)) if role == "user" else DUMMY_RESPONSE
+            messages.append({"role": role, "content": content, "timestamp": datetime.now(timezone.utc).isoformat()})
+        for i in range(0, length, 2):
+            await append_messages(db, conversation_id, user_id, messages[i:i + 2])
+
+        builder = ContextBuilder(db, "system prompt " * 200)
+        started = time.perf_counter()
+        context = await builder.build(conversation_id, user_id, "add a deadline to that brief")
+        recorder.annotate(f"context build cold ({length} msgs)", ms=round((time.perf_counter() - started) * 1000, 3))
+        await abench(recorder, f"context build warm ({length} msgs)",
+                     lambda: builder.build(conversation_id, user_id, "add a deadline to that brief"), 100)
+        replay_tokens = builder.system_tokens + sum(estimate_tokens(m["content"]) + 4 for m in messages)
+        recorder.annotate(f"context build warm ({length} msgs)", prompt_tokens=context.tokens,
+                          full_replay_tokens=replay_tokens, turns=context.turns)
+
+        await abench(recorder, f"read_messages newest 50 ({length} msgs, bucketed)",
+                     lambda: read_messages(db, conversation_id, user_id, limit=50), 100)
+        page, _ = await read_messages(db, conversation_id, user_id, limit=50)
+        embedded = {"id": conversation_id, "user_id": user_id, "messages": messages}
+        await db.legacy.insert_one(embedded)
+        await abench(recorder, f"find_one conversation ({length} msgs, embedded)",
+                     lambda: db.legacy.find_one({"id": conversation_id}, {"_id": 0}), 100)
+        recorder.annotate(f"read_messages newest 50 ({length} msgs, bucketed)", bytes=len(json.dumps(page)))
+        recorder.annotate(f"find_one conversation ({length} msgs, embedded)", bytes=len(json.dumps(messages)))
+
+
+async def serialization(recorder: Recorder, scale: dict):
+    """100 stored briefs to response bytes: the FastAPI model path versus the fast path."""
+    os.environ.setdefault("USE_MOCK_DB", "true")
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+    from server import BriefListItem
+
+    docs = [{**doc, "deadline": "", "owners": [], "assets": [], "source_type": "manual",
+             "source_content": "Slack thread export. " * 50, "created_at": doc["updated_at"], "version": 1}
+            for doc in brief_docs(100, 1)]
+    # What response_model=List[BriefListItem] does: validate the returned models, then dump them as JSON
+    adapter = TypeAdapter(List[BriefListItem])
+    shaper = DocumentShaper(BriefListItem, exclude_unset=True)
+    iterations = max(scale["iterations"] // 10, 100)
+
+    def model_path():
+        briefs = adapter.validate_python([BriefListItem(**d) for d in docs])
+        JSONResponse(adapter.dump_python(briefs, mode="json", exclude_unset=True)).body
+
+    def fast_path():
+        json_response(shaper.shape_many(docs)).body
+
+    bench(recorder, "serialize 100 briefs (response_model)", model_path, iterations)
+    bench(recorder, "serialize 100 briefs (orjson fast path)", fast_path, iterations)
+
+
+def email_thread(target_bytes: int) -> str:
+    """A pasted email thread: headers, replies quoting the previous message, signatures."""
+    people = ["ana", "ben", "chloe", "dev", "eli", "farah"]
+    messages, previous = [], []
+    start = datetime(2024, 3, 1, 9, tzinfo=timezone.utc)
+    while sum(len(m) for m in messages) < target_bytes:
+        sender = random.choice(people)
+        words = random.choices(VOCABULARY, k=random.randint(40, 160))
+        lines = [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)]
+        sent = start + timedelta(minutes=37 * len(messages))
+        messages.append(
+            f"From: {sender.title()} <{sender}@example.com>\n"
+            f"Date: {sent:%a, %d %b %Y %H:%M}\n"
+            f"Subject: Re: spring launch plan\n\n"
+            + "\n".join(lines)
+            + "\n\n" + "\n".join("> " + line for line in previous)
+            + f"\n\n--\n{sender.title()} | Marketing | +1 555 01{len(messages) % 100:02d}\n"
+        )
+        previous = lines
+    return "\n".join(messages)[:target_bytes]
+
+
+async def large_text(recorder: Recorder, scale: dict):
+    """Stored and transferred size of large pasted sources, inline versus blob + preview."""
+    iterations = max(scale["iterations"] // 20, 50)
+    for size in (8 * 1024, 64 * 1024, 512 * 1024):
+        text = email_thread(size)
+        raw = text.encode("utf-8")
+        stored = zlib.compress(raw, 6)
+        label = f"{size // 1024}KB email thread"
+        bench(recorder, f"zlib compress {label}", lambda: zlib.compress(raw, 6), iterations)
+        bench(recorder, f"zlib decompress {label}", lambda: zlib.decompress(stored), iterations)
+        recorder.annotate(f"zlib compress {label}", raw_bytes=len(raw), stored_bytes=len(stored),
+                          ratio=round(len(stored) / len(raw), 3))
+
+    count, size = 50, 64 * 1024
+    blobs = MockDB().blobs
+    await blobs.create_index([("id", 1)], name="id_unique", unique=True)
+    store = BlobStore(blobs, threshold=4096, preview_chars=500)
+    inline, previews = [], []
+    for doc in brief_docs(count, 1):
+        text = email_thread(size)
+        inline.append({**doc, "source_content": text})
+        previews.append({**doc, **await store.store(doc["user_id"], text)})
+    inline_body = json_response(inline).body
+    preview_body = json_response([{k: v for k, v in d.items() if k != "source_content_blob"} for d in previews]).body
+    name = f"brief listing body ({count} briefs x {size // 1024}KB source)"
+    bench(recorder, f"gzip level 5 {name}, inline", lambda: zlib.compress(inline_body, 5), 20)
+    bench(recorder, f"gzip level 5 {name}, preview", lambda: zlib.compress(preview_body, 5), iterations)
+    recorder.annotate(name, inline_bytes=len(inline_body), preview_bytes=len(preview_body),
+                      inline_gzip_bytes=len(zlib.compress(inline_body, 5)),
+                      preview_gzip_bytes=len(zlib.compress(preview_body, 5)),
+                      blob_bytes=store.bytes_out)
+
+
+def hashing_and_metrics(recorder: Recorder, scale: dict):
+    message = " ".join(random.choices(VOCABULARY, k=800))
+    bench(recorder, "response cache_key (5KB message)", lambda: cache_key("system", "openai/model", message),
+          scale["iterations"])
+    histogram = Histogram("bench_seconds", "benchmark", ("route",))
+    bench(recorder, "metrics histogram observe", lambda: histogram.observe(0.01, "/api/briefs"), scale["iterations"])
+
+
+async def limits(recorder: Recorder, scale: dict):
+    """Per-request cost of the rate limiter and the usage quota."""
+    iterations = max(scale["iterations"] // 4, 500)
+    sqlite_path = Path(tempfile.mkdtemp(prefix="brieflyai-bench-")) / "shared_state.sqlite3"
+    for label, state in (("memory", MemorySharedState()), ("sqlite", SqliteSharedState(sqlite_path))):
+        limiter = RateLimiter(state, {"chat": RateLimit(per_minute=1e9, burst=1e9)})
+        users = [f"user-{i}" for i in range(100)]
+        await abench(recorder, f"rate limit hit ({label})", lambda: limiter.hit("chat", random.choice(users)), iterations)
+        await state.close()
+    meter = UsageMeter(MockDB().llm_usage, daily_tokens=10 ** 9, daily_cost=10 ** 6,
+                       input_cost_per_1k=0.00125, output_cost_per_1k=0.01)
+    await meter.collection.create_index([("user_id", 1), ("day", 1)], name="user_day", unique=True)
+    users = [f"user-{i}" for i in range(100)]
+    await abench(recorder, "usage quota record (mock db)", lambda: meter.record(random.choice(users), 400, 150), iterations)
+    await abench(recorder, "usage quota check (mock db)", lambda: meter.check(random.choice(users)), iterations)
+
+
+async def dedup(recorder: Recorder, scale: dict):
+    """Revision lookup for one user's chat draft, via LSH bands and by scoring every brief."""
+    count = scale["briefs_per_user"]
+    docs = list(brief_docs(count, 1))
+    for doc in docs:
+        doc["dedup_bands"] = fingerprint(doc)
+    db = MockDB()
+    await db.briefs.create_index([("dedup_bands", 1), ("user_id", 1)], name="dedup_bands_user")
+    await db.briefs.insert_many([dict(d) for d in docs])
+    # Drafts are revisions of existing briefs: one deliverable added
+    drafts = [dict(d, deliverables=d["deliverables"] + ["one more deliverable"]) for d in random.sample(docs, 50)]
+    bench(recorder, "brief fingerprint (shingles + minhash)", lambda: fingerprint(random.choice(drafts)),
+          scale["iterations"] // 4)
+
+    found = []
+
+    async def lsh_lookup():
+        draft = random.choice(drafts)
+        candidates = await db.briefs.find(
+            {"dedup_bands": {"$in": fingerprint(draft)}, "user_id": "user-0"}, {"_id": 0}
+        ).to_list(50)
+        found.append(best_match(draft, candidates, "conversation", 0.5, 0.5) is not None)
+
+    def linear_lookup():
+        draft_shingles = shingles(random.choice(drafts))
+        max(jaccard(draft_shingles, shingles(doc)) for doc in docs)
+
+    await abench(recorder, f"brief revision lookup ({count} briefs, LSH bands)", lsh_lookup, 500)
+    bench(recorder, f"brief revision lookup ({count} briefs, score all)", linear_lookup, 5)
+    recorder.annotate(f"brief revision lookup ({count} briefs, LSH bands)", recall=round(sum(found) / len(found), 3))
+
+
+async def job_queues(recorder: Recorder, scale: dict):
+    async def noop(job):
+        return None
+
+    async def slow(job):
+        await asyncio.sleep(0.01)
+
+    async def memory_store():
+        return MemoryJobStore()
+
+    async def collection_store():
+        jobs = MockDB().jobs
+        await jobs.create_index([("id", 1)], name="id_unique", unique=True)
+        await jobs.create_index([("status", 1), ("started_at", 1)], name="status_started")
+        return CollectionJobStore(jobs)
+
+    for label, store_factory in (("memory", memory_store), ("collection", collection_store)):
+        for handler_name, handler, concurrency, jobs in (
+            ("no-op", noop, 4, scale["jobs"]),
+            ("10ms", slow, 4, 400),
+            ("10ms", slow, 32, 400),
+        ):
+            queue = JobQueue(await store_factory(), concurrency=concurrency)
+            queue.register("bench", handler)
+            await queue.start()
+            started = time.perf_counter()
+            for _ in range(jobs):
+                await queue.enqueue("bench", {}, "user")
+            await queue.join()
+            elapsed = time.perf_counter() - started
+            await queue.stop()
+            recorder.annotate(f"job queue {label} {handler_name} x{concurrency}", jobs=jobs,
+                              jobs_per_s=round(jobs / elapsed, 1))
+
+
+async def run_micro(recorder: Recorder, scale: dict):
+    print("  micro: parser", flush=True)
+    parser(recorder, scale)
+    print("  micro: mock collection", flush=True)
+    await mock_collection(recorder, scale)
+    print("  micro: text index", flush=True)
+    await text_index(recorder, scale)
+    print("  micro: conversations", flush=True)
+    await conversations(recorder, scale)
+    print("  micro: serialization", flush=True)
+    await serialization(recorder, scale)
+    print("  micro: large text", flush=True)
+    await large_text(recorder, scale)
+    print("  micro: hashing and metrics", flush=True)
+    hashing_and_metrics(recorder, scale)
+    print("  micro: rate limits and quotas", flush=True)
+    await limits(recorder, scale)
+    print("  micro: brief dedup", flush=True)
+    await dedup(recorder, scale)
+    print("  micro: job queue", flush=True)
+    await job_queues(recorder, scale)
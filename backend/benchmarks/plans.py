@@ -0,0 +1,182 @@
+"""Query plans for the server's hot queries against the indexes it declares.
+
+Provisions a scratch database with ``server.ensure_indexes``, seeds a few
+users' worth of documents and asks for the winning plan of every query
+shape below, on the in-memory mock and, given a MongoDB URL, on a real
+server. A shape that scans its collection or runs on another index than
+INDEXES declares for it is reported, so a query that drifts away from its
+index shows up here before it shows up as latency.
+"""
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from benchmarks.harness import Recorder
+from mock_db import MockDB
+
+QUICK = {"users": 5, "briefs_per_user": 40, "iterations": 200}
+FULL = {"users": 50, "briefs_per_user": 400, "iterations": 2000}
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+LISTING_SORT = [("updated_at", -1), ("id", -1)]
+
+# (label, collection, query, sort, index INDEXES declares for it); ids refer to the seeded documents of user u1
+QUERY_SHAPES = [
+    ("login by email", "users", {"email": "u1@example.com"}, None, "email_unique"),
+    ("current user", "users", {"id": "u1"}, None, "id_unique"),
+    ("brief listing", "briefs", {"user_id": "u1"}, LISTING_SORT, "user_updated_id"),
+    ("brief listing next page", "briefs", {"user_id": "u1", "$or": [
+        {"updated_at": {"$lt": "2025-01-01T00:20:00+00:00"}},
+        {"updated_at": "2025-01-01T00:20:00+00:00", "id": {"$lt": "b1-20"}}
+    ]}, LISTING_SORT, "user_updated_id"),
+    ("brief by id", "briefs", {"id": "b1-3", "user_id": "u1"}, None, "id_user"),
+    ("briefs for export", "briefs", {"id": {"$in": ["b1-1", "b1-2"]}, "user_id": "u1"}, None, "id_user"),
+    ("briefs in a conversation", "briefs", {"conversation_id": "c1-1", "user_id": "u1"}, None, "conversation_user"),
+    ("dedup candidates", "briefs", {"dedup_bands": {"$in": ["band-1-3-0", "band-1-3-1"]}, "user_id": "u1"}, None,
+     "dedup_bands_user"),
+    ("brief blob references", "briefs", {"source_content_blob": "blob-1-4", "user_id": "u1"}, None,
+     "source_content_blob"),
+    ("brief search", "briefs", {"user_id": "u1", "$text": {"$search": "launch"}}, None, "user_text"),
+    ("brief versions", "brief_versions", {"brief_id": "b1-1", "user_id": "u1"}, [("version", -1)], "brief_version"),
+    ("blobs by id", "blobs", {"id": {"$in": ["blob-1-0", "blob-1-4"]}, "user_id": "u1"}, None, "id_unique"),
+    ("conversation list", "conversations", {"user_id": "u1"}, [("created_at", -1)], "user_created"),
+    ("conversation by id", "conversations", {"id": "c1-1", "user_id": "u1"}, None, "id_unique"),
+    ("message page", "messages", {"conversation_id": "c1-1", "user_id": "u1"}, [("bucket", -1)],
+     "conversation_user_bucket"),
+    ("older message page", "messages", {"conversation_id": "c1-1", "user_id": "u1", "bucket": {"$lte": 0}},
+     [("bucket", -1)], "conversation_user_bucket"),
+    ("message search", "messages", {"user_id": "u1", "$text": {"$search": "launch"}}, None, "user_text"),
+    ("ingest job", "ingest_jobs", {"id": "ingest-1-0", "user_id": "u1"}, None, "id_user"),
+    ("job by id", "jobs", {"id": "job-1-0", "user_id": "u1"}, None, "id_unique"),
+    ("job claim", "jobs", {"id": "job-1-0", "status": "queued"}, None, "id_unique"),
+    ("job list", "jobs", {"user_id": "u1"}, [("created_at", -1)], "user_created"),
+    ("job by idempotency key", "jobs", {"user_id": "u1", "idempotency_key": "key-1"}, None, "user_idempotency_key"),
+    ("stale job claims", "jobs", {"status": "running", "started_at": {"$lt": "2025-01-01T00:01:00+00:00"}}, None,
+     "status_started"),
+    ("queued jobs", "jobs", {"status": "queued"}, None, "status_started"),
+    ("daily usage", "llm_usage", {"user_id": "u1", "day": "2025-01-02"}, None, "user_day"),
+]
+
+
+def at(minutes: int) -> str:
+    return (START + timedelta(minutes=minutes)).isoformat()
+
+
+def seed_docs(users: int, briefs_per_user: int) -> dict:
+    """Documents per collection, shaped like the ones the server writes."""
+    docs = {name: [] for name in (
+        "users", "briefs", "brief_versions", "blobs", "conversations", "messages", "ingest_jobs", "jobs", "llm_usage"
+    )}
+    for u in range(users):
+        user_id = f"u{u}"
+        docs["users"].append({"id": user_id, "email": f"{user_id}@example.com", "created_at": at(0)})
+        for i in range(briefs_per_user):
+            blob = f"blob-{u}-{i}" if i % 4 == 0 else None
+            docs["briefs"].append({
+                "id": f"b{u}-{i}", "user_id": user_id, "conversation_id": f"c{u}-{i // 2}",
+                "title": f"Launch plan {i}", "objective": "Ship the spring launch", "deliverables": ["Deck"],
+                "open_questions": [], "status": "draft", "version": 1, "updated_at": at(i),
+                "dedup_bands": [f"band-{u}-{i}-{k}" for k in range(2)], "source_content_blob": blob
+            })
+            if blob:
+                docs["blobs"].append({"id": blob, "user_id": user_id, "data": b""})
+        for i in range(min(briefs_per_user, 5)):
+            docs["brief_versions"] += [
+                {"brief_id": f"b{u}-{i}", "user_id": user_id, "version": v, "title": f"Launch plan {i}"}
+                for v in range(1, 4)
+            ]
+        for c in range(briefs_per_user // 2):
+            conversation_id = f"c{u}-{c}"
+            docs["conversations"].append({"id": conversation_id, "user_id": user_id, "created_at": at(c)})
+            docs["messages"] += [
+                {"conversation_id": conversation_id, "user_id": user_id, "bucket": b,
+                 "messages": [{"seq": b, "role": "user", "content": "launch plan notes"}]}
+                for b in range(2)
+            ]
+        for k in range(10):
+            docs["ingest_jobs"].append({"id": f"ingest-{u}-{k}", "user_id": user_id, "status": "completed"})
+            docs["jobs"].append({
+                "id": f"job-{u}-{k}", "user_id": user_id, "type": "chat",
+                "status": ["queued", "running"][k] if k < 2 else "succeeded",
+                "idempotency_key": f"key-{k}", "created_at": at(k), "started_at": at(k)
+            })
+            docs["llm_usage"].append({"user_id": user_id, "day": f"2025-01-{k + 1:02d}", "tokens": 100})
+    return docs
+
+
+async def provision(db, scale: dict):
+    os.environ.setdefault("USE_MOCK_DB", "true")
+    from server import ensure_indexes
+
+    await ensure_indexes(db)
+    for name, docs in seed_docs(scale["users"], scale["briefs_per_user"]).items():
+        if docs:
+            await db[name].insert_many(docs)
+
+
+def find(db, collection: str, query: dict, sort: Optional[list]):
+    cursor = db[collection].find(query, {"_id": 0})
+    return cursor.sort(sort) if sort else cursor
+
+
+def plan_indexes(explain: dict) -> List[str]:
+    """Names of the indexes a winning plan reads; empty for a collection scan."""
+    names = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            if "indexName" in node:
+                names.append(node["indexName"])
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(explain["queryPlanner"]["winningPlan"])
+    return list(dict.fromkeys(names))
+
+
+async def check_plans(db) -> List[dict]:
+    """The index each query shape ran on in a provisioned database, and whether it is the declared one."""
+    results = []
+    for label, collection, query, sort, expected in QUERY_SHAPES:
+        used = plan_indexes(await find(db, collection, query, sort).explain())
+        results.append({"label": label, "collection": collection, "expected": expected, "used": used,
+                        "ok": used == [expected]})
+    return results
+
+
+async def run_plans(recorder: Recorder, scale: dict, mongo_url: Optional[str] = None) -> List[str]:
+    """Time every query shape and return a line for each one off its declared index."""
+    targets = [("mock", MockDB(), None)]
+    if mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        client = AsyncIOMotorClient(mongo_url)
+        targets.append(("mongo", client[f"brieflyai_plans_{uuid.uuid4().hex[:8]}"], client))
+
+    mismatches = []
+    for target, db, client in targets:
+        try:
+            await provision(db, scale)
+            shapes = {shape[0]: shape for shape in QUERY_SHAPES}
+            for result in await check_plans(db):
+                _, collection, query, sort, _ = shapes[result["label"]]
+                name = f"plan {target}: {result['label']}"
+                for _ in range(scale["iterations"]):
+                    started = time.perf_counter()
+                    await find(db, collection, query, sort).to_list(50)
+                    recorder.record(name, time.perf_counter() - started, ok=result["ok"])
+                used = ",".join(result["used"]) or "COLLSCAN"
+                recorder.annotate(name, index=used, expected=result["expected"])
+                if not result["ok"]:
+                    mismatches.append(f"{target} {result['collection']} {result['label']}: "
+                                      f"ran on {used}, declared {result['expected']}")
+        finally:
+            if client is not None:
+                await client.drop_database(db.name)
+                client.close()
+    return mismatches
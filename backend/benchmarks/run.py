@@ -0,0 +1,97 @@
+"""Run the benchmark suite, save the results and compare against a baseline.
+
+    python -m benchmarks.run --quick
+    python -m benchmarks.run --suite load --scenario chat --scenario search
+    python -m benchmarks.run --suite scaling --max-workers 4
+    python -m benchmarks.run --suite export --export-rate-limit 20
+    python -m benchmarks.run --suite plans --mongo-url mongodb://localhost:27017
+    python -m benchmarks.run --baseline benchmarks/results/<earlier>.json --fail-on-regression
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+from benchmarks import export, load, micro, plans, scaling
+from benchmarks.harness import Recorder, compare, format_table, running_server, save_results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Briefly AI benchmarks")
+    parser.add_argument("--suite", choices=("micro", "plans", "load", "scaling", "export", "all"), default="all")
+    parser.add_argument("--quick", action="store_true", help="Smaller sizes for a fast smoke run")
+    parser.add_argument("--scenario", action="append", choices=sorted(load.SCENARIOS),
+                        help="Load scenario to run (repeatable); default is all of them")
+    parser.add_argument("--llm-latency", type=float, default=0.2,
+                        help="Stub LLM latency in seconds for the load server")
+    parser.add_argument("--workers", type=int, default=1, help="Uvicorn workers for the load server")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1,
+                        help="Largest worker count for the scaling suite (runs 1, 2, 4, ... up to it)")
+    parser.add_argument("--export-rate-limit", type=float, default=0,
+                        help="Requests per second the fake destination accepts in the export suite (0 = unlimited)")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL"),
+                        help="MongoDB to check query plans against in the plans suite, besides the mock")
+    parser.add_argument("--save", metavar="PATH", help="Results file (default benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--baseline", metavar="PATH", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    return parser.parse_args(argv)
+
+
+async def main(args) -> int:
+    recorder = Recorder()
+    settings = {"suite": args.suite, "quick": args.quick, "llm_latency": args.llm_latency, "workers": args.workers}
+
+    if args.suite in ("micro", "all"):
+        print("Running microbenchmarks", flush=True)
+        await micro.run_micro(recorder, micro.QUICK if args.quick else micro.FULL)
+
+    plan_mismatches = []
+    if args.suite in ("plans", "all"):
+        print("Checking query plans", flush=True)
+        plan_mismatches = await plans.run_plans(recorder, plans.QUICK if args.quick else plans.FULL, args.mongo_url)
+
+    if args.suite in ("load", "all"):
+        names = args.scenario or list(load.SCENARIOS)
+        settings["scenarios"] = names
+        env = {"LLM_STUB_LATENCY_SECONDS": str(args.llm_latency)}
+        print(f"Starting server ({args.workers} worker(s))", flush=True)
+        async with running_server(env, workers=args.workers) as base_url:
+            await load.run_load(base_url, recorder, load.QUICK if args.quick else load.FULL, names)
+
+    if args.suite == "scaling":
+        settings["max_workers"] = args.max_workers
+        print("Running worker scaling", flush=True)
+        await scaling.run_scaling(recorder, scaling.QUICK if args.quick else scaling.FULL, args.max_workers)
+
+    if args.suite == "export":
+        settings["export_rate_limit"] = args.export_rate_limit
+        print("Running batch export", flush=True)
+        await export.run_export(recorder, export.QUICK if args.quick else export.FULL, args.export_rate_limit)
+
+    results = recorder.summary()
+    print()
+    print(format_table(results))
+    path = save_results(results, settings, args.save)
+    print(f"\nSaved {path}")
+
+    if plan_mismatches:
+        print("\nQueries that do not run on their declared index:")
+        for line in plan_mismatches:
+            print(f"  {line}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressions over {args.threshold}% against {args.baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            if args.fail_on_regression:
+                return 1
+        else:
+            print(f"\nNo regressions over {args.threshold}% against {args.baseline}")
+    return 1 if plan_mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,85 @@
+"""Request throughput as uvicorn workers are added.
+
+Each virtual user keeps one keep-alive connection, and the kernel hands a
+connection to a single worker, so a user's writes and reads land on the same
+process even though the mock database lives in each worker. Shared state
+uses the SQLite backend, as a multi-worker deployment would.
+"""
+import asyncio
+import os
+import random
+import tempfile
+import time
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import List
+
+import httpx
+
+from benchmarks.harness import Recorder, running_server
+from benchmarks.load import new_user, random_brief, timed
+
+QUICK = {"virtual_users": 20, "seconds": 10, "briefs_per_user": 5}
+FULL = {"virtual_users": 100, "seconds": 30, "briefs_per_user": 20}
+
+
+def worker_counts(max_workers: int) -> List[int]:
+    counts, workers = [], 1
+    while workers < max_workers:
+        counts.append(workers)
+        workers *= 2
+    return counts + [max_workers]
+
+
+async def seed_user(client: httpx.AsyncClient, label: str, scale: dict):
+    headers = await new_user(client, label)
+    brief_ids = []
+    for i in range(scale["briefs_per_user"]):
+        response = await client.post("/api/briefs", json=random_brief(i), headers=headers)
+        response.raise_for_status()
+        brief_ids.append(response.json()["id"])
+    return headers, brief_ids
+
+
+async def drive_user(client: httpx.AsyncClient, recorder: Recorder, label: str, headers: dict,
+                     brief_ids: List[str], deadline: float):
+    while time.perf_counter() < deadline:
+        roll = random.random()
+        if roll < 0.5:
+            await timed(client, recorder, f"{label} GET /briefs", "GET", "/api/briefs?limit=20", headers=headers)
+        elif roll < 0.8:
+            await timed(client, recorder, f"{label} GET /briefs/{{id}}", "GET",
+                        f"/api/briefs/{random.choice(brief_ids)}", headers=headers)
+        else:
+            await timed(client, recorder, f"{label} GET /auth/me", "GET", "/api/auth/me", headers=headers)
+
+
+async def run_scaling(recorder: Recorder, scale: dict, max_workers: int):
+    baseline = None
+    limits = httpx.Limits(max_connections=1, max_keepalive_connections=1)
+    for workers in worker_counts(max_workers):
+        print(f"  scaling: {workers} worker(s)", flush=True)
+        label = f"scaling x{workers}"
+        state_path = Path(tempfile.mkdtemp(prefix="brieflyai-bench-")) / "shared_state.sqlite3"
+        env = {"WEB_CONCURRENCY": str(workers), "SHARED_STATE_BACKEND": "sqlite", "SHARED_STATE_PATH": str(state_path)}
+        async with running_server(env, workers=workers) as base_url, AsyncExitStack() as stack:
+            clients = [
+                await stack.enter_async_context(httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0))
+                for _ in range(scale["virtual_users"])
+            ]
+            # Register and seed every user before the clock starts
+            seeds = await asyncio.gather(*(seed_user(client, f"scale{workers}", scale) for client in clients))
+            deadline = time.perf_counter() + scale["seconds"]
+            await asyncio.gather(*(
+                drive_user(client, recorder, label, headers, brief_ids, deadline)
+                for client, (headers, brief_ids) in zip(clients, seeds)
+            ))
+
+        results = [r for name, r in recorder.summary().items() if name.startswith(f"{label} GET")]
+        requests = sum(r["count"] for r in results)
+        errors = sum(r["errors"] for r in results)
+        throughput = requests / scale["seconds"]
+        baseline = baseline or throughput
+        recorder.annotate(f"{label} total", workers=workers, requests=requests, errors=errors,
+                          requests_per_s=round(throughput, 1), speedup=round(throughput / baseline, 2),
+                          cpu_count=os.cpu_count())
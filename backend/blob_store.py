@@ -0,0 +1,127 @@
+"""Large text fields kept out of the documents that are read in bulk.
+
+Pasted email threads and Slack exports end up in ``briefs.source_content``
+(once per brief generated from them, and again in every version snapshot),
+and every brief listing used to carry them. Text of at least ``threshold``
+UTF-8 bytes is now stored once in a ``blobs`` collection, zlib-compressed,
+and the document keeps a short preview::
+
+    {"source_content": "<first preview_chars characters>",
+     "source_content_blob": "<blob id>", "source_content_truncated": true}
+
+Blobs are content-addressed per user (``sha256(user_id, text)``), so the same
+paste shared by several briefs and their versions is stored once, and a
+write is an idempotent upsert. Reads that need the full text call ``load``
+or ``load_many``; listings never touch the blob collection.
+"""
+import hashlib
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+ENCODING = "zlib"
+
+
+def blob_id(user_id: str, text: str) -> str:
+    digest = hashlib.sha256(user_id.encode("utf-8") + b"\0" + text.encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+class BlobStore:
+    def __init__(self, collection, threshold: int, preview_chars: int, level: int = 6):
+        self.collection = collection
+        self.threshold = threshold
+        self.preview_chars = preview_chars
+        self.level = level
+        self.stored = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.loaded = 0
+        self.missing = 0
+
+    async def store(self, user_id: str, text: str, field: str = "source_content") -> dict:
+        """Fields to write for ``field``: the text inline, or a preview and a blob reference."""
+        raw = (text or "").encode("utf-8")
+        if not self.threshold or len(raw) < self.threshold:
+            return {field: text or "", f"{field}_blob": None, f"{field}_truncated": False}
+        key = blob_id(user_id, text)
+        data = zlib.compress(raw, self.level)
+        try:
+            await self.collection.update_one(
+                {"id": key},
+                {"$setOnInsert": {
+                    "user_id": user_id,
+                    "encoding": ENCODING,
+                    "size": len(raw),
+                    "stored_size": len(data),
+                    "data": data,
+                    "created_at": datetime.now(timezone.utc).isoformat()
+                }},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            pass  # stored concurrently with the same content
+        self.stored += 1
+        self.bytes_in += len(raw)
+        self.bytes_out += len(data)
+        return {field: text[:self.preview_chars], f"{field}_blob": key, f"{field}_truncated": True}
+
+    async def get_many(self, ids: List[str], user_id: str) -> Dict[str, str]:
+        blobs = await self.collection.find(
+            {"id": {"$in": list(set(ids))}, "user_id": user_id},
+            {"_id": 0, "id": 1, "data": 1}
+        ).to_list(None)
+        return {blob["id"]: zlib.decompress(blob["data"]).decode("utf-8") for blob in blobs}
+
+    async def load_many(self, docs: List[dict], user_id: str, field: str = "source_content") -> List[dict]:
+        """Replace previews in ``docs`` with the full text, in one query.
+
+        A blob that has gone missing leaves the preview in place with
+        ``<field>_truncated`` still set.
+        """
+        ids = [doc[f"{field}_blob"] for doc in docs if doc.get(f"{field}_blob")]
+        if not ids:
+            return docs
+        texts = await self.get_many(ids, user_id)
+        for doc in docs:
+            key = doc.get(f"{field}_blob")
+            if not key:
+                continue
+            if key in texts:
+                doc[field] = texts[key]
+                doc[f"{field}_truncated"] = False
+                self.loaded += 1
+            else:
+                self.missing += 1
+        return docs
+
+    async def load(self, doc: Optional[dict], user_id: str, field: str = "source_content") -> Optional[dict]:
+        if doc is not None:
+            await self.load_many([doc], user_id, field)
+        return doc
+
+    async def delete_unreferenced(self, ids: List[str], user_id: str, referencing: list, field: str = "source_content"):
+        """Delete blobs in ``ids`` that no document in the ``referencing`` collections points to."""
+        for key in set(ids):
+            if key is None:
+                continue
+            still_used = False
+            for collection in referencing:
+                if await collection.find_one({f"{field}_blob": key, "user_id": user_id}, {"_id": 0, "user_id": 1}):
+                    still_used = True
+                    break
+            if not still_used:
+                await self.collection.delete_one({"id": key, "user_id": user_id})
+
+    def stats(self) -> dict:
+        return {
+            "threshold_bytes": self.threshold,
+            "stored": self.stored,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else None,
+            "loaded": self.loaded,
+            "missing": self.missing
+        }
@@ -0,0 +1,127 @@
+"""Near-duplicate detection for briefs generated from chat.
+
+Iterating on a brief in a conversation produces a fresh ``## Brief:`` block
+on every reply. To revise the existing brief instead of inserting a copy,
+each draft is reduced to a set of word shingles (every run of
+``SHINGLE_SIZE`` consecutive words across its fields) and compared with
+Jaccard similarity.
+
+Candidates are the briefs already linked to the conversation and, when
+cross-conversation matching is enabled, any brief sharing a
+locality-sensitive hash band with the draft. Stored briefs
+carry their MinHash signature folded into ``BANDS`` bands of ``ROWS`` rows
+(``dedup_bands``); two briefs with similarity ``s`` share at least one band
+with probability ``1 - (1 - s**ROWS)**BANDS`` - about 99% at 0.7 and under
+3% at 0.2 - so an indexed ``$in`` on the draft's bands returns a handful of
+briefs however many the user owns, and only those are scored exactly.
+Cross-conversation matching ships disabled (``BRIEF_DEDUP_CROSS_THRESHOLD``
+is 0): a brief with the same title in another conversation is more often
+a separate piece of work than a copy. Bands are still written on every
+brief, so enabling it needs no backfill.
+
+Hashes use blake2b and fixed permutations, so bands computed by any process
+or release agree with the ones already stored.
+"""
+import hashlib
+import random
+import re
+from typing import Iterable, List, Optional, Set, Tuple
+
+from brief_parser import DEFAULT_TITLE
+
+DEDUP_FIELDS = ("title", "objective", "deliverables", "deadline", "owners", "assets", "open_questions")
+
+SHINGLE_SIZE = 3
+BANDS = 16
+ROWS = 4
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_PRIME = (1 << 61) - 1
+_rng = random.Random(0xB41EF)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(BANDS * ROWS)]
+
+
+def _hash64(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def brief_words(brief: dict) -> List[str]:
+    words = []
+    for field in DEDUP_FIELDS:
+        value = brief.get(field)
+        if field == "title" and value == DEFAULT_TITLE:
+            continue
+        for part in value if isinstance(value, list) else [value]:
+            if part:
+                words.extend(_WORD.findall(str(part).lower()))
+    return words
+
+
+def shingles(brief: dict) -> Set[int]:
+    words = brief_words(brief)
+    if len(words) < SHINGLE_SIZE:
+        return {_hash64(" ".join(words))} if words else set()
+    return {_hash64(" ".join(words[i:i + SHINGLE_SIZE])) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash(shingle_set: Set[int]) -> List[int]:
+    return [min((a * h + b) % _PRIME for h in shingle_set) for a, b in _PERMUTATIONS]
+
+
+def band_keys(signature: List[int]) -> List[str]:
+    """``"<band>:<digest>"`` per band; equal keys mean the band's rows all agree."""
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(",".join(map(str, rows)).encode("ascii"), digest_size=6).hexdigest()
+        keys.append(f"{band}:{digest}")
+    return keys
+
+
+def fingerprint(brief: dict) -> List[str]:
+    """LSH band keys for a brief; empty if it has no text to compare."""
+    shingle_set = shingles(brief)
+    return band_keys(minhash(shingle_set)) if shingle_set else []
+
+
+def jaccard(a: Set[int], b: Set[int]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def same_title(a: dict, b: dict) -> bool:
+    title = (a.get("title") or "").strip().lower()
+    return bool(title) and title != DEFAULT_TITLE.lower() and title == (b.get("title") or "").strip().lower()
+
+
+def best_match(
+    draft: dict,
+    candidates: Iterable[dict],
+    conversation_id: str,
+    threshold: float,
+    cross_threshold: float = 0
+) -> Optional[Tuple[dict, float]]:
+    """The candidate ``draft`` most plausibly revises, with its similarity.
+
+    A brief from the same conversation needs ``threshold`` similarity, or
+    the same (non-default) title. One from elsewhere is only considered when
+    ``cross_threshold`` is set: it needs that similarity, which should be
+    high enough to mean a copy, the same title, and must not be exported.
+    """
+    draft_shingles = shingles(draft)
+    best, best_score = None, 0.0
+    for candidate in candidates:
+        score = jaccard(draft_shingles, shingles(candidate))
+        if candidate.get("conversation_id") == conversation_id:
+            accepted = score >= threshold or same_title(draft, candidate)
+        else:
+            accepted = (
+                bool(cross_threshold)
+                and score >= cross_threshold
+                and same_title(draft, candidate)
+                and candidate.get("status") != "exported"
+            )
+        if accepted and (best is None or score > best_score):
+            best, best_score = candidate, score
+    return (best, best_score) if best is not None else None
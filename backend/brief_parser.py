@@ -0,0 +1,158 @@
+"""Incremental parser that extracts briefs from LLM output as it streams.
+
+The model is prompted to format briefs as::
+
+    ## Brief: [Title]
+    **Objective:** [Clear objective]
+    **Deliverables:**
+    - [Item 1]
+    **Deadline:** [Date]
+    **Owners:** [Names]
+    **Assets:** [Links]
+    **Open Questions:**
+    - [Question 1]
+
+``BriefParser`` is a line-oriented state machine: text can be fed in chunks
+of any size, each field is emitted as soon as its section closes, and every
+``## Brief:`` heading starts a new brief, so replies containing several
+briefs yield several drafts instead of collapsing into one.
+"""
+from typing import List, Optional, Tuple
+
+DEFAULT_TITLE = "Generated Brief"
+BRIEF_HEADING = "## Brief:"
+
+# Sections whose value sits on the header line
+SCALAR_SECTIONS = {
+    "**Objective:**": "objective",
+    "**Deadline:**": "deadline",
+}
+
+# Sections followed by "- " bullet lines; inline text becomes the first item
+LIST_SECTIONS = {
+    "**Deliverables:**": "deliverables",
+    "**Owners:**": "owners",
+    "**Assets:**": "assets",
+    "**Open Questions:**": "open_questions",
+}
+
+# (event, brief index, field name, value); event is "field" or "brief"
+BriefEvent = Tuple[str, int, Optional[str], object]
+
+
+def new_draft(title: str = DEFAULT_TITLE) -> dict:
+    return {
+        "title": title,
+        "objective": "",
+        "deliverables": [],
+        "deadline": "",
+        "owners": [],
+        "assets": [],
+        "open_questions": [],
+    }
+
+
+def contains_brief(text: str) -> bool:
+    return BRIEF_HEADING in text or "**Objective:**" in text
+
+
+class BriefParser:
+    """Feed text chunks in, get brief fields out as their sections close.
+
+    ``feed`` and ``close`` return the events produced by that call:
+    ``("field", index, name, value)`` when a section of brief ``index`` is
+    complete and ``("brief", index, None, draft)`` when the whole brief is.
+    ``drafts`` holds every brief seen so far, including the one in progress.
+    """
+
+    def __init__(self):
+        self.drafts: List[dict] = []
+        self._pending: List[str] = []
+        self._section: Optional[str] = None
+        self._open = False
+
+    def feed(self, chunk: str) -> List[BriefEvent]:
+        self._pending.append(chunk)
+        if "\n" not in chunk:
+            return []
+        lines = "".join(self._pending).split("\n")
+        self._pending = [lines.pop()]
+        events = []
+        for line in lines:
+            self._feed_line(line, events)
+        return events
+
+    def close(self) -> List[BriefEvent]:
+        events = []
+        tail = "".join(self._pending)
+        self._pending = []
+        if tail:
+            self._feed_line(tail, events)
+        self._close_brief(events)
+        return events
+
+    # ---- state machine ----
+
+    def _current(self) -> dict:
+        return self.drafts[-1]
+
+    def _start_brief(self, title: str, events: List[BriefEvent]):
+        self._close_brief(events)
+        self.drafts.append(new_draft(title or DEFAULT_TITLE))
+        self._open = True
+        events.append(("field", len(self.drafts) - 1, "title", self._current()["title"]))
+
+    def _close_section(self, events: List[BriefEvent]):
+        if self._section is not None:
+            events.append(("field", len(self.drafts) - 1, self._section, self._current()[self._section]))
+            self._section = None
+
+    def _close_brief(self, events: List[BriefEvent]):
+        if not self._open:
+            return
+        self._close_section(events)
+        self._open = False
+        events.append(("brief", len(self.drafts) - 1, None, self._current()))
+
+    def _feed_line(self, line: str, events: List[BriefEvent]):
+        line = line.strip()
+        if not line:
+            return
+        if line.startswith(BRIEF_HEADING):
+            self._start_brief(line[len(BRIEF_HEADING):].strip(), events)
+            return
+        if line.startswith("**"):
+            end = line.find(":**", 2)
+            if end != -1:
+                header = line[:end + 3]
+                field = SCALAR_SECTIONS.get(header) or LIST_SECTIONS.get(header)
+                if field is not None:
+                    self._start_section(header, field, line[end + 3:].strip(), events)
+                    return
+        if line.startswith("- ") and self._section is not None:
+            item = line[2:].strip()
+            if item:
+                self._current()[self._section].append(item)
+
+    def _start_section(self, header: str, field: str, text: str, events: List[BriefEvent]):
+        if not self._open:
+            self._start_brief(DEFAULT_TITLE, events)
+        self._close_section(events)
+        index = len(self.drafts) - 1
+        if header in SCALAR_SECTIONS:
+            self._current()[field] = text
+            events.append(("field", index, field, text))
+            return
+        if text:
+            self._current()[field].append(text)
+        self._section = field
+
+
+def parse_briefs(text: str) -> List[dict]:
+    """Parse a complete reply into brief drafts (empty if it has none)."""
+    if not contains_brief(text):
+        return []
+    parser = BriefParser()
+    parser.feed(text)
+    parser.close()
+    return parser.drafts
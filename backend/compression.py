@@ -0,0 +1,98 @@
+"""gzip response compression negotiated from ``Accept-Encoding``.
+
+Starlette's ``GZipMiddleware`` looks for ``gzip`` as a substring, so a
+client sending ``gzip;q=0`` still gets gzip, and it holds streamed chunks in
+the gzip buffer, which would delay Server-Sent Events until enough text
+piled up. This middleware honours q-values (including ``*``), passes through
+event streams and responses that already carry a ``Content-Encoding``, and
+only compresses bodies of at least ``minimum_size`` bytes. Streamed bodies
+are compressed chunk by chunk.
+"""
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, *params = part.strip().split(";")
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding.strip():
+            qualities[coding.strip().lower()] = quality
+    return qualities.get("gzip", qualities.get("*", 0.0)) > 0
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        level: int = 5,
+        excluded_media_types: tuple = ("text/event-stream",)
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+        self.excluded_media_types = excluded_media_types
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not accepts_gzip(Headers(scope=scope).get("accept-encoding", "")):
+            await self.app(scope, receive, send)
+            return
+
+        start: Message = {}
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(raw=start["headers"])
+                if (
+                    (len(body) < self.minimum_size and not more_body)
+                    or "content-encoding" in headers
+                    or headers.get("content-type", "").startswith(self.excluded_media_types)
+                ):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = zlib.compressobj(self.level, zlib.DEFLATED, GZIP_WBITS)
+                headers["Content-Encoding"] = "gzip"
+                headers.add_vary_header("Accept-Encoding")
+                data = compressor.compress(body)
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    data += compressor.flush()
+                    headers["Content-Length"] = str(len(data))
+                await send(start)
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+                return
+
+            data = compressor.compress(body)
+            if not more_body:
+                data += compressor.flush()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
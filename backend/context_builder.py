@@ -0,0 +1,184 @@
+"""Token-budgeted prompt context for multi-turn chat.
+
+Replaying a whole conversation makes every call cost more than the last.
+``ContextBuilder`` instead sends:
+
+* a rolling summary of the turns that no longer fit, and
+* the newest turns, newest first, until ``token_budget`` or ``max_turns``
+  is reached,
+
+ahead of the current message. The system prompt and the current message
+count against the same budget.
+
+Token counts are estimated from the text length (about four characters per
+token), which is close enough for budgeting and costs nothing to compute.
+The summary is extractive, so building it needs no extra LLM call. It is
+stored on the conversation as ``context_summary = {"text", "through_seq"}``
+and only the turns that have dropped out of the window since the last
+build are added to it.
+"""
+import time
+from typing import List, NamedTuple, Optional
+
+from brief_parser import parse_briefs
+from message_store import read_messages
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+TURN_SUMMARY_CHARS = 200
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def message_tokens(message: dict) -> int:
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+def summarize_turn(message: dict) -> str:
+    """One summary line for a message; briefs are reduced to their key fields."""
+    if message["role"] == "assistant":
+        drafts = parse_briefs(message["content"])
+        if drafts:
+            parts = []
+            for draft in drafts:
+                details = [f"objective: {draft['objective'].rstrip('.')}" if draft.get("objective") else None,
+                           f"deadline: {draft['deadline']}" if draft.get("deadline") else None]
+                details = "; ".join(d for d in details if d)
+                parts.append(f"\"{draft.get('title') or 'Untitled'}\"" + (f" ({details})" if details else ""))
+            return _clip("Assistant drafted brief " + ", ".join(parts), TURN_SUMMARY_CHARS * 2)
+        return "Assistant: " + _clip(message["content"], TURN_SUMMARY_CHARS)
+    return "User: " + _clip(message["content"], TURN_SUMMARY_CHARS)
+
+
+def extend_summary(summary: str, messages: List[dict], max_tokens: int) -> str:
+    """Append summary lines for ``messages``, dropping the oldest lines past ``max_tokens``."""
+    lines = [line for line in summary.split("\n") if line] + [summarize_turn(m) for m in messages]
+    total = sum(estimate_tokens(line) + 1 for line in lines)
+    while lines and total > max_tokens:
+        total -= estimate_tokens(lines.pop(0)) + 1
+    return "\n".join(lines)
+
+
+def _format_turn(message: dict) -> str:
+    return f"{'User' if message['role'] == 'user' else 'Assistant'}: {message['content']}"
+
+
+class ConversationContext(NamedTuple):
+    prompt: str
+    tokens: int
+    turns: int
+    summary: str
+
+
+class ContextBuilder:
+    def __init__(
+        self,
+        db,
+        system_prompt: str,
+        token_budget: int = 4000,
+        max_turns: int = 20,
+        summary_tokens: int = 500,
+        summary_backfill: int = 200
+    ):
+        self.db = db
+        self.system_tokens = estimate_tokens(system_prompt) + MESSAGE_OVERHEAD_TOKENS
+        self.token_budget = token_budget
+        self.max_turns = max_turns
+        self.summary_tokens = summary_tokens
+        self.summary_backfill = summary_backfill
+        self.builds = 0
+        self.summary_updates = 0
+        self.total_tokens = 0
+        self.total_build_seconds = 0.0
+
+    async def build(self, conversation_id: Optional[str], user_id: str, message: str) -> ConversationContext:
+        """Prompt for ``message`` in the context of an existing conversation.
+
+        A new or empty conversation gets the bare message, so its prompt (and
+        response cache key) matches a one-off chat.
+        """
+        started = time.perf_counter()
+        context = await self._build(conversation_id, user_id, message)
+        self.builds += 1
+        self.total_tokens += context.tokens
+        self.total_build_seconds += time.perf_counter() - started
+        return context
+
+    async def _build(self, conversation_id: Optional[str], user_id: str, message: str) -> ConversationContext:
+        message_cost = estimate_tokens(message) + MESSAGE_OVERHEAD_TOKENS
+        base_tokens = self.system_tokens + message_cost
+        conversation = None
+        if conversation_id:
+            conversation = await self.db.conversations.find_one(
+                {"id": conversation_id, "user_id": user_id},
+                {"_id": 0, "message_count": 1, "context_summary": 1}
+            )
+        if not conversation or not conversation.get("message_count"):
+            return ConversationContext(message, base_tokens, 0, "")
+
+        stored = conversation.get("context_summary") or {}
+        summary, through_seq = stored.get("text", ""), stored.get("through_seq", -1)
+        summary_cost = estimate_tokens(summary) + MESSAGE_OVERHEAD_TOKENS if summary else 0
+        available = self.token_budget - base_tokens - summary_cost
+
+        recent, _ = await read_messages(self.db, conversation_id, user_id, limit=self.max_turns)
+        window = []
+        for turn in reversed(recent):
+            if turn["seq"] <= through_seq:
+                break
+            cost = message_tokens(turn)
+            if cost > available:
+                break
+            available -= cost
+            window.append(turn)
+        window.reverse()
+
+        # Turns between the stored summary and the window get folded into it
+        first_seq = window[0]["seq"] if window else conversation["message_count"]
+        if first_seq - 1 > through_seq:
+            gap = min(first_seq - 1 - through_seq, self.summary_backfill)
+            older, _ = await read_messages(self.db, conversation_id, user_id, before=first_seq, limit=gap)
+            summary = extend_summary(summary, [m for m in older if m["seq"] > through_seq], self.summary_tokens)
+            through_seq = first_seq - 1
+            # A longer summary may squeeze out the oldest window turns; those are folded in too
+            while True:
+                summary_cost = estimate_tokens(summary) + MESSAGE_OVERHEAD_TOKENS if summary else 0
+                available = self.token_budget - base_tokens - summary_cost - sum(map(message_tokens, window))
+                if not window or available >= 0:
+                    break
+                squeezed = []
+                while window and available < 0:
+                    squeezed.append(window.pop(0))
+                    available += message_tokens(squeezed[-1])
+                summary = extend_summary(summary, squeezed, self.summary_tokens)
+                through_seq = squeezed[-1]["seq"]
+            await self.db.conversations.update_one(
+                {"id": conversation_id, "user_id": user_id},
+                {"$set": {"context_summary": {"text": summary, "through_seq": through_seq}}}
+            )
+            self.summary_updates += 1
+
+        sections = []
+        if summary:
+            sections.append(f"Summary of the earlier conversation:\n{summary}")
+        if window:
+            sections.append("Recent messages:\n" + "\n\n".join(_format_turn(m) for m in window))
+        sections.append(f"Current message:\n{message}")
+        tokens = base_tokens + summary_cost + sum(map(message_tokens, window))
+        return ConversationContext("\n\n".join(sections), tokens, len(window), summary)
+
+    def stats(self) -> dict:
+        return {
+            "builds": self.builds,
+            "summary_updates": self.summary_updates,
+            "avg_prompt_tokens": round(self.total_tokens / self.builds, 1) if self.builds else 0.0,
+            "avg_build_ms": round(self.total_build_seconds * 1000 / self.builds, 3) if self.builds else 0.0,
+            "token_budget": self.token_budget
+        }
@@ -1,22 +1,13 @@
 import asyncio
+import os
+import random
 
-class UserMessage:
-    def __init__(self, text):
-        self.text = text
-
-class LlmChat:
-    def __init__(self, api_key=None, session_id=None, system_message=None):
-        self.system_message = system_message
+# Offline stub knobs for load tests: per-call latency and transient error rate
+STUB_LATENCY_SECONDS = float(os.environ.get('LLM_STUB_LATENCY_SECONDS', '1'))
+STUB_ERROR_RATE = float(os.environ.get('LLM_STUB_ERROR_RATE', '0'))
 
-    def with_model(self, provider, model):
-        pass
-
-    async def send_message(self, message):
-        # Simulate network delay
-        await asyncio.sleep(1)
-        
-        # Return a dummy response that triggers brief creation
-        return """Here is a brief based on your request:
+# Return a dummy response that triggers brief creation
+DUMMY_RESPONSE = """Here is a brief based on your request:
 
 ## Brief: Generated Campaign Brief
 **Objective:** Launch the new Q1 marketing campaign to increase brand awareness.
@@ -31,3 +22,32 @@ class LlmChat:
 - What is the budget?
 - Who is the primary target audience?
 """
+
+class UserMessage:
+    def __init__(self, text):
+        self.text = text
+
+class LlmChat:
+    def __init__(self, api_key=None, session_id=None, system_message=None):
+        self.system_message = system_message
+
+    def with_model(self, provider, model):
+        pass
+
+    async def send_message(self, message):
+        # Simulate network delay
+        await asyncio.sleep(STUB_LATENCY_SECONDS)
+        if random.random() < STUB_ERROR_RATE:
+            raise ConnectionError("Simulated provider error")
+
+        return DUMMY_RESPONSE
+
+    async def stream_message(self, message):
+        # Simulate time-to-first-token, then yield the reply word by word
+        await asyncio.sleep(STUB_LATENCY_SECONDS / 5)
+        if random.random() < STUB_ERROR_RATE:
+            raise ConnectionError("Simulated provider error")
+        words = DUMMY_RESPONSE.split(" ")
+        for i, word in enumerate(words):
+            await asyncio.sleep(0.01)
+            yield word if i == len(words) - 1 else word + " "
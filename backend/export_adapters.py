@@ -0,0 +1,237 @@
+"""Adapters that deliver briefs to export destinations.
+
+Each destination gets a ``DestinationAdapter`` with its own pooled HTTP
+client, a cap on requests in flight and optional request pacing, so a slow
+or throttling provider cannot hold up the others. A 429 pauses the whole
+adapter for ``Retry-After`` seconds (capped) before the request is retried.
+
+Adapters send as few requests as each provider allows:
+
+* ``AsanaAdapter`` - the batch API, up to 10 task creations per request.
+* ``SheetsAdapter`` - one ``values:append`` per chunk of rows.
+* ``ClickUpAdapter`` - ClickUp has no bulk create, so one task per request.
+
+``export`` delivers one brief and lets transport and HTTP errors propagate;
+``export_many`` chunks a list of briefs, runs the chunks concurrently and
+reports an ``ExportResult`` per brief instead of raising. Without a
+destination URL, ``DemoAdapter`` returns placeholder links.
+"""
+import asyncio
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+import httpx
+
+EXPORT_FIELDS = ("id", "title", "objective", "deliverables", "deadline", "owners", "assets",
+                 "open_questions", "source_content")
+
+
+class ExportResult(NamedTuple):
+    brief_id: str
+    url: Optional[str] = None
+    error: Optional[str] = None
+
+
+class ExportError(Exception):
+    """The destination rejected a brief; retrying the same request will not help."""
+
+
+def task_payload(brief: dict) -> dict:
+    return {field: brief.get(field) for field in EXPORT_FIELDS}
+
+
+class DestinationAdapter:
+    name = ""
+    batch_size = 1
+    demo = False
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        max_concurrency: int = 4,
+        requests_per_second: float = 0,
+        max_retries: int = 3,
+        max_retry_after: float = 30
+    ):
+        self.client = client
+        self.requests_per_second = requests_per_second
+        self.max_retries = max_retries
+        self.max_retry_after = max_retry_after
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._max_concurrency = max_concurrency
+        self._pace_lock = asyncio.Lock()
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self.requests = 0
+        self.throttled = 0
+        self.exported = 0
+        self.failed = 0
+
+    async def _pace(self):
+        loop = asyncio.get_running_loop()
+        wait = self._paused_until - loop.time()
+        if self.requests_per_second:
+            async with self._pace_lock:
+                now = loop.time()
+                slot = max(now, self._next_slot, self._paused_until)
+                self._next_slot = slot + 1 / self.requests_per_second
+                wait = slot - now
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def _retry_after(self, response: httpx.Response) -> float:
+        try:
+            delay = float(response.headers.get("retry-after", "1"))
+        except ValueError:
+            delay = 1.0
+        return min(max(delay, 0.0), self.max_retry_after)
+
+    async def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """Send one request, waiting out 429s; raises ``httpx.HTTPStatusError`` on other errors."""
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                await self._pace()
+                self.requests += 1
+                response = await self.client.request(method, path, **kwargs)
+                if response.status_code != 429 or attempt == self.max_retries:
+                    break
+                self.throttled += 1
+                loop = asyncio.get_running_loop()
+                self._paused_until = max(self._paused_until, loop.time() + self._retry_after(response))
+            response.raise_for_status()
+            return response
+
+    async def create_tasks(self, briefs: List[dict]) -> List[ExportResult]:
+        """Create tasks for at most ``batch_size`` briefs; one result per brief."""
+        response = await self.request("POST", f"/{self.name}/tasks", json=task_payload(briefs[0]))
+        return [ExportResult(briefs[0]["id"], url=response.json()["url"])]
+
+    async def export(self, brief: dict) -> str:
+        result = (await self.create_tasks([brief]))[0]
+        if result.error:
+            self.failed += 1
+            raise ExportError(result.error)
+        self.exported += 1
+        return result.url
+
+    async def _export_chunk(self, briefs: List[dict]) -> List[ExportResult]:
+        # Any failure (transport, HTTP status, a payload that cannot be sent or
+        # a response that cannot be read) fails this chunk's briefs, not the others
+        try:
+            return await self.create_tasks(briefs)
+        except Exception as e:
+            return [ExportResult(brief["id"], error=f"{self.name} error: {str(e) or type(e).__name__}")
+                    for brief in briefs]
+
+    async def export_many(self, briefs: List[dict]) -> List[ExportResult]:
+        chunks = [briefs[i:i + self.batch_size] for i in range(0, len(briefs), self.batch_size)]
+        results = [r for chunk in await asyncio.gather(*(self._export_chunk(c) for c in chunks)) for r in chunk]
+        for result in results:
+            if result.error:
+                self.failed += 1
+            else:
+                self.exported += 1
+        return results
+
+    async def close(self):
+        await self.client.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "batch_size": self.batch_size,
+            "max_concurrency": self._max_concurrency,
+            "requests_per_second": self.requests_per_second or None,
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "exported": self.exported,
+            "failed": self.failed
+        }
+
+
+class AsanaAdapter(DestinationAdapter):
+    name = "asana"
+    batch_size = 10  # Asana's batch API limit
+
+    async def create_tasks(self, briefs: List[dict]) -> List[ExportResult]:
+        if len(briefs) == 1:
+            return await super().create_tasks(briefs)
+        actions = [{"method": "post", "relative_path": "/tasks", "data": task_payload(b)} for b in briefs]
+        response = await self.request("POST", "/asana/batch", json={"data": {"actions": actions}})
+        results = []
+        for brief, outcome in zip(briefs, response.json()["data"]):
+            if outcome["status_code"] < 300:
+                results.append(ExportResult(brief["id"], url=outcome["body"]["data"]["url"]))
+            else:
+                detail = outcome.get("body", {}).get("errors", [{}])[0].get("message", "rejected")
+                results.append(ExportResult(brief["id"], error=f"asana error: {outcome['status_code']} {detail}"))
+        return results
+
+
+class ClickUpAdapter(DestinationAdapter):
+    name = "clickup"
+
+
+SHEET_COLUMNS = ("id", "title", "objective", "deliverables", "deadline", "owners", "assets", "open_questions")
+_UPDATED_RANGE = re.compile(r"![A-Z]+(\d+):")
+
+
+class SheetsAdapter(DestinationAdapter):
+    name = "sheets"
+    batch_size = 500
+
+    async def create_tasks(self, briefs: List[dict]) -> List[ExportResult]:
+        values = [
+            ["; ".join(b.get(c) or []) if isinstance(b.get(c), list) else b.get(c) or "" for c in SHEET_COLUMNS]
+            for b in briefs
+        ]
+        response = await self.request("POST", "/sheets/values:append", json={"values": values})
+        body = response.json()
+        first_row = int(_UPDATED_RANGE.search(body["updates"]["updatedRange"]).group(1))
+        return [
+            ExportResult(brief["id"], url=f"{body['spreadsheetUrl']}#row={first_row + i}")
+            for i, brief in enumerate(briefs)
+        ]
+
+
+class DemoAdapter(DestinationAdapter):
+    """Stand-in used when no destination is configured."""
+    demo = True
+
+    def __init__(self, name: str):
+        super().__init__(client=None)
+        self.name = name
+        self.batch_size = 1000
+
+    async def create_tasks(self, briefs: List[dict]) -> List[ExportResult]:
+        return [ExportResult(b["id"], url=f"https://example.com/{self.name}/task/demo-123") for b in briefs]
+
+    async def close(self):
+        pass
+
+
+ADAPTERS = {adapter.name: adapter for adapter in (AsanaAdapter, ClickUpAdapter, SheetsAdapter)}
+
+
+def create_export_adapters(
+    base_url: str,
+    timeout: float,
+    max_connections: int,
+    max_concurrency: int,
+    requests_per_second: float = 0,
+    max_retries: int = 3,
+    max_retry_after: float = 30
+) -> Dict[str, DestinationAdapter]:
+    """One adapter per destination, each with its own connection pool; demo adapters if ``base_url`` is empty."""
+    if not base_url:
+        return {name: DemoAdapter(name) for name in ADAPTERS}
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    return {
+        name: adapter_class(
+            httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits),
+            max_concurrency=max_concurrency,
+            requests_per_second=requests_per_second,
+            max_retries=max_retries,
+            max_retry_after=max_retry_after
+        )
+        for name, adapter_class in ADAPTERS.items()
+    }
@@ -0,0 +1,94 @@
+"""Local stand-in for the Asana / ClickUp / Sheets task APIs.
+
+Used to exercise the export job path and to measure job-queue throughput
+without touching a real third party. Point the API at it with
+``EXPORT_DESTINATION_URL=http://localhost:8100`` and run::
+
+    uvicorn fake_destination:app --port 8100
+
+Besides ``POST /{destination}/tasks`` it serves the bulk endpoints the
+export adapters use, shaped after the providers' own: ``POST /asana/batch``
+(up to 10 actions) and ``POST /sheets/values:append``.
+
+``FAKE_DESTINATION_LATENCY_SECONDS`` sets the per-request delay,
+``FAKE_DESTINATION_ERROR_RATE`` the share of requests answered with 503 and
+``FAKE_DESTINATION_RATE_LIMIT`` the requests per second each destination
+accepts before answering 429 with ``Retry-After`` (0 for no limit).
+"""
+import asyncio
+import os
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, HTTPException
+
+LATENCY_SECONDS = float(os.environ.get('FAKE_DESTINATION_LATENCY_SECONDS', '0.5'))
+ERROR_RATE = float(os.environ.get('FAKE_DESTINATION_ERROR_RATE', '0'))
+RATE_LIMIT = float(os.environ.get('FAKE_DESTINATION_RATE_LIMIT', '0'))
+DESTINATIONS = {"asana", "clickup", "sheets"}
+ASANA_BATCH_LIMIT = 10
+
+app = FastAPI(title="Fake export destination")
+counters = {"requests": 0, "created": 0, "errors": 0, "throttled": 0}
+# destination -> (tokens, updated_at) for the per-destination rate limit
+buckets = {}
+sheet_rows = {"next": 2}  # row 1 holds the headers
+
+def throttle(destination: str):
+    if not RATE_LIMIT:
+        return
+    now = time.monotonic()
+    tokens, updated = buckets.get(destination, (RATE_LIMIT, now))
+    tokens = min(RATE_LIMIT, tokens + (now - updated) * RATE_LIMIT)
+    if tokens < 1:
+        buckets[destination] = (tokens, now)
+        counters["throttled"] += 1
+        retry_after = max(1, round((1 - tokens) / RATE_LIMIT))
+        raise HTTPException(status_code=429, detail="Rate limit exceeded", headers={"Retry-After": str(retry_after)})
+    buckets[destination] = (tokens - 1, now)
+
+
+async def handle(destination: str):
+    if destination not in DESTINATIONS:
+        raise HTTPException(status_code=404, detail="Unknown destination")
+    counters["requests"] += 1
+    throttle(destination)
+    await asyncio.sleep(LATENCY_SECONDS)
+    if random.random() < ERROR_RATE:
+        counters["errors"] += 1
+        raise HTTPException(status_code=503, detail="Simulated destination outage")
+
+def new_task(destination: str, brief: dict) -> dict:
+    counters["created"] += 1
+    task_id = str(uuid.uuid4())
+    return {"id": task_id, "url": f"http://fake-{destination}.local/task/{task_id}", "title": brief.get("title")}
+
+@app.post("/asana/batch")
+async def asana_batch(body: dict):
+    actions = body.get("data", {}).get("actions", [])
+    if not actions or len(actions) > ASANA_BATCH_LIMIT:
+        raise HTTPException(status_code=400, detail=f"A batch holds 1 to {ASANA_BATCH_LIMIT} actions")
+    await handle("asana")
+    return {"data": [{"status_code": 201, "body": {"data": new_task("asana", a.get("data", {}))}} for a in actions]}
+
+@app.post("/sheets/values:append")
+async def sheets_append(body: dict):
+    values = body.get("values", [])
+    await handle("sheets")
+    first = sheet_rows["next"]
+    sheet_rows["next"] += len(values)
+    counters["created"] += len(values)
+    return {
+        "spreadsheetUrl": "http://fake-sheets.local/spreadsheets/briefs",
+        "updates": {"updatedRange": f"Briefs!A{first}:H{first + len(values) - 1}", "updatedRows": len(values)}
+    }
+
+@app.post("/{destination}/tasks", status_code=201)
+async def create_task(destination: str, brief: dict):
+    await handle(destination)
+    return new_task(destination, brief)
+
+@app.get("/stats")
+async def stats():
+    return counters
@@ -0,0 +1,49 @@
+"""JSON responses for trusted database documents without Pydantic on the way out.
+
+When a route returns plain data, FastAPI validates it against
+``response_model``, runs it through ``jsonable_encoder`` and encodes it with
+``json.dumps``. For documents this service wrote itself that is a second
+(or third) copy of work already done on the way in. ``DocumentShaper`` trims
+a stored document to a model's fields and fills in defaults, and
+``json_response`` encodes the result with orjson.
+
+Routes keep their ``response_model``, so the OpenAPI schema is unchanged;
+returning a ``Response`` only skips the validation step. A document missing
+a required field (written before the field existed) goes through the model
+instead, so the output never drifts from the schema.
+"""
+from typing import Dict, Iterable, List, Optional, Type
+
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+class DocumentShaper:
+    """Shapes documents like ``model(**doc).model_dump(exclude_unset=...)``."""
+
+    def __init__(self, model: Type[BaseModel], exclude_unset: bool = False):
+        self.model = model
+        self.exclude_unset = exclude_unset
+        self.fields = tuple(model.model_fields)
+        self.required = frozenset(name for name, field in model.model_fields.items() if field.is_required())
+        self.defaults = {
+            name: field.get_default(call_default_factory=True)
+            for name, field in model.model_fields.items()
+            if not field.is_required()
+        }
+        self.fallbacks = 0
+
+    def shape(self, doc: dict) -> dict:
+        if not self.required.issubset(doc):
+            self.fallbacks += 1
+            return self.model(**doc).model_dump(exclude_unset=self.exclude_unset)
+        if self.exclude_unset:
+            return {name: doc[name] for name in self.fields if name in doc}
+        return {name: doc[name] if name in doc else self.defaults[name] for name in self.fields}
+
+    def shape_many(self, docs: Iterable[dict]) -> List[dict]:
+        return [self.shape(doc) for doc in docs]
+
+
+def json_response(content, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> ORJSONResponse:
+    return ORJSONResponse(content, status_code=status_code, headers=headers)
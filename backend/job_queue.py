@@ -0,0 +1,290 @@
+"""In-process asyncio job queue with an optional persistent store.
+
+Slow work such as chat generation and third-party exports can be handed to
+``JobQueue`` so the request returns 202 straight away. The queue runs a
+fixed number of worker tasks, retries failed jobs with exponential backoff
+up to a per-type attempt limit, and deduplicates submissions that carry the
+same idempotency key.
+
+Job state lives in a store:
+
+* ``MemoryJobStore`` - a dict, lost on restart;
+* ``CollectionJobStore`` - a Mongo collection (or the mock one). Queued
+  jobs survive restarts, and a job is claimed with an atomic
+  ``queued -> running`` transition so only one process runs it. The
+  collection needs a unique partial index on ``(user_id, idempotency_key)``.
+"""
+import asyncio
+import logging
+import random
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler for failures that retrying cannot fix."""
+
+
+JobHandler = Callable[[dict], Awaitable[Optional[dict]]]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class MemoryJobStore:
+    def __init__(self):
+        self._jobs: Dict[str, dict] = {}
+        self._idempotency: Dict[tuple, str] = {}
+
+    async def insert(self, job: dict) -> dict:
+        key = job.get("idempotency_key")
+        if key is not None:
+            existing = self._idempotency.get((job["user_id"], key))
+            if existing is not None:
+                return dict(self._jobs[existing])
+            self._idempotency[(job["user_id"], key)] = job["id"]
+        self._jobs[job["id"]] = dict(job)
+        return job
+
+    async def get(self, job_id: str, user_id: Optional[str] = None) -> Optional[dict]:
+        job = self._jobs.get(job_id)
+        if job is None or (user_id is not None and job["user_id"] != user_id):
+            return None
+        return dict(job)
+
+    async def list(self, user_id: str, limit: int) -> List[dict]:
+        jobs = [dict(j) for j in self._jobs.values() if j["user_id"] == user_id]
+        jobs.sort(key=lambda j: j["created_at"], reverse=True)
+        return jobs[:limit]
+
+    async def claim(self, job_id: str) -> Optional[dict]:
+        job = self._jobs.get(job_id)
+        if job is None or job["status"] != "queued":
+            return None
+        job.update(status="running", started_at=_now(), updated_at=_now())
+        job["attempts"] += 1
+        return dict(job)
+
+    async def update(self, job_id: str, fields: dict):
+        self._jobs[job_id].update(fields, updated_at=_now())
+
+    async def recoverable(self, stale_before: str) -> List[str]:
+        ids = []
+        for job in self._jobs.values():
+            if job["status"] == "running" and job["started_at"] < stale_before:
+                job["status"] = "queued"
+            if job["status"] == "queued":
+                ids.append(job["id"])
+        return ids
+
+
+class CollectionJobStore:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def insert(self, job: dict) -> dict:
+        doc = {k: v for k, v in job.items() if not (k == "idempotency_key" and v is None)}
+        try:
+            await self.collection.insert_one(doc)
+        except DuplicateKeyError:
+            existing = await self.collection.find_one(
+                {"user_id": job["user_id"], "idempotency_key": job["idempotency_key"]},
+                {"_id": 0}
+            )
+            if existing is not None:
+                return existing
+            raise
+        doc.pop("_id", None)
+        return job
+
+    async def get(self, job_id: str, user_id: Optional[str] = None) -> Optional[dict]:
+        query = {"id": job_id}
+        if user_id is not None:
+            query["user_id"] = user_id
+        return await self.collection.find_one(query, {"_id": 0})
+
+    async def list(self, user_id: str, limit: int) -> List[dict]:
+        return await self.collection.find(
+            {"user_id": user_id}, {"_id": 0}
+        ).sort("created_at", -1).to_list(limit)
+
+    async def claim(self, job_id: str) -> Optional[dict]:
+        now = _now()
+        return await self.collection.find_one_and_update(
+            {"id": job_id, "status": "queued"},
+            {"$set": {"status": "running", "started_at": now, "updated_at": now}, "$inc": {"attempts": 1}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def update(self, job_id: str, fields: dict):
+        await self.collection.update_one({"id": job_id}, {"$set": {**fields, "updated_at": _now()}})
+
+    async def recoverable(self, stale_before: str) -> List[str]:
+        # Jobs left running by a process that died are handed back to the queue
+        await self.collection.update_many(
+            {"status": "running", "started_at": {"$lt": stale_before}},
+            {"$set": {"status": "queued", "updated_at": _now()}}
+        )
+        jobs = await self.collection.find({"status": "queued"}, {"_id": 0, "id": 1}).to_list(None)
+        return [job["id"] for job in jobs]
+
+
+class JobQueue:
+    def __init__(
+        self,
+        store,
+        concurrency: int = 4,
+        max_attempts: int = 3,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        stale_after_seconds: float = 900.0
+    ):
+        self.store = store
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stale_after_seconds = stale_after_seconds
+        self._handlers: Dict[str, tuple] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._timers = set()
+        self.running = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+
+    def register(self, job_type: str, handler: JobHandler, max_attempts: Optional[int] = None):
+        self._handlers[job_type] = (handler, max_attempts or self.max_attempts)
+
+    async def start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        stale_before = (datetime.now(timezone.utc) - timedelta(seconds=self.stale_after_seconds)).isoformat()
+        for job_id in await self.store.recoverable(stale_before):
+            self._queue.put_nowait(job_id)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        logger.info(f"Job queue started with {self.concurrency} workers")
+
+    async def stop(self):
+        for timer in self._timers:
+            timer.cancel()
+        self._timers.clear()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def enqueue(
+        self,
+        job_type: str,
+        payload: dict,
+        user_id: str,
+        idempotency_key: Optional[str] = None
+    ) -> dict:
+        """Store and queue a job; a repeated idempotency key returns the first job."""
+        if job_type not in self._handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        now = _now()
+        job = {
+            "id": str(uuid.uuid4()),
+            "type": job_type,
+            "user_id": user_id,
+            "payload": payload,
+            "status": "queued",
+            "attempts": 0,
+            "max_attempts": self._handlers[job_type][1],
+            "result": None,
+            "error": None,
+            "idempotency_key": idempotency_key,
+            "created_at": now,
+            "updated_at": now,
+            "started_at": None,
+            "finished_at": None
+        }
+        stored = await self.store.insert(job)
+        if stored["id"] == job["id"]:
+            self._queue.put_nowait(job["id"])
+        return stored
+
+    async def get(self, job_id: str, user_id: Optional[str] = None) -> Optional[dict]:
+        return await self.store.get(job_id, user_id)
+
+    async def list(self, user_id: str, limit: int = 50) -> List[dict]:
+        return await self.store.list(user_id, limit)
+
+    async def join(self):
+        """Wait until every queued job (including pending retries) has finished."""
+        while True:
+            await self._queue.join()
+            if not self._timers:
+                return
+            await asyncio.sleep(0.01)
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.error(f"Job {job_id} bookkeeping error: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = await self.store.claim(job_id)
+        if job is None:
+            return  # finished, or claimed by another process
+        handler, max_attempts = self._handlers[job["type"]]
+        self.running += 1
+        try:
+            result = await handler(job)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            if job["attempts"] < max_attempts and not isinstance(e, PermanentJobError):
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** job["attempts"])))
+                self.retried += 1
+                await self.store.update(job_id, {"status": "queued", "error": error})
+                self._retry_later(job_id, delay)
+            else:
+                self.failed += 1
+                logger.error(f"Job {job_id} ({job['type']}) failed: {error}")
+                await self.store.update(job_id, {"status": "failed", "error": error, "finished_at": _now()})
+            return
+        finally:
+            self.running -= 1
+        self.succeeded += 1
+        await self.store.update(job_id, {
+            "status": "succeeded", "result": result, "error": None, "finished_at": _now()
+        })
+
+    def _retry_later(self, job_id: str, delay: float):
+        loop = asyncio.get_running_loop()
+
+        def requeue():
+            self._timers.discard(timer)
+            self._queue.put_nowait(job_id)
+
+        timer = loop.call_later(delay, requeue)
+        self._timers.add(timer)
+
+    def stats(self) -> dict:
+        return {
+            "store": type(self.store).__name__,
+            "workers": len(self._workers),
+            "queued": self._queue.qsize() if self._queue else 0,
+            "retry_scheduled": len(self._timers),
+            "running": self.running,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retried": self.retried
+        }
@@ -0,0 +1,244 @@
+"""Admission control, deadlines, retries and circuit breaking for LLM calls.
+
+Every outbound completion goes through ``LlmAdmissionController``:
+
+* a global concurrency cap with a bounded wait queue, so a slow provider
+  cannot pile up unbounded coroutines;
+* a per-user in-flight cap, so one user cannot take every slot;
+* a deadline covering queueing, every attempt and the backoff between them;
+* retries with full-jitter exponential backoff for transient errors;
+* a circuit breaker that fails fast while the provider keeps failing.
+
+Requests that cannot be admitted raise ``AdmissionRejected`` straight away,
+carrying the HTTP status and ``Retry-After`` the API should answer with.
+"""
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable
+
+import httpx
+
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+def is_transient(exc: Exception) -> bool:
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    status_code = getattr(exc, "status_code", None)
+    return status_code in TRANSIENT_STATUS_CODES
+
+
+class CircuitBreaker:
+    """Opens after ``threshold`` consecutive failures for ``reset_seconds``.
+
+    Once the reset window passes a single trial call is let through
+    (half-open); its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def retry_after(self) -> int:
+        if self.opened_at is None:
+            return 0
+        return max(1, int(self.reset_seconds - (time.monotonic() - self.opened_at)) + 1)
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def release_trial(self):
+        """Give up a half-open trial slot without recording an outcome."""
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+class LlmAdmissionController:
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_per_user: int,
+        max_queue: int,
+        queue_timeout: float,
+        timeout: float,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        breaker_threshold: int = 5,
+        breaker_reset_seconds: float = 30.0
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_per_user = max_per_user
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset_seconds)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._per_user = {}
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.retries = 0
+
+    def _reject(self, status_code: int, detail: str, retry_after: int):
+        self.rejected += 1
+        raise AdmissionRejected(status_code, detail, retry_after)
+
+    def check(self, user_id: str):
+        """Fail fast if a call for ``user_id`` could not be admitted right now."""
+        if self.breaker.state == "open":
+            self._reject(503, "AI service temporarily unavailable", self.breaker.retry_after())
+        if self._per_user.get(user_id, 0) >= self.max_per_user:
+            self._reject(429, "Too many AI requests in progress", 1)
+        if self.in_flight >= self.max_concurrency and self.waiting >= self.max_queue:
+            self._reject(503, "AI service overloaded, please retry", max(1, int(self.queue_timeout)))
+
+    @asynccontextmanager
+    async def admit(self, user_id: str):
+        """Hold a global and a per-user slot for the duration of the block."""
+        self.check(user_id)
+        self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+        try:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._reject(503, "AI service overloaded, please retry", max(1, int(self.queue_timeout)))
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+                self._semaphore.release()
+        finally:
+            remaining = self._per_user[user_id] - 1
+            if remaining:
+                self._per_user[user_id] = remaining
+            else:
+                del self._per_user[user_id]
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _allow_call(self):
+        if not self.breaker.allow():
+            self._reject(503, "AI service temporarily unavailable", self.breaker.retry_after())
+
+    async def call(self, user_id: str, fn: Callable[[], Awaitable]):
+        """Run ``fn`` under admission control, deadline, retries and breaker."""
+        deadline = time.monotonic() + self.timeout
+        async with self.admit(user_id):
+            attempt = 0
+            while True:
+                self._allow_call()
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError()
+                    result = await asyncio.wait_for(fn(), remaining)
+                except asyncio.CancelledError:
+                    self.breaker.release_trial()
+                    raise
+                except Exception as e:
+                    if not is_transient(e):
+                        self.breaker.release_trial()
+                        raise
+                    self.breaker.record_failure()
+                    if isinstance(e, asyncio.TimeoutError):
+                        self.timeouts += 1
+                    delay = self._backoff(attempt)
+                    if attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                        raise
+                    attempt += 1
+                    self.retries += 1
+                    await asyncio.sleep(delay)
+                    continue
+                self.breaker.record_success()
+                return result
+
+    async def stream(self, user_id: str, fn: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Like ``call`` for streamed completions; no retries once output started."""
+        deadline = time.monotonic() + self.timeout
+        async with self.admit(user_id):
+            self._allow_call()
+            stream = fn()
+            try:
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError()
+                    try:
+                        chunk = await asyncio.wait_for(stream.__anext__(), remaining)
+                    except StopAsyncIteration:
+                        break
+                    yield chunk
+            except Exception as e:
+                if is_transient(e):
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.release_trial()
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timeouts += 1
+                raise
+            except BaseException:
+                # Client went away mid-stream; that says nothing about the provider
+                self.breaker.release_trial()
+                raise
+            finally:
+                await stream.aclose()
+            self.breaker.record_success()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "breaker": self.breaker.state
+        }
@@ -0,0 +1,98 @@
+"""Long-lived, per-process LLM client state.
+
+Building an ``LlmChat`` per request re-sends configuration and, for a real
+provider, opens a fresh connection with a new TLS handshake every time.
+``LlmClientRegistry`` is created once per process and owns:
+
+* one pooled, keep-alive ``httpx.AsyncClient`` shared by every provider
+  call (handed to litellm, which ``emergentintegrations`` uses underneath);
+* the system prompt and model selection, shared by every session;
+* an LRU of ``LlmChat`` sessions keyed by ``(user_id, conversation_id)``,
+  so a conversation id never reaches another user's session history.
+"""
+import logging
+
+import httpx
+from cachetools import LRUCache
+
+from emergentintegrations.llm.chat import LlmChat
+
+try:
+    import litellm
+except ImportError:  # the offline stub does not need it
+    litellm = None
+
+logger = logging.getLogger(__name__)
+
+
+class LlmClientRegistry:
+    def __init__(
+        self,
+        api_key: str,
+        provider: str,
+        model: str,
+        system_message: str,
+        max_sessions: int = 1000,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        timeout: float = 120.0
+    ):
+        self.api_key = api_key
+        self.provider = provider
+        self.model = model
+        self.system_message = system_message
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections
+        )
+        self.timeout = timeout
+        self.http_client = None
+        self._sessions = LRUCache(maxsize=max_sessions)
+        self.hits = 0
+        self.misses = 0
+
+    async def start(self):
+        if self.http_client is None:
+            self.http_client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+            if litellm is not None:
+                litellm.aclient_session = self.http_client
+            logger.info(f"LLM client registry started ({self.provider}/{self.model})")
+
+    async def close(self):
+        self._sessions.clear()
+        if self.http_client is not None:
+            if litellm is not None and litellm.aclient_session is self.http_client:
+                litellm.aclient_session = None
+            await self.http_client.aclose()
+            self.http_client = None
+
+    def new_chat(self, session_id: str) -> LlmChat:
+        """Build a one-off session that is not kept in the LRU."""
+        chat = LlmChat(
+            api_key=self.api_key,
+            session_id=session_id,
+            system_message=self.system_message
+        )
+        chat.with_model(self.provider, self.model)
+        return chat
+
+    def get_chat(self, user_id: str, conversation_id: str) -> LlmChat:
+        """Return the cached session for a user's conversation, creating it on a miss."""
+        key = (user_id, conversation_id)
+        chat = self._sessions.get(key)
+        if chat is not None:
+            self.hits += 1
+            return chat
+        self.misses += 1
+        chat = self.new_chat(f"brieflyai-{user_id}-{conversation_id}")
+        self._sessions[key] = chat
+        return chat
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self._sessions.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "pooled_client": self.http_client is not None
+        }
@@ -0,0 +1,166 @@
+"""Conversation messages stored in buckets outside the conversation document.
+
+Messages used to be ``$push``-ed onto ``conversations.messages``, so every
+conversation read moved the whole history and long chats crept towards the
+16MB document limit. Now each message gets a per-conversation ``seq`` and
+lives in a ``messages`` bucket document holding up to ``BUCKET_SIZE``
+consecutive messages::
+
+    {"conversation_id", "user_id", "bucket": seq // BUCKET_SIZE,
+     "count", "messages": [{"seq", "role", "content", "timestamp"}, ...],
+     "created_at", "updated_at"}
+
+Buckets are indexed by ``(conversation_id, user_id, bucket)``, so reading a
+page of history touches one or two small documents. Every bucket write and
+read is scoped to the owning user as well as the conversation, so a
+conversation id reused by another account can never reach these messages.
+The conversation itself keeps only summary fields: ``message_count``,
+``last_message`` and ``updated_at``.
+"""
+from datetime import datetime, timezone
+from itertools import groupby
+from typing import List, Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+BUCKET_SIZE = 50
+PREVIEW_LENGTH = 200
+
+
+def message_preview(message: dict) -> dict:
+    return {
+        "role": message["role"],
+        "content": message["content"][:PREVIEW_LENGTH],
+        "timestamp": message.get("timestamp")
+    }
+
+
+async def _push_bucket(db, conversation_id: str, user_id: str, bucket: int, messages: List[dict], now: str):
+    await db.messages.update_one(
+        {"conversation_id": conversation_id, "user_id": user_id, "bucket": bucket},
+        {
+            "$push": {"messages": {"$each": messages}},
+            "$inc": {"count": len(messages)},
+            "$set": {"updated_at": now},
+            "$setOnInsert": {"created_at": now}
+        },
+        upsert=True
+    )
+
+
+async def append_messages(db, conversation_id: str, user_id: str, messages: List[dict]) -> Optional[List[dict]]:
+    """Assign sequence numbers to ``messages`` and store them.
+
+    Returns the stored messages, or None if the conversation does not exist.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    conversation = await db.conversations.find_one_and_update(
+        {"id": conversation_id, "user_id": user_id},
+        {
+            "$inc": {"message_count": len(messages)},
+            "$set": {"last_message": message_preview(messages[-1]), "updated_at": now}
+        },
+        projection={"_id": 0, "message_count": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if conversation is None:
+        return None
+
+    first_seq = conversation["message_count"] - len(messages)
+    stored = [{"seq": first_seq + i, **message} for i, message in enumerate(messages)]
+    for bucket, group in groupby(stored, key=lambda m: m["seq"] // BUCKET_SIZE):
+        group = list(group)
+        try:
+            await _push_bucket(db, conversation_id, user_id, bucket, group, now)
+        except DuplicateKeyError:
+            # Lost an upsert race for a new bucket; it exists now, so push into it
+            await _push_bucket(db, conversation_id, user_id, bucket, group, now)
+    return stored
+
+
+async def read_messages(
+    db,
+    conversation_id: str,
+    user_id: str,
+    before: Optional[int] = None,
+    limit: int = 50
+) -> Tuple[List[dict], Optional[int]]:
+    """Return up to ``limit`` of the user's messages older than ``before`` (newest page if None).
+
+    Messages come back in chronological order together with the cursor for
+    the next older page, which is None once the start of history is reached.
+    """
+    query = {"conversation_id": conversation_id, "user_id": user_id}
+    if before is not None:
+        if before <= 0:
+            return [], None
+        query["bucket"] = {"$lte": (before - 1) // BUCKET_SIZE}
+
+    page = []
+    cursor = db.messages.find(query, {"_id": 0, "messages": 1}).sort("bucket", -1)
+    async for bucket in cursor:
+        for message in sorted(bucket["messages"], key=lambda m: m["seq"], reverse=True):
+            if before is None or message["seq"] < before:
+                page.append(message)
+        if len(page) > limit:
+            break
+
+    page = page[:limit + 1]
+    has_more = len(page) > limit
+    page = page[:limit]
+    page.reverse()
+    next_cursor = page[0]["seq"] if has_more and page else None
+    return page, next_cursor
+
+
+async def migrate_embedded_messages(db, batch_size: int = 100) -> int:
+    """Move legacy ``conversations.messages`` arrays into buckets.
+
+    Idempotent: a conversation is only rewritten while it still has an
+    embedded array, and its buckets are replaced wholesale. Returns the
+    number of conversations migrated.
+    """
+    migrated = 0
+    while True:
+        conversations = await db.conversations.find(
+            {"messages": {"$exists": True}},
+            {"_id": 0, "id": 1, "user_id": 1, "messages": 1, "created_at": 1}
+        ).to_list(batch_size)
+        if not conversations:
+            return migrated
+        for conversation in conversations:
+            messages = conversation.get("messages") or []
+            now = datetime.now(timezone.utc).isoformat()
+            await db.messages.delete_many({"conversation_id": conversation["id"], "user_id": conversation["user_id"]})
+            stored = [{"seq": i, **message} for i, message in enumerate(messages)]
+            buckets = [
+                {
+                    "conversation_id": conversation["id"],
+                    "user_id": conversation["user_id"],
+                    "bucket": bucket,
+                    "count": len(group),
+                    "messages": group,
+                    "created_at": group[0].get("timestamp") or now,
+                    "updated_at": group[-1].get("timestamp") or now
+                }
+                for bucket, group in (
+                    (bucket, list(group))
+                    for bucket, group in groupby(stored, key=lambda m: m["seq"] // BUCKET_SIZE)
+                )
+            ]
+            if buckets:
+                await db.messages.insert_many(buckets)
+            await db.conversations.update_one(
+                {"id": conversation["id"], "user_id": conversation["user_id"]},
+                {
+                    "$set": {
+                        "message_count": len(messages),
+                        "last_message": message_preview(messages[-1]) if messages else None,
+                        "updated_at": (messages[-1].get("timestamp") if messages else None)
+                        or conversation.get("created_at") or now
+                    },
+                    "$unset": {"messages": ""}
+                }
+            )
+            migrated += 1
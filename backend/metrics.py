@@ -0,0 +1,311 @@
+"""Process-local metrics in the Prometheus text exposition format.
+
+Dependency-free on purpose: a metric is a dict of label tuples to floats,
+so recording one costs a dict lookup and, for histograms, a bisect. Nothing
+is shared between workers; Prometheus scrapes each process and sums.
+
+* ``Counter``, ``Gauge`` and ``Histogram`` with fixed label names;
+  ``Gauge`` can also read its value from a callback at scrape time.
+* ``MetricsMiddleware`` - ASGI middleware recording request counts and
+  latency per method, route template and status.
+* ``InstrumentedDatabase`` - wraps the Motor (or mock) database and times
+  every collection call by collection and operation.
+* ``EventLoopMonitor`` - measures how late the event loop wakes a sleeper.
+"""
+import asyncio
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self._samples()
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0.0)
+
+    def _samples(self):
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[tuple, float] = {}
+        self.callback = callback
+
+    def set(self, value: float, *labels):
+        self._values[labels] = value
+
+    def inc(self, *labels, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+    def _samples(self):
+        if self.callback is not None:
+            yield f"{self.name} {_format_value(self.callback())}"
+            return
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def count(self, *labels) -> int:
+        series = self._values.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def _samples(self):
+        for labels, series in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(series[-1])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), callback=None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self._metrics.values() for line in metric.render()) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsMiddleware:
+    """Counts and times HTTP requests by method, route template and status.
+
+    The route template (``/api/briefs/{brief_id}``) is read from the scope
+    after routing, so label cardinality stays bounded; unrouted requests are
+    labelled ``unmatched``. Streaming responses are timed until the body ends.
+    """
+
+    def __init__(self, app, requests: Counter, latency: Histogram, in_flight: Gauge, skip_paths=("/metrics",)):
+        self.app = app
+        self.requests = requests
+        self.latency = latency
+        self.in_flight = in_flight
+        self.skip_paths = set(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        self.in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.in_flight.dec()
+            route = scope.get("route")
+            labels = (scope["method"], getattr(route, "path", "unmatched"), str(status_code))
+            self.requests.inc(*labels)
+            self.latency.observe(time.perf_counter() - started, *labels)
+
+
+class _InstrumentedCursor:
+    def __init__(self, cursor, histogram: Histogram, collection: str):
+        self._cursor = cursor
+        self._histogram = histogram
+        self._collection = collection
+
+    def sort(self, *args, **kwargs):
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def skip(self, *args, **kwargs):
+        self._cursor = self._cursor.skip(*args, **kwargs)
+        return self
+
+    def limit(self, *args, **kwargs):
+        self._cursor = self._cursor.limit(*args, **kwargs)
+        return self
+
+    async def to_list(self, *args, **kwargs):
+        with self._histogram.time(self._collection, "find"):
+            return await self._cursor.to_list(*args, **kwargs)
+
+    def __aiter__(self):
+        return self._aiter()
+
+    async def _aiter(self):
+        # Time spent fetching, not time the caller spends between documents
+        iterator = self._cursor.__aiter__()
+        while True:
+            started = time.perf_counter()
+            try:
+                doc = await iterator.__anext__()
+            except StopAsyncIteration:
+                self._histogram.observe(time.perf_counter() - started, self._collection, "find_next")
+                return
+            self._histogram.observe(time.perf_counter() - started, self._collection, "find_next")
+            yield doc
+
+
+class _InstrumentedCollection:
+    def __init__(self, collection, histogram: Histogram, name: str):
+        self._collection = collection
+        self._histogram = histogram
+        self._name = name
+
+    def find(self, *args, **kwargs):
+        return _InstrumentedCursor(self._collection.find(*args, **kwargs), self._histogram, self._name)
+
+    def __getattr__(self, operation: str):
+        method = getattr(self._collection, operation)
+        if not callable(method):
+            return method
+        histogram, name = self._histogram, self._name
+
+        async def timed(*args, **kwargs):
+            with histogram.time(name, operation):
+                return await method(*args, **kwargs)
+
+        return timed
+
+
+class InstrumentedDatabase:
+    """Database proxy whose collection calls feed ``histogram(collection, operation)``."""
+
+    def __init__(self, db, histogram: Histogram):
+        self._db = db
+        self._histogram = histogram
+        self._collections: Dict[str, _InstrumentedCollection] = {}
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name: str):
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = _InstrumentedCollection(self._db[name], self._histogram, name)
+        return collection
+
+
+class EventLoopMonitor:
+    """Samples event-loop lag: how much later than requested a sleep returns."""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lag = max(0.0, loop.time() - started - self.interval)
+            self.max_lag = max(self.max_lag, self.lag)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,32 @@
+"""Move embedded conversation messages into the bucketed messages collection.
+
+Usage (from the backend directory, with MONGO_URL and DB_NAME set):
+
+    python migrate_messages.py
+
+Safe to re-run; conversations already migrated are skipped.
+"""
+import asyncio
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from message_store import migrate_embedded_messages
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+
+async def main():
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    try:
+        migrated = await migrate_embedded_messages(client[os.environ['DB_NAME']])
+        print(f"Migrated {migrated} conversations")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,665 @@
+"""In-memory stand-in for the Motor database, used when USE_MOCK_DB=true.
+
+Documents live in a dict keyed by an internal sequence number. Each
+declared index adds a hash index on its first field, mapping values to
+those keys, and a sorted index that keeps the keys of every equality group
+ordered by its second field, so queries such as
+``find({"user_id": ...}).sort("updated_at", -1)`` neither scan nor re-sort
+the whole collection. Fields no index declares are scanned, as MongoDB would,
+and ``cursor.explain()`` reports which index a query ran on. A ``text``
+index is kept as an in-process inverted index so ``$text`` queries work
+offline. Only the subset of the Motor API the server uses is implemented.
+"""
+import bisect
+import itertools
+from types import SimpleNamespace
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from text_search import InvertedIndex
+
+_HASHABLE = (str, int, float, bool, type(None))
+# Key under which $text matches carry their score until projection
+_TEXT_SCORE = "$textScore"
+_EMPTY = {}
+
+
+class _Missing:
+    def __repr__(self):
+        return "<missing>"
+
+
+_MISSING = _Missing()
+
+
+def _is_operator_dict(value) -> bool:
+    return isinstance(value, dict) and bool(value) and next(iter(value)).startswith("$")
+
+
+def _sort_key(value):
+    # Order like MongoDB does across types: null < numbers < strings < others
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    return (3, str(value))
+
+
+def _index_values(value) -> list:
+    """Hash index entries for a field: one per distinct array element (multikey)."""
+    if isinstance(value, list):
+        return list(dict.fromkeys(v for v in value if isinstance(v, _HASHABLE)))
+    return [value] if isinstance(value, _HASHABLE) else []
+
+
+def _leading_fields(keys) -> tuple:
+    """Fields of an index key before its first text field."""
+    fields = []
+    for field, direction in keys:
+        if direction == "text":
+            break
+        fields.append(field)
+    return tuple(fields)
+
+
+def _copy_value(value):
+    if isinstance(value, list):
+        return [dict(v) if isinstance(v, dict) else v for v in value]
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+def _clone(doc: dict) -> dict:
+    return {k: _copy_value(v) for k, v in doc.items()}
+
+
+def _is_text_score(value) -> bool:
+    return isinstance(value, dict) and value.get("$meta") == "textScore"
+
+
+def _project(doc: dict, projection: dict = None) -> dict:
+    meta = [k for k, v in (projection or {}).items() if _is_text_score(v)]
+    if meta:
+        projection = {k: v for k, v in projection.items() if k not in meta}
+    score = doc.get(_TEXT_SCORE)
+    if not projection:
+        result = _clone(doc)
+    else:
+        included = {k for k, v in projection.items() if v and k != "_id"}
+        if included:
+            keep_id = projection.get("_id", 1)
+            result = {
+                k: _copy_value(v) for k, v in doc.items()
+                if k in included or (k == "_id" and keep_id)
+            }
+        else:
+            excluded = {k for k, v in projection.items() if not v}
+            result = {k: _copy_value(v) for k, v in doc.items() if k not in excluded}
+    result.pop(_TEXT_SCORE, None)
+    for k in meta:
+        result[k] = score
+    return result
+
+
+def _compare(value, op: str, operand) -> bool:
+    if value is None or operand is None:
+        return False
+    try:
+        if op == "$gt":
+            return value > operand
+        if op == "$gte":
+            return value >= operand
+        if op == "$lt":
+            return value < operand
+        return value <= operand
+    except TypeError:
+        return False
+
+
+def _match_operators(value, ops: dict) -> bool:
+    present = value is not _MISSING
+    if not present:
+        value = None
+    for op, operand in ops.items():
+        if op == "$eq":
+            if value != operand:
+                return False
+        elif op == "$ne":
+            if value == operand:
+                return False
+        elif op in ("$gt", "$gte", "$lt", "$lte"):
+            if not _compare(value, op, operand):
+                return False
+        elif op == "$in":
+            # An array matches if any element does, as in MongoDB
+            if not any(v in operand for v in value) if isinstance(value, list) else value not in operand:
+                return False
+        elif op == "$nin":
+            if any(v in operand for v in value) if isinstance(value, list) else value in operand:
+                return False
+        elif op == "$exists":
+            if present != bool(operand):
+                return False
+        else:
+            raise NotImplementedError(f"MockDB does not support query operator {op}")
+    return True
+
+
+def matches(doc: dict, query: dict) -> bool:
+    for key, cond in query.items():
+        if key == "$or":
+            if not any(matches(doc, q) for q in cond):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, q) for q in cond):
+                return False
+        elif _is_operator_dict(cond):
+            if not _match_operators(doc.get(key, _MISSING), cond):
+                return False
+        else:
+            value = doc.get(key)
+            if isinstance(value, list) and not isinstance(cond, list):
+                if cond not in value:
+                    return False
+            elif value != cond:
+                return False
+    return True
+
+
+def apply_update(doc: dict, update: dict, inserting: bool = False):
+    for op, fields in update.items():
+        if op == "$set":
+            doc.update({k: _copy_value(v) for k, v in fields.items()})
+        elif op == "$setOnInsert":
+            if inserting:
+                doc.update({k: _copy_value(v) for k, v in fields.items()})
+        elif op == "$unset":
+            for k in fields:
+                doc.pop(k, None)
+        elif op == "$inc":
+            for k, v in fields.items():
+                doc[k] = doc.get(k, 0) + v
+        elif op == "$push":
+            for k, v in fields.items():
+                target = doc.setdefault(k, [])
+                if _is_operator_dict(v) and "$each" in v:
+                    target.extend(_copy_value(v["$each"]))
+                else:
+                    target.append(_copy_value(v))
+        else:
+            raise NotImplementedError(f"MockDB does not support update operator {op}")
+
+
+def _sort_docs(docs: list, sort: list) -> list:
+    for field, direction in reversed(sort):
+        if _is_text_score(direction):
+            docs.sort(key=lambda d: d.get(_TEXT_SCORE, 0.0), reverse=True)
+        else:
+            docs.sort(key=lambda d: _sort_key(d.get(field)), reverse=direction == -1)
+    return docs
+
+
+class MockCursor:
+    def __init__(self, collection: "MockCollection", query: dict, projection: dict = None):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort = None
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list, direction=None):
+        if isinstance(key_or_list, str):
+            self._sort = [(key_or_list, direction or 1)]
+        else:
+            self._sort = list(key_or_list)
+        return self
+
+    def skip(self, count: int):
+        self._skip = count
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    def _ordered_docs(self):
+        collection = self._collection
+        if not self._sort:
+            return collection._iter_matching(self._query)
+        if "$text" in self._query:
+            return iter(_sort_docs(list(collection._iter_matching(self._query)), self._sort))
+        ordered = collection._iter_sorted(self._query, self._sort)
+        if ordered is not None:
+            return ordered
+        return iter(_sort_docs(list(collection._iter_matching(self._query)), self._sort))
+
+    async def explain(self) -> dict:
+        """The plan the query runs with, shaped like MongoDB's ``explain()`` output."""
+        return {"queryPlanner": {
+            "namespace": self._collection.name,
+            "winningPlan": self._collection._plan(self._query, self._sort)
+        }}
+
+    def _iter_docs(self, length=None):
+        limit = self._limit
+        if length is not None and (not limit or length < limit):
+            limit = length
+        docs = itertools.islice(self._ordered_docs(), self._skip, self._skip + limit if limit else None)
+        for doc in docs:
+            yield _project(doc, self._projection)
+
+    async def to_list(self, length=None):
+        return list(self._iter_docs(length))
+
+    def __aiter__(self):
+        return self._aiter()
+
+    async def _aiter(self):
+        for doc in self._iter_docs():
+            yield doc
+
+
+class MockCollection:
+    def __init__(self, name: str):
+        self.name = name
+        self.indexes = {}
+        self._docs = {}
+        self._seq = itertools.count()
+        # field -> {value: {key: None}}; dicts keep insertion order and delete in O(1)
+        self._hash = {}
+        # (group field, sort field) -> {group value: sorted [(sort key, key)]}
+        self._sorted = {}
+        self._unique = []
+        self._text = None
+        self._text_name = None
+
+    # ---- indexes ----
+
+    def _index_add(self, key: int, doc: dict):
+        for field, index in self._hash.items():
+            for value in _index_values(doc.get(field)):
+                index.setdefault(value, {})[key] = None
+        for (group_field, sort_field), groups in self._sorted.items():
+            group = doc.get(group_field)
+            if isinstance(group, _HASHABLE):
+                bisect.insort(groups.setdefault(group, []), (_sort_key(doc.get(sort_field)), key))
+        if self._text is not None:
+            self._text.add(key, doc)
+
+    def _index_remove(self, key: int, doc: dict):
+        for field, index in self._hash.items():
+            for value in _index_values(doc.get(field)):
+                bucket = index.get(value)
+                if bucket is not None:
+                    bucket.pop(key, None)
+                    if not bucket:
+                        del index[value]
+        for (group_field, sort_field), groups in self._sorted.items():
+            group = doc.get(group_field)
+            entries = groups.get(group) if isinstance(group, _HASHABLE) else None
+            if entries:
+                entry = (_sort_key(doc.get(sort_field)), key)
+                i = bisect.bisect_left(entries, entry)
+                if i < len(entries) and entries[i] == entry:
+                    del entries[i]
+                if not entries:
+                    del groups[group]
+        if self._text is not None:
+            self._text.remove(key)
+
+    def _check_unique(self, doc: dict):
+        for name, fields, partial in self._unique:
+            if partial is not None and not matches(doc, partial):
+                continue
+            for key in self._hash[fields[0]].get(doc.get(fields[0]), _EMPTY):
+                other = self._docs[key]
+                if partial is not None and not matches(other, partial):
+                    continue
+                if all(other.get(f) == doc.get(f) for f in fields):
+                    raise DuplicateKeyError(
+                        f"E11000 duplicate key error collection: {self.name} index: {name}"
+                    )
+
+    def _add_hash(self, field: str):
+        if field in self._hash:
+            return
+        index = self._hash[field] = {}
+        for key, doc in self._docs.items():
+            for value in _index_values(doc.get(field)):
+                index.setdefault(value, {})[key] = None
+
+    def _add_sorted(self, group_field: str, sort_field: str):
+        if (group_field, sort_field) in self._sorted:
+            return
+        groups = self._sorted[(group_field, sort_field)] = {}
+        for key, doc in self._docs.items():
+            group = doc.get(group_field)
+            if isinstance(group, _HASHABLE):
+                groups.setdefault(group, []).append((_sort_key(doc.get(sort_field)), key))
+        for entries in groups.values():
+            entries.sort()
+
+    async def create_index(self, keys, name=None, unique=False, partialFilterExpression=None, **kwargs):
+        if isinstance(keys, str):
+            keys = [(keys, 1)]
+        keys = list(keys)
+        name = name or "_".join(f"{k}_{d}" for k, d in keys)
+        if name in self.indexes:
+            return name
+        if any(d == "text" for _, d in keys):
+            return self._create_text_index(keys, name, kwargs.get("weights") or {})
+        fields = tuple(k for k, _ in keys)
+        self._add_hash(fields[0])
+        if len(fields) > 1:
+            self._add_sorted(fields[0], fields[1])
+        if unique:
+            seen = set()
+            for doc in self._docs.values():
+                if partialFilterExpression is not None and not matches(doc, partialFilterExpression):
+                    continue
+                values = tuple(doc.get(f) for f in fields)
+                if values in seen:
+                    raise DuplicateKeyError(
+                        f"E11000 duplicate key error collection: {self.name} index: {name}"
+                    )
+                seen.add(values)
+            self._unique.append((name, fields, partialFilterExpression))
+        self.indexes[name] = {"key": keys, "unique": unique}
+        return name
+
+    async def drop_index(self, name: str):
+        if name not in self.indexes:
+            raise OperationFailure(f"index not found with name [{name}]", code=27)
+        del self.indexes[name]
+        self._unique = [entry for entry in self._unique if entry[0] != name]
+        if name == self._text_name:
+            self._text = self._text_name = None
+        # Drop the access paths no remaining index declares
+        hashed, sorted_pairs = set(), set()
+        for name, spec in self.indexes.items():
+            if name == self._text_name:
+                continue
+            fields = _leading_fields(spec["key"])
+            hashed.add(fields[0])
+            if len(fields) > 1:
+                sorted_pairs.add(fields[:2])
+        for field in set(self._hash) - hashed:
+            del self._hash[field]
+        for pair in set(self._sorted) - sorted_pairs:
+            del self._sorted[pair]
+
+    def _create_text_index(self, keys, name, weights: dict):
+        if self._text is not None:
+            raise OperationFailure("only one text index per collection allowed")
+        self._text = InvertedIndex({k: float(weights.get(k, 1)) for k, d in keys if d == "text"})
+        self._text_name = name
+        for key, doc in self._docs.items():
+            self._text.add(key, doc)
+        # Equality prefix fields are checked on each match, as the index stores them per entry
+        self.indexes[name] = {"key": keys, "weights": weights}
+        return name
+
+    # ---- query planning ----
+
+    def _access(self, query: dict):
+        """(field, keys) for the smallest hash bucket that covers the query, or (None, None) for a full scan."""
+        best_field, best = None, None
+        for field, cond in query.items():
+            index = self._hash.get(field)
+            if index is None:
+                continue
+            if _is_operator_dict(cond):
+                if set(cond) != {"$in"}:
+                    continue
+                keys = {}
+                for value in cond["$in"]:
+                    if isinstance(value, _HASHABLE):
+                        keys.update(index.get(value, _EMPTY))
+            elif isinstance(cond, _HASHABLE):
+                keys = index.get(cond, _EMPTY)
+            else:
+                continue
+            if best is None or len(keys) < len(best):
+                best_field, best = field, keys
+        return best_field, best
+
+    def _candidates(self, query: dict):
+        return self._access(query)[1]
+
+    def _sorted_path(self, query: dict, sort: list):
+        """The (group field, sort field) index that serves ``sort`` for ``query``, if any."""
+        field = sort[0][0]
+        for group_field, sort_field in self._sorted:
+            if sort_field != field:
+                continue
+            group = query.get(group_field, _MISSING)
+            if group is _MISSING or _is_operator_dict(group) or not isinstance(group, _HASHABLE):
+                continue
+            return group_field, sort_field
+        return None
+
+    def _index_name(self, fields: tuple, query: dict) -> str:
+        """Name of the declared index starting with ``fields`` that pins most of the query."""
+        best, best_prefix = None, -1
+        for name, spec in self.indexes.items():
+            leading = _leading_fields(spec["key"])
+            if leading[:len(fields)] != fields or name == self._text_name:
+                continue
+            prefix = next((i for i, f in enumerate(leading) if f not in query), len(leading))
+            if prefix > best_prefix:
+                best, best_prefix = name, prefix
+        return best
+
+    def _plan(self, query: dict, sort: list = None) -> dict:
+        if "$text" in query:
+            return {"stage": "TEXT_MATCH", "inputStage": {"stage": "IXSCAN", "indexName": self._text_name}}
+        path = self._sorted_path(query, sort) if sort else None
+        if path is not None:
+            return {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": self._index_name(path, query)}}
+        field, _ = self._access(query)
+        if field is None:
+            plan = {"stage": "COLLSCAN"}
+        else:
+            plan = {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": self._index_name((field,), query)}}
+        return {"stage": "SORT", "inputStage": plan} if sort else plan
+
+    def _iter_matching(self, query: dict):
+        if "$text" in query:
+            return self._iter_text(query)
+        candidates = self._candidates(query)
+        docs = self._docs
+        if candidates is None:
+            items = docs.values()
+        else:
+            items = (docs[key] for key in candidates)
+        return (doc for doc in items if matches(doc, query))
+
+    def _iter_text(self, query: dict):
+        """Docs matching a ``$text`` query, each a shallow copy carrying its score."""
+        if self._text is None:
+            raise OperationFailure("text index required for $text query")
+        rest = {k: v for k, v in query.items() if k != "$text"}
+        docs = self._docs
+        scores = self._text.search(query["$text"]["$search"], docs.__getitem__)
+        for key, score in scores.items():
+            doc = docs[key]
+            if matches(doc, rest):
+                yield {**doc, _TEXT_SCORE: score}
+
+    def _iter_sorted(self, query: dict, sort: list):
+        """Walk a sorted index for the first sort key if the query pins its group field.
+
+        Further sort keys only break ties, so runs of equal first-key values
+        are sorted on their own as they are reached.
+        """
+        path = self._sorted_path(query, sort)
+        if path is None:
+            return None
+        entries = self._sorted[path].get(query[path[0]], ())
+        ordered = reversed(entries) if sort[0][1] == -1 else iter(entries)
+        if len(sort) == 1:
+            docs = self._docs
+            return (docs[key] for _, key in ordered if matches(docs[key], query))
+        return self._iter_runs(ordered, query, sort[1:])
+
+    def _iter_runs(self, entries, query: dict, tiebreak: list):
+        run, run_key = [], _MISSING
+        for sort_value, key in entries:
+            doc = self._docs[key]
+            if not matches(doc, query):
+                continue
+            if sort_value != run_key:
+                yield from _sort_docs(run, tiebreak)
+                run, run_key = [], sort_value
+            run.append(doc)
+        yield from _sort_docs(run, tiebreak)
+
+    def _first_key(self, query: dict):
+        candidates = self._candidates(query)
+        keys = self._docs.keys() if candidates is None else candidates
+        for key in keys:
+            if matches(self._docs[key], query):
+                return key
+        return None
+
+    def _matching_keys(self, query: dict) -> list:
+        candidates = self._candidates(query)
+        keys = self._docs.keys() if candidates is None else candidates
+        return [key for key in keys if matches(self._docs[key], query)]
+
+    # ---- reads ----
+
+    async def find_one(self, query: dict, projection: dict = None):
+        key = self._first_key(query)
+        if key is None:
+            return None
+        return _project(self._docs[key], projection)
+
+    def find(self, query: dict = None, projection: dict = None):
+        return MockCursor(self, query or {}, projection)
+
+    async def count_documents(self, query: dict):
+        return sum(1 for _ in self._iter_matching(query))
+
+    # ---- writes ----
+
+    def _insert(self, doc: dict):
+        if "_id" not in doc:
+            doc["_id"] = ObjectId()
+        stored = _clone(doc)
+        self._check_unique(stored)
+        key = next(self._seq)
+        self._docs[key] = stored
+        self._index_add(key, stored)
+        return key
+
+    async def insert_one(self, doc: dict):
+        self._insert(doc)
+        return SimpleNamespace(acknowledged=True, inserted_id=doc["_id"])
+
+    async def insert_many(self, docs: list, ordered: bool = True):
+        for doc in docs:
+            self._insert(doc)
+        return SimpleNamespace(acknowledged=True, inserted_ids=[doc["_id"] for doc in docs])
+
+    def _update_key(self, key: int, update: dict):
+        doc = self._docs[key]
+        updated = _clone(doc)
+        apply_update(updated, update)
+        self._index_remove(key, doc)
+        try:
+            self._check_unique(updated)
+        except DuplicateKeyError:
+            self._index_add(key, doc)
+            raise
+        self._docs[key] = updated
+        self._index_add(key, updated)
+        return updated != doc
+
+    def _upsert(self, query: dict, update: dict) -> int:
+        doc = {k: v for k, v in query.items() if not k.startswith("$") and not _is_operator_dict(v)}
+        apply_update(doc, update, inserting=True)
+        return self._insert(doc)
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False):
+        key = self._first_key(query)
+        if key is None:
+            upserted_id = self._docs[self._upsert(query, update)]["_id"] if upsert else None
+            return SimpleNamespace(acknowledged=True, matched_count=0, modified_count=0, upserted_id=upserted_id)
+        modified = self._update_key(key, update)
+        return SimpleNamespace(acknowledged=True, matched_count=1, modified_count=int(modified), upserted_id=None)
+
+    async def update_many(self, query: dict, update: dict, upsert: bool = False):
+        keys = self._matching_keys(query)
+        if not keys:
+            upserted_id = self._docs[self._upsert(query, update)]["_id"] if upsert else None
+            return SimpleNamespace(acknowledged=True, matched_count=0, modified_count=0, upserted_id=upserted_id)
+        modified = sum(1 for key in keys if self._update_key(key, update))
+        return SimpleNamespace(acknowledged=True, matched_count=len(keys), modified_count=modified, upserted_id=None)
+
+    async def find_one_and_update(
+        self,
+        query: dict,
+        update: dict,
+        projection: dict = None,
+        upsert: bool = False,
+        return_document: bool = False,
+        **kwargs
+    ):
+        """``return_document`` follows pymongo's ReturnDocument: True means AFTER."""
+        key = self._first_key(query)
+        if key is None:
+            if not upsert:
+                return None
+            key = self._upsert(query, update)
+            return _project(self._docs[key], projection) if return_document else None
+        before = self._docs[key]
+        self._update_key(key, update)
+        return _project(self._docs[key] if return_document else before, projection)
+
+    def _delete_key(self, key: int):
+        self._index_remove(key, self._docs.pop(key))
+
+    async def delete_one(self, query: dict):
+        key = self._first_key(query)
+        if key is None:
+            return SimpleNamespace(acknowledged=True, deleted_count=0)
+        self._delete_key(key)
+        return SimpleNamespace(acknowledged=True, deleted_count=1)
+
+    async def find_one_and_delete(self, query: dict, projection: dict = None, **kwargs):
+        key = self._first_key(query)
+        if key is None:
+            return None
+        doc = self._docs[key]
+        self._delete_key(key)
+        return _project(doc, projection)
+
+    async def delete_many(self, query: dict):
+        keys = self._matching_keys(query)
+        for key in keys:
+            self._delete_key(key)
+        return SimpleNamespace(acknowledged=True, deleted_count=len(keys))
+
+
+class MockDB:
+    """Collections are created on first access, like MongoDB."""
+
+    def __init__(self):
+        self._collections = {}
+
+    def __getitem__(self, name: str) -> MockCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = MockCollection(name)
+        return collection
+
+    def __getattr__(self, name: str) -> MockCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
@@ -0,0 +1,165 @@
+"""Request rate limits and daily LLM usage quotas.
+
+* ``RateLimiter`` - named token buckets kept in the shared state and keyed
+  by user id or client IP. A bucket holds ``burst`` requests and refills at
+  ``per_minute``; with the SQLite backend every worker on a host draws from
+  the same bucket.
+* ``UsageMeter`` - estimated LLM tokens and cost per user per UTC day in a
+  collection. Recording is one upserting ``$inc``, so concurrent calls never
+  lose an update and no read is needed to record.
+
+Both answer an allowed request with headers describing the remaining
+budget (``X-RateLimit-*`` and ``X-Quota-*``) and reject with
+``LimitExceeded``, which carries the 429, ``Retry-After`` and the same
+headers for the API to return.
+"""
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Dict, NamedTuple
+
+from pymongo import ReturnDocument
+
+
+class LimitExceeded(Exception):
+    status_code = 429
+
+    def __init__(self, limit: str, detail: str, retry_after: int, headers: Dict[str, str]):
+        super().__init__(detail)
+        self.limit = limit
+        self.detail = detail
+        self.retry_after = retry_after
+        self.headers = {**headers, "Retry-After": str(retry_after)}
+
+
+class RateLimit(NamedTuple):
+    per_minute: float
+    burst: float
+
+
+class RateLimiter:
+    def __init__(self, state, limits: Dict[str, RateLimit], enabled: bool = True):
+        self.state = state
+        self.limits = limits
+        self.enabled = enabled
+        self.allowed = {name: 0 for name in limits}
+        self.rejected = {name: 0 for name in limits}
+
+    async def hit(self, name: str, key: str) -> Dict[str, str]:
+        """Spend one request from bucket ``name`` for ``key``; raises ``LimitExceeded`` when empty."""
+        if not self.enabled:
+            return {}
+        limit = self.limits[name]
+        result = await self.state.take(f"rate:{name}:{key}", limit.burst, limit.per_minute / 60)
+        headers = {
+            "X-RateLimit-Limit": str(int(limit.burst)),
+            "X-RateLimit-Remaining": str(int(result.remaining)),
+            "X-RateLimit-Reset": str(math.ceil(result.full_after))
+        }
+        if not result.allowed:
+            self.rejected[name] += 1
+            raise LimitExceeded(name, "Too many requests, please slow down", max(1, math.ceil(result.retry_after)), headers)
+        self.allowed[name] += 1
+        return headers
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "limits": {name: limit._asdict() for name, limit in self.limits.items()},
+            "allowed": dict(self.allowed),
+            "rejected": dict(self.rejected)
+        }
+
+
+def utc_day(now: datetime = None) -> str:
+    return (now or datetime.now(timezone.utc)).strftime("%Y-%m-%d")
+
+
+def seconds_until_next_day(now: datetime = None) -> int:
+    now = now or datetime.now(timezone.utc)
+    tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return max(1, math.ceil((tomorrow - now).total_seconds()))
+
+
+class UsageMeter:
+    """Daily per-user LLM usage; a quota of 0 is not enforced."""
+
+    def __init__(
+        self,
+        collection,
+        daily_tokens: int,
+        daily_cost: float,
+        input_cost_per_1k: float,
+        output_cost_per_1k: float
+    ):
+        self.collection = collection
+        self.daily_tokens = daily_tokens
+        self.daily_cost = daily_cost
+        self.input_cost_per_1k = input_cost_per_1k
+        self.output_cost_per_1k = output_cost_per_1k
+        self.rejected = 0
+        self.recorded = 0
+
+    def cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        return (prompt_tokens * self.input_cost_per_1k + completion_tokens * self.output_cost_per_1k) / 1000
+
+    async def usage(self, user_id: str) -> dict:
+        day = utc_day()
+        usage = await self.collection.find_one({"user_id": user_id, "day": day}, {"_id": 0})
+        return usage or {
+            "user_id": user_id, "day": day, "requests": 0,
+            "prompt_tokens": 0, "completion_tokens": 0, "tokens": 0, "cost_usd": 0.0
+        }
+
+    def headers(self, usage: dict) -> Dict[str, str]:
+        headers = {}
+        if self.daily_tokens:
+            headers["X-Quota-Tokens-Limit"] = str(self.daily_tokens)
+            headers["X-Quota-Tokens-Remaining"] = str(max(0, self.daily_tokens - usage["tokens"]))
+        if self.daily_cost:
+            headers["X-Quota-Cost-Limit"] = f"{self.daily_cost:.4f}"
+            headers["X-Quota-Cost-Remaining"] = f"{max(0.0, self.daily_cost - usage['cost_usd']):.4f}"
+        if headers:
+            headers["X-Quota-Reset"] = str(seconds_until_next_day())
+        return headers
+
+    def exhausted(self, usage: dict) -> bool:
+        return bool(
+            (self.daily_tokens and usage["tokens"] >= self.daily_tokens)
+            or (self.daily_cost and usage["cost_usd"] >= self.daily_cost)
+        )
+
+    async def check(self, user_id: str) -> Dict[str, str]:
+        """Quota headers for ``user_id``; raises ``LimitExceeded`` once today's quota is spent."""
+        if not self.daily_tokens and not self.daily_cost:
+            return {}
+        usage = await self.usage(user_id)
+        headers = self.headers(usage)
+        if self.exhausted(usage):
+            self.rejected += 1
+            raise LimitExceeded("quota", "Daily LLM quota exhausted", seconds_until_next_day(), headers)
+        return headers
+
+    async def record(self, user_id: str, prompt_tokens: int, completion_tokens: int) -> dict:
+        """Add one LLM call to today's usage and return the new totals."""
+        self.recorded += 1
+        return await self.collection.find_one_and_update(
+            {"user_id": user_id, "day": utc_day()},
+            {"$inc": {
+                "requests": 1,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "tokens": prompt_tokens + completion_tokens,
+                "cost_usd": self.cost(prompt_tokens, completion_tokens)
+            }},
+            projection={"_id": 0},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+
+    def stats(self) -> dict:
+        return {
+            "daily_tokens": self.daily_tokens,
+            "daily_cost_usd": self.daily_cost,
+            "recorded": self.recorded,
+            "rejected": self.rejected
+        }
@@ -0,0 +1,210 @@
+"""Content-addressed cache for LLM completions.
+
+The same Slack thread or email often gets pasted into the chat more than
+once. ``ResponseCache`` keys completions by a hash of the system prompt, the
+model and the normalized user message, so a repeat paste is answered without
+another provider call. Entries expire after a TTL and the backend bounds
+how many are kept. Concurrent misses for the same key share one call.
+
+Backends implement ``get``/``set``/``size``/``clear``:
+
+* ``MemoryCacheBackend`` - per-process TTL/LRU cache (the default);
+* ``FileCacheBackend`` - JSON files in a local directory, shared by every
+  worker on the host and kept across restarts.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from cachetools import TTLCache
+
+_WHITESPACE = re.compile(r"[ \t]+")
+
+
+def normalize_message(text: str) -> str:
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(_WHITESPACE.sub(" ", line).strip() for line in lines).strip()
+
+
+def cache_key(system_prompt: str, model: str, message: str) -> str:
+    digest = hashlib.sha256()
+    for part in (system_prompt, model, normalize_message(message)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class CacheBackend:
+    async def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: str):
+        raise NotImplementedError
+
+    def size(self) -> int:
+        raise NotImplementedError
+
+    async def clear(self):
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    def __init__(self, max_entries: int, ttl: float):
+        self._cache = TTLCache(maxsize=max_entries, ttl=ttl)
+
+    async def get(self, key: str) -> Optional[str]:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: str):
+        self._cache[key] = value
+
+    def size(self) -> int:
+        return len(self._cache)
+
+    async def clear(self):
+        self._cache.clear()
+
+
+class FileCacheBackend(CacheBackend):
+    """One JSON file per entry under ``directory``; oldest files are evicted first."""
+
+    def __init__(self, directory: Path, max_entries: int, ttl: float):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._count = sum(1 for _ in self.directory.glob("*.json"))
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _read(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if entry["expires_at"] < time.time():
+            path.unlink(missing_ok=True)
+            return None
+        return entry["value"]
+
+    def _write(self, key: str, value: str):
+        path = self._path(key)
+        existed = path.exists()
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"expires_at": time.time() + self.ttl, "value": value}), encoding="utf-8")
+        os.replace(tmp, path)
+        if not existed:
+            self._count += 1
+        if self._count > self.max_entries:
+            self._evict()
+
+    def _evict(self):
+        files = sorted(self.directory.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        # Drop a tenth at a time so eviction is not paid on every write
+        excess = len(files) - self.max_entries + max(1, self.max_entries // 10)
+        for path in files[:max(0, excess)]:
+            path.unlink(missing_ok=True)
+        self._count = len(files) - max(0, excess)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self._read, key)
+
+    async def set(self, key: str, value: str):
+        await asyncio.to_thread(self._write, key, value)
+
+    def size(self) -> int:
+        return self._count
+
+    async def clear(self):
+        def _clear():
+            for path in self.directory.glob("*.json"):
+                path.unlink(missing_ok=True)
+            self._count = 0
+        await asyncio.to_thread(_clear)
+
+
+class ResponseCache:
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._inflight = {}
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: str):
+        await self.backend.set(key, value)
+
+    async def fill(self, key: str, fn: Callable[[], Awaitable[str]]) -> str:
+        """Run ``fn`` after a miss and store its result.
+
+        Concurrent misses for the same key wait on the first caller's call
+        instead of starting their own, and count as hits. The call runs in
+        its own task, so a caller that is cancelled (say, its client went
+        away) does not cancel it for the others; if the shared call itself
+        is cancelled, the remaining callers start a new one.
+        """
+        joined = False
+        while True:
+            task = self._inflight.get(key)
+            if task is None or task.done():
+                task = asyncio.ensure_future(self._call_and_store(key, fn))
+                self._inflight[key] = task
+                task.add_done_callback(lambda done: self._call_done(key, done))
+            elif not joined:
+                joined = True
+                self.hits += 1
+                self.misses -= 1
+            try:
+                return await asyncio.shield(task)
+            except asyncio.CancelledError:
+                if not task.cancelled():
+                    # This caller was cancelled; the call carries on for the rest
+                    raise
+
+    async def _call_and_store(self, key: str, fn: Callable[[], Awaitable[str]]) -> str:
+        value = await fn()
+        await self.set(key, value)
+        return value
+
+    def _call_done(self, key: str, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Every caller may have been cancelled; don't log the error as never retrieved
+            task.exception()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": self.backend.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+def create_response_cache(backend: str, max_entries: int, ttl: float, directory: Path) -> Optional[ResponseCache]:
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return ResponseCache(MemoryCacheBackend(max_entries, ttl))
+    if backend == "file":
+        return ResponseCache(FileCacheBackend(directory, max_entries, ttl))
+    raise ValueError(f"Unknown response cache backend: {backend}")
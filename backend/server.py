@@ -1,17 +1,49 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
 import os
+import json
+from contextlib import asynccontextmanager
+import base64
+import functools
+import hashlib
 import logging
+import math
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional
+from typing import Dict, List, Optional
 import uuid
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 import jwt
 import bcrypt
+import httpx
+from cachetools import TTLCache
+
+from blob_store import BlobStore
+from brief_dedup import DEDUP_FIELDS, best_match, fingerprint
+from brief_parser import DEFAULT_TITLE, BriefParser, contains_brief, parse_briefs
+from compression import CompressionMiddleware
+from context_builder import MESSAGE_OVERHEAD_TOKENS, ContextBuilder, estimate_tokens
+from emergentintegrations.llm.chat import UserMessage
+from export_adapters import ExportError, ExportResult, create_export_adapters
+from fast_json import DocumentShaper, json_response
+from job_queue import CollectionJobStore, JobQueue, MemoryJobStore, PermanentJobError
+from llm_admission import AdmissionRejected, LlmAdmissionController
+from llm_client import LlmClientRegistry
+from message_store import append_messages, read_messages
+from metrics import CONTENT_TYPE, EventLoopMonitor, InstrumentedDatabase, MetricsMiddleware, Registry
+from rate_limit import LimitExceeded, RateLimit, RateLimiter, UsageMeter, seconds_until_next_day
+from response_cache import cache_key, create_response_cache
+from shared_state import create_shared_state
+from text_search import parse_search, snippet
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -20,100 +52,178 @@ load_dotenv(ROOT_DIR / '.env')
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Metrics: per-process Prometheus text exposition served at /metrics
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+EVENT_LOOP_LAG_INTERVAL_SECONDS = float(os.environ.get('EVENT_LOOP_LAG_INTERVAL_SECONDS', '0.5'))
+
+metrics_registry = Registry()
+HTTP_REQUESTS = metrics_registry.counter(
+    "brieflyai_http_requests_total", "HTTP requests by method, route and status", ("method", "route", "status"))
+HTTP_REQUEST_SECONDS = metrics_registry.histogram(
+    "brieflyai_http_request_duration_seconds", "HTTP request latency", ("method", "route", "status"))
+HTTP_IN_FLIGHT = metrics_registry.gauge("brieflyai_http_requests_in_flight", "HTTP requests being served")
+DB_SECONDS = metrics_registry.histogram(
+    "brieflyai_db_operation_duration_seconds", "Database call latency", ("collection", "operation"))
+LLM_SECONDS = metrics_registry.histogram(
+    "brieflyai_llm_call_duration_seconds", "LLM provider call latency, per attempt", ("mode",))
+PASSWORD_HASH_SECONDS = metrics_registry.histogram(
+    "brieflyai_password_hash_duration_seconds", "bcrypt latency including pool wait", ("operation",))
+RATE_LIMITED = metrics_registry.counter(
+    "brieflyai_rate_limited_total", "Requests rejected by rate limits and quotas", ("limit",))
+CHAT_BRIEFS = metrics_registry.counter(
+    "brieflyai_chat_briefs_total", "Briefs from chat replies, inserted or revising an existing one", ("outcome",))
+BRIEF_PARSE_SECONDS = metrics_registry.histogram(
+    "brieflyai_brief_parse_duration_seconds", "Brief parsing time per reply", ("mode",),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1))
+
+# Worker processes in this deployment (uvicorn and gunicorn read WEB_CONCURRENCY too)
+WORKER_COUNT = int(os.environ.get('WEB_CONCURRENCY', '1'))
+
+# MongoDB pool, per worker process: the server sees up to WORKER_COUNT x MONGO_MAX_POOL_SIZE connections
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '0'))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '0')) or None
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '0')) or None
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '30000'))
+
 # MongoDB connection
 use_mock_db = os.environ.get('USE_MOCK_DB', 'false').lower() == 'true'
 
-if use_mock_db:
-    logger.info("Using Mock Database (In-Memory)")
-    class MockCursor:
-        def __init__(self, data):
-            self.data = data
-        def sort(self, key, direction):
-            reverse = direction == -1
-            self.data.sort(key=lambda x: x.get(key, ""), reverse=reverse)
-            return self
-        async def to_list(self, length):
-            return self.data[:length]
-
-    class MockCollection:
-        def __init__(self):
-            self.data = []
-        async def find_one(self, query, projection=None):
-            for doc in self.data:
-                match = True
-                for k, v in query.items():
-                    if doc.get(k) != v:
-                        match = False
-                        break
-                if match:
-                    return doc
-            return None
-        async def insert_one(self, doc):
-            self.data.append(doc)
-            return True
-        def find(self, query, projection=None):
-            results = []
-            for doc in self.data:
-                match = True
-                for k, v in query.items():
-                    if doc.get(k) != v:
-                        match = False
-                        break
-                if match:
-                    results.append(doc)
-            return MockCursor(results)
-        async def update_one(self, query, update):
-            doc = await self.find_one(query)
-            if doc:
-                if "$set" in update:
-                    doc.update(update["$set"])
-                if "$push" in update:
-                    for k, v in update["$push"].items():
-                        if k not in doc: doc[k] = []
-                        if "$each" in v:
-                            doc[k].extend(v["$each"])
-                        else:
-                            doc[k].append(v)
-                return type('obj', (object,), {'matched_count': 1})
-            return type('obj', (object,), {'matched_count': 0})
-        async def delete_one(self, query):
-            doc = await self.find_one(query)
-            if doc:
-                self.data.remove(doc)
-                return type('obj', (object,), {'deleted_count': 1})
-            return type('obj', (object,), {'deleted_count': 0})
-
-    class MockDB:
-        def __init__(self):
-            self.users = MockCollection()
-            self.briefs = MockCollection()
-            self.conversations = MockCollection()
-
-    db = MockDB()
-    client = None
-else:
-    mongo_url = os.environ['MONGO_URL']
-    client = AsyncIOMotorClient(mongo_url)
-    db = client[os.environ['DB_NAME']]
+def connect_database() -> tuple:
+    """(client, db) for one app; client is None for the mock database."""
+    if use_mock_db:
+        logger.info("Using Mock Database (In-Memory)")
+        from mock_db import MockDB
+        database, mongo_client = MockDB(), None
+    else:
+        # Motor connects on first use, so each worker opens its own pool after it starts
+        mongo_client = AsyncIOMotorClient(
+            os.environ['MONGO_URL'],
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+            waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS
+        )
+        database = mongo_client[os.environ['DB_NAME']]
+    if METRICS_ENABLED:
+        database = InstrumentedDatabase(database, DB_SECONDS)
+    return mongo_client, database
 
 # JWT Configuration
 JWT_SECRET = os.environ.get('JWT_SECRET', 'brieflyai-secret')
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_HOURS = 24
 
-# Security
-security = HTTPBearer()
+# Password hashing pool: bcrypt runs off the event loop on a bounded thread pool.
+# A hash is refused with a 503 when the queue is full or its expected wait exceeds BCRYPT_MAX_WAIT_SECONDS.
+# The default leaves a core for the event loop so other requests are not starved during a login burst
+BCRYPT_MAX_WORKERS = int(os.environ.get('BCRYPT_MAX_WORKERS', str(max(1, min(4, (os.cpu_count() or 1) - 1)))))
+BCRYPT_MAX_QUEUE = int(os.environ.get('BCRYPT_MAX_QUEUE', str(2 * BCRYPT_MAX_WORKERS)))
+BCRYPT_MAX_WAIT_SECONDS = float(os.environ.get('BCRYPT_MAX_WAIT_SECONDS', '1'))
 
-app = FastAPI(title="BrieflyAI API")
+# Verified-principal cache: skips the users lookup for recently seen users
+PRINCIPAL_CACHE_SIZE = int(os.environ.get('PRINCIPAL_CACHE_SIZE', '10000'))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.environ.get('PRINCIPAL_CACHE_TTL_SECONDS', '60'))
 
-# Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# State shared by worker processes: "memory" (single worker) or "sqlite" (one file per host)
+SHARED_STATE_BACKEND = os.environ.get('SHARED_STATE_BACKEND', 'memory').lower()
+SHARED_STATE_PATH = Path(os.environ.get('SHARED_STATE_PATH', str(ROOT_DIR / '.shared_state.sqlite3')))
+
+# Rate limits: token buckets per user on LLM routes and per client IP on auth routes
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+RATE_LIMIT_CHAT_PER_MINUTE = float(os.environ.get('RATE_LIMIT_CHAT_PER_MINUTE', '20'))
+RATE_LIMIT_CHAT_BURST = float(os.environ.get('RATE_LIMIT_CHAT_BURST', '10'))
+RATE_LIMIT_AUTH_PER_MINUTE = float(os.environ.get('RATE_LIMIT_AUTH_PER_MINUTE', '10'))
+RATE_LIMIT_AUTH_BURST = float(os.environ.get('RATE_LIMIT_AUTH_BURST', '10'))
+# Bulk ingestion takes one token per item, from its own per-user bucket so backfills leave chat alone
+RATE_LIMIT_INGEST_PER_MINUTE = float(os.environ.get('RATE_LIMIT_INGEST_PER_MINUTE', '60'))
+RATE_LIMIT_INGEST_BURST = float(os.environ.get('RATE_LIMIT_INGEST_BURST', '10'))
+
+# Daily LLM quotas per user (UTC day, 0 disables) and the prices used to estimate cost
+LLM_DAILY_TOKEN_QUOTA = int(os.environ.get('LLM_DAILY_TOKEN_QUOTA', '200000'))
+LLM_DAILY_COST_QUOTA_USD = float(os.environ.get('LLM_DAILY_COST_QUOTA_USD', '1.0'))
+LLM_INPUT_COST_PER_1K_TOKENS = float(os.environ.get('LLM_INPUT_COST_PER_1K_TOKENS', '0.00125'))
+LLM_OUTPUT_COST_PER_1K_TOKENS = float(os.environ.get('LLM_OUTPUT_COST_PER_1K_TOKENS', '0.01'))
+
+# Brief listing ETags: bounds how long writes from outside the shared state go unnoticed
+BRIEF_ETAG_TTL_SECONDS = float(os.environ.get('BRIEF_ETAG_TTL_SECONDS', '5'))
+
+# Chat brief deduplication: a draft at least this similar (shingle Jaccard) to a brief from the same
+# conversation revises it. A nonzero cross threshold also lets a same-titled, unexported brief from
+# another conversation be revised (content only) when the draft is at least that similar. Cross matching
+# is off by default, as briefs with the same title in different conversations are often meant to be
+# separate; bands are stored on every brief regardless, so turning it on covers existing briefs at once
+BRIEF_DEDUP_ENABLED = os.environ.get('BRIEF_DEDUP_ENABLED', 'true').lower() == 'true'
+BRIEF_DEDUP_THRESHOLD = float(os.environ.get('BRIEF_DEDUP_THRESHOLD', '0.5'))
+BRIEF_DEDUP_CROSS_THRESHOLD = float(os.environ.get('BRIEF_DEDUP_CROSS_THRESHOLD', '0'))
+BRIEF_DEDUP_MAX_CANDIDATES = int(os.environ.get('BRIEF_DEDUP_MAX_CANDIDATES', '50'))
+
+# Large source text: at least this many bytes moves to the blobs collection (zlib) behind a preview; 0 disables
+LARGE_TEXT_THRESHOLD_BYTES = int(os.environ.get('LARGE_TEXT_THRESHOLD_BYTES', '4096'))
+LARGE_TEXT_PREVIEW_CHARS = int(os.environ.get('LARGE_TEXT_PREVIEW_CHARS', '500'))
+LARGE_TEXT_COMPRESSION_LEVEL = int(os.environ.get('LARGE_TEXT_COMPRESSION_LEVEL', '6'))
+
+# HTTP response compression for clients that accept gzip
+GZIP_ENABLED = os.environ.get('GZIP_ENABLED', 'true').lower() == 'true'
+GZIP_MINIMUM_SIZE = int(os.environ.get('GZIP_MINIMUM_SIZE', '1024'))
+GZIP_COMPRESSION_LEVEL = int(os.environ.get('GZIP_COMPRESSION_LEVEL', '5'))
+
+# LLM client: one pooled HTTP client and an LRU of chat sessions per process
+LLM_PROVIDER = os.environ.get('LLM_PROVIDER', 'openai')
+LLM_MODEL = os.environ.get('LLM_MODEL', 'gpt-5.2')
+LLM_SESSION_CACHE_SIZE = int(os.environ.get('LLM_SESSION_CACHE_SIZE', '1000'))
+LLM_MAX_CONNECTIONS = int(os.environ.get('LLM_MAX_CONNECTIONS', '100'))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get('LLM_MAX_KEEPALIVE_CONNECTIONS', '20'))
+
+# LLM admission control: concurrency caps, bounded queue, deadlines, retries, breaker
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', '32'))
+LLM_MAX_CONCURRENCY_PER_USER = int(os.environ.get('LLM_MAX_CONCURRENCY_PER_USER', '2'))
+LLM_MAX_QUEUE = int(os.environ.get('LLM_MAX_QUEUE', '64'))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.environ.get('LLM_QUEUE_TIMEOUT_SECONDS', '5'))
+LLM_TIMEOUT_SECONDS = float(os.environ.get('LLM_TIMEOUT_SECONDS', '60'))
+LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', '2'))
+LLM_BREAKER_THRESHOLD = int(os.environ.get('LLM_BREAKER_THRESHOLD', '5'))
+LLM_BREAKER_RESET_SECONDS = float(os.environ.get('LLM_BREAKER_RESET_SECONDS', '30'))
+# Background work waits out rejections for at most this long before its job fails
+LLM_BACKGROUND_MAX_WAIT_SECONDS = float(os.environ.get('LLM_BACKGROUND_MAX_WAIT_SECONDS', '120'))
+
+# LLM response cache: backend is "memory", "file" or "none"
+RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'memory').lower()
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', '10000'))
+RESPONSE_CACHE_TTL_SECONDS = float(os.environ.get('RESPONSE_CACHE_TTL_SECONDS', '86400'))
+RESPONSE_CACHE_DIR = Path(os.environ.get('RESPONSE_CACHE_DIR', str(ROOT_DIR / '.response_cache')))
+
+# Chat context: token budget for system prompt + summary + recent turns + message
+CONTEXT_TOKEN_BUDGET = int(os.environ.get('CONTEXT_TOKEN_BUDGET', '4000'))
+CONTEXT_MAX_TURNS = int(os.environ.get('CONTEXT_MAX_TURNS', '20'))
+CONTEXT_SUMMARY_TOKENS = int(os.environ.get('CONTEXT_SUMMARY_TOKENS', '500'))
+
+# Bulk ingestion
+INGEST_MAX_ITEMS = int(os.environ.get('INGEST_MAX_ITEMS', '500'))
+INGEST_MAX_PARALLEL = int(os.environ.get('INGEST_MAX_PARALLEL', '2'))
+INGEST_WRITE_BATCH = int(os.environ.get('INGEST_WRITE_BATCH', '50'))
+INGEST_PROGRESS_INTERVAL_SECONDS = float(os.environ.get('INGEST_PROGRESS_INTERVAL_SECONDS', '0.5'))
+
+# Background jobs: store is "memory" or "mongo" (the jobs collection)
+JOB_QUEUE_BACKEND = os.environ.get('JOB_QUEUE_BACKEND', 'memory').lower()
+JOB_QUEUE_CONCURRENCY = int(os.environ.get('JOB_QUEUE_CONCURRENCY', '4'))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '3'))
+JOB_RETRY_BACKOFF_SECONDS = float(os.environ.get('JOB_RETRY_BACKOFF_SECONDS', '1'))
+
+# Export destination API; unset keeps exports in demo mode
+EXPORT_DESTINATION_URL = os.environ.get('EXPORT_DESTINATION_URL', '').rstrip('/')
+EXPORT_TIMEOUT_SECONDS = float(os.environ.get('EXPORT_TIMEOUT_SECONDS', '30'))
+# Per destination: pooled connections, requests in flight, pacing (0 = unpaced) and 429 handling
+EXPORT_MAX_CONNECTIONS = int(os.environ.get('EXPORT_MAX_CONNECTIONS', '10'))
+EXPORT_MAX_CONCURRENCY = int(os.environ.get('EXPORT_MAX_CONCURRENCY', '4'))
+EXPORT_REQUESTS_PER_SECOND = float(os.environ.get('EXPORT_REQUESTS_PER_SECOND', '0'))
+EXPORT_MAX_RETRIES = int(os.environ.get('EXPORT_MAX_RETRIES', '3'))
+EXPORT_MAX_RETRY_AFTER_SECONDS = float(os.environ.get('EXPORT_MAX_RETRY_AFTER_SECONDS', '30'))
+EXPORT_BATCH_MAX_ITEMS = int(os.environ.get('EXPORT_BATCH_MAX_ITEMS', '500'))
+
+# Security
+security = HTTPBearer()
 
 api_router = APIRouter(prefix="/api")
 
@@ -134,6 +244,10 @@ class UserResponse(BaseModel):
     email: str
     name: str
     created_at: str
+    response_cache: bool = True
+
+class UserPreferences(BaseModel):
+    response_cache: Optional[bool] = None
 
 class TokenResponse(BaseModel):
     access_token: str
@@ -176,12 +290,58 @@ class BriefResponse(BaseModel):
     status: str
     created_at: str
     updated_at: str
+    version: int = 0
+    conversation_id: Optional[str] = None
+    source_content_truncated: bool = False  # source_content is a preview; GET the brief for all of it
+
+class BriefListItem(BaseModel):
+    """A brief in a listing; only the fields that were requested are present."""
+    id: str
+    user_id: Optional[str] = None
+    title: Optional[str] = None
+    objective: Optional[str] = None
+    deliverables: Optional[List[str]] = None
+    deadline: Optional[str] = None
+    owners: Optional[List[str]] = None
+    assets: Optional[List[str]] = None
+    open_questions: Optional[List[str]] = None
+    source_type: Optional[str] = None
+    source_content: Optional[str] = None
+    status: Optional[str] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    version: Optional[int] = None
+    conversation_id: Optional[str] = None
+    source_content_truncated: Optional[bool] = None
+
+class BriefVersion(BaseModel):
+    """A brief as it was before a chat revision replaced it."""
+    brief_id: str
+    version: int
+    title: str
+    objective: str
+    deliverables: List[str]
+    deadline: str
+    owners: List[str]
+    assets: List[str]
+    open_questions: List[str]
+    source_content: str
+    source_content_truncated: bool = False
+    status: str
+    conversation_id: Optional[str] = None
+    updated_at: str
+    replaced_at: str
 
 class ChatMessage(BaseModel):
     role: str
     content: str
     timestamp: Optional[str] = None
     brief_id: Optional[str] = None
+    seq: Optional[int] = None
+
+class MessagePage(BaseModel):
+    messages: List[ChatMessage]
+    next_cursor: Optional[int] = None
 
 class ChatRequest(BaseModel):
     message: str
@@ -191,6 +351,8 @@ class ChatResponse(BaseModel):
     response: str
     conversation_id: str
     brief: Optional[BriefResponse] = None
+    briefs: List[BriefResponse] = []
+    revised_brief_ids: List[str] = []  # briefs in ``briefs`` that were revised rather than created
 
 class IntegrationStatus(BaseModel):
     name: str
@@ -206,14 +368,367 @@ class ExportResponse(BaseModel):
     message: str
     export_url: Optional[str] = None
 
+class BatchExportRequest(BaseModel):
+    items: List[ExportRequest]
+
+class BatchExportItemResult(BaseModel):
+    brief_id: str
+    destination: str
+    success: bool
+    export_url: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchExportResponse(BaseModel):
+    exported: int
+    failed: int
+    results: List[BatchExportItemResult]  # in request order
+
+class SearchHit(BaseModel):
+    type: str  # brief, message
+    brief_id: Optional[str] = None
+    conversation_id: Optional[str] = None
+    seq: Optional[int] = None
+    title: Optional[str] = None
+    field: str
+    snippet: str
+    highlights: List[List[int]]  # [start, end) offsets into snippet
+    score: float
+    timestamp: Optional[str] = None
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchHit]
+    next_offset: Optional[int] = None
+
+class IngestItem(BaseModel):
+    source_content: str
+    source_type: Optional[str] = "ai"
+
+class IngestRequest(BaseModel):
+    items: List[IngestItem]
+
+class IngestItemStatus(BaseModel):
+    index: int
+    status: str  # pending, processing, done, failed
+    brief_ids: List[str] = []
+    error: Optional[str] = None
+
+class IngestJobResponse(BaseModel):
+    id: str
+    status: str  # queued, running, completed, completed_with_errors, failed, cancelled
+    total: int
+    succeeded: int
+    failed: int
+    items: List[IngestItemStatus]
+    error: Optional[str] = None
+    created_at: str
+    updated_at: str
+    finished_at: Optional[str] = None
+
+class JobResponse(BaseModel):
+    id: str
+    type: str  # chat, export, ingest
+    status: str  # queued, running, succeeded, failed
+    attempts: int
+    max_attempts: int
+    payload: dict
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: str
+    updated_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+
+class UsageResponse(BaseModel):
+    day: str  # UTC, YYYY-MM-DD
+    requests: int
+    prompt_tokens: int
+    completion_tokens: int
+    tokens: int
+    cost_usd: float
+    token_quota: Optional[int] = None
+    cost_quota_usd: Optional[float] = None
+    resets_in_seconds: int
+
 # ======================== HELPERS ========================
 
-def hash_password(password: str) -> str:
+class PasswordHasher:
+    """Runs bcrypt on a dedicated, size-limited thread pool.
+
+    At most ``max_workers`` hashes run at once and at most ``max_queue`` more
+    wait for a worker. A new hash is also refused when the hashes already
+    waiting would keep it queued longer than ``max_wait`` seconds, estimated
+    from a moving average of recent hash times. Refusals are an immediate 503
+    instead of a login that sits in the queue for seconds.
+    """
+
+    # Weight of the newest sample in the moving average of hash times
+    SMOOTHING = 0.2
+
+    def __init__(self, max_workers: int, max_queue: int, max_wait: float):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self.pending = 0
+        self.rejected = 0
+        self.hash_seconds = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.pending - self.max_workers)
+
+    def expected_wait(self) -> float:
+        """Seconds a hash submitted now would wait for a worker."""
+        ahead = self.pending - self.max_workers + 1
+        if ahead <= 0:
+            return 0.0
+        return math.ceil(ahead / self.max_workers) * self.hash_seconds
+
+    def _reject(self, retry_after: float):
+        self.rejected += 1
+        raise HTTPException(
+            status_code=503,
+            detail="Authentication service busy, please retry",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+
+    async def run(self, fn, *args):
+        if self.pending >= self.max_workers + self.max_queue:
+            self._reject(self.expected_wait())
+        wait = self.expected_wait()
+        if wait > self.max_wait:
+            self._reject(wait)
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, seconds = await loop.run_in_executor(self._executor, _timed_call, fn, *args)
+        finally:
+            self.pending -= 1
+        if self.hash_seconds:
+            self.hash_seconds += self.SMOOTHING * (seconds - self.hash_seconds)
+        else:
+            self.hash_seconds = seconds
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "max_wait_seconds": self.max_wait,
+            "in_flight": min(self.pending, self.max_workers),
+            "queue_depth": self.queue_depth,
+            "hash_seconds": round(self.hash_seconds, 4),
+            "expected_wait_seconds": round(self.expected_wait(), 4),
+            "rejected": self.rejected
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+def _timed_call(fn, *args) -> tuple:
+    """Run ``fn`` in a pool thread; returns (result, seconds it ran for)."""
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+def _bcrypt_hash(password: str) -> str:
     return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
 
-def verify_password(password: str, hashed: str) -> bool:
+def _bcrypt_check(password: str, hashed: str) -> bool:
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
+async def hash_password(hasher: PasswordHasher, password: str) -> str:
+    with PASSWORD_HASH_SECONDS.time("hash"):
+        return await hasher.run(_bcrypt_hash, password)
+
+async def verify_password(hasher: PasswordHasher, password: str, hashed: str) -> bool:
+    with PASSWORD_HASH_SECONDS.time("verify"):
+        return await hasher.run(_bcrypt_check, password, hashed)
+
+class PrincipalCache:
+    """Bounded TTL/LRU cache of projected user documents keyed by user id.
+
+    The JWT is still decoded and verified on every request; only the
+    ``users`` lookup is skipped. Call ``invalidate`` after any write to a
+    user document so the next request reloads it.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str) -> Optional[dict]:
+        user = self._cache.get(user_id)
+        if user is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return user
+
+    def set(self, user_id: str, user: dict):
+        self._cache[user_id] = user
+
+    def invalidate(self, user_id: str):
+        self._cache.pop(user_id, None)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+# ======================== RESOURCES ========================
+
+class AppResources:
+    """Everything one app holds open: database client, pools, caches and queues.
+
+    Each app's lifespan builds its own, keeps it on ``app.state.resources``
+    and closes it on the way out. Route handlers reach it through the
+    ``get_resources`` dependency, so apps sharing a process (tests, a second
+    lifespan cycle) never see each other's database, pools or queues.
+    """
+
+    def __init__(self):
+        self.client, self.db = connect_database()
+        self.shared_state = create_shared_state(SHARED_STATE_BACKEND, SHARED_STATE_PATH)
+        self.password_hasher = PasswordHasher(BCRYPT_MAX_WORKERS, BCRYPT_MAX_QUEUE, BCRYPT_MAX_WAIT_SECONDS)
+        self.principal_cache = PrincipalCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL_SECONDS)
+        self.rate_limiter = RateLimiter(
+            self.shared_state,
+            {
+                "chat": RateLimit(per_minute=RATE_LIMIT_CHAT_PER_MINUTE, burst=RATE_LIMIT_CHAT_BURST),
+                "auth": RateLimit(per_minute=RATE_LIMIT_AUTH_PER_MINUTE, burst=RATE_LIMIT_AUTH_BURST),
+                "ingest": RateLimit(per_minute=RATE_LIMIT_INGEST_PER_MINUTE, burst=RATE_LIMIT_INGEST_BURST)
+            },
+            enabled=RATE_LIMIT_ENABLED
+        )
+        self.usage_meter = UsageMeter(
+            self.db.llm_usage,
+            daily_tokens=LLM_DAILY_TOKEN_QUOTA,
+            daily_cost=LLM_DAILY_COST_QUOTA_USD,
+            input_cost_per_1k=LLM_INPUT_COST_PER_1K_TOKENS,
+            output_cost_per_1k=LLM_OUTPUT_COST_PER_1K_TOKENS
+        )
+        self.blob_store = BlobStore(
+            self.db.blobs,
+            threshold=LARGE_TEXT_THRESHOLD_BYTES,
+            preview_chars=LARGE_TEXT_PREVIEW_CHARS,
+            level=LARGE_TEXT_COMPRESSION_LEVEL
+        )
+        self.llm_clients = LlmClientRegistry(
+            api_key=os.environ.get('EMERGENT_LLM_KEY'),
+            provider=LLM_PROVIDER,
+            model=LLM_MODEL,
+            system_message=BRIEF_SYSTEM_PROMPT,
+            max_sessions=LLM_SESSION_CACHE_SIZE,
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS
+        )
+        self.llm_admission = LlmAdmissionController(
+            max_concurrency=LLM_MAX_CONCURRENCY,
+            max_per_user=LLM_MAX_CONCURRENCY_PER_USER,
+            max_queue=LLM_MAX_QUEUE,
+            queue_timeout=LLM_QUEUE_TIMEOUT_SECONDS,
+            timeout=LLM_TIMEOUT_SECONDS,
+            max_retries=LLM_MAX_RETRIES,
+            breaker_threshold=LLM_BREAKER_THRESHOLD,
+            breaker_reset_seconds=LLM_BREAKER_RESET_SECONDS
+        )
+        self.response_cache = create_response_cache(
+            RESPONSE_CACHE_BACKEND,
+            max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+            ttl=RESPONSE_CACHE_TTL_SECONDS,
+            directory=RESPONSE_CACHE_DIR
+        )
+        self.context_builder = ContextBuilder(
+            self.db,
+            BRIEF_SYSTEM_PROMPT,
+            token_budget=CONTEXT_TOKEN_BUDGET,
+            max_turns=CONTEXT_MAX_TURNS,
+            summary_tokens=CONTEXT_SUMMARY_TOKENS
+        )
+        # One adapter per destination; demo adapters unless a destination is configured
+        self.export_adapters = create_export_adapters(
+            EXPORT_DESTINATION_URL,
+            EXPORT_TIMEOUT_SECONDS,
+            EXPORT_MAX_CONNECTIONS,
+            EXPORT_MAX_CONCURRENCY,
+            requests_per_second=EXPORT_REQUESTS_PER_SECOND,
+            max_retries=EXPORT_MAX_RETRIES,
+            max_retry_after=EXPORT_MAX_RETRY_AFTER_SECONDS
+        )
+        self.job_queue = JobQueue(
+            CollectionJobStore(self.db.jobs) if JOB_QUEUE_BACKEND == "mongo" else MemoryJobStore(),
+            concurrency=JOB_QUEUE_CONCURRENCY,
+            max_attempts=JOB_MAX_ATTEMPTS,
+            backoff_base=JOB_RETRY_BACKOFF_SECONDS
+        )
+        # A chat job is not retried: its messages may already be stored, and the
+        # LLM call itself is retried by admission control
+        self.job_queue.register("chat", functools.partial(run_chat_job, self), max_attempts=1)
+        self.job_queue.register("export", functools.partial(run_export_job, self))
+        # An ingest run resumes from its saved progress, so retrying it never repeats finished items
+        self.job_queue.register("ingest", functools.partial(run_ingest_job, self))
+        self.loop_monitor = EventLoopMonitor(EVENT_LOOP_LAG_INTERVAL_SECONDS)
+
+    async def start(self):
+        warn_about_per_process_state()
+        await provision_indexes(self)
+        await self.llm_clients.start()
+        await self.job_queue.start()
+        if METRICS_ENABLED:
+            self.loop_monitor.start()
+        running_resources.append(self)
+
+    async def close(self):
+        if self in running_resources:
+            running_resources.remove(self)
+        await self.job_queue.stop()
+        await self.loop_monitor.stop()
+        for adapter in self.export_adapters.values():
+            await adapter.close()
+        self.password_hasher.shutdown()
+        await self.llm_clients.close()
+        await self.shared_state.close()
+        if self.client:
+            self.client.close()
+
+def get_resources(request: Request) -> AppResources:
+    return request.app.state.resources
+
+# Apps whose lifespan is running; the process-wide gauges add up over them
+running_resources: List[AppResources] = []
+
+# ======================== RATE LIMITS ========================
+
+RATE_LIMIT_HEADERS = [
+    "X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset",
+    "X-Quota-Tokens-Limit", "X-Quota-Tokens-Remaining", "X-Quota-Cost-Limit", "X-Quota-Cost-Remaining",
+    "X-Quota-Reset"
+]
+
+def limit_error(e: LimitExceeded) -> HTTPException:
+    RATE_LIMITED.inc(e.limit)
+    return HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
+
+def client_ip(request: Request) -> str:
+    # Behind a reverse proxy, run uvicorn with --proxy-headers so this is the real client
+    return request.client.host if request.client else "unknown"
+
+async def auth_rate_limit(request: Request, response: Response, res: AppResources = Depends(get_resources)):
+    """Per-IP bucket for the auth routes, checked before any bcrypt work."""
+    try:
+        response.headers.update(await res.rate_limiter.hit("auth", client_ip(request)))
+    except LimitExceeded as e:
+        raise limit_error(e)
+
 def create_token(user_id: str, email: str) -> str:
     payload = {
         "user_id": user_id,
@@ -222,26 +737,104 @@ def create_token(user_id: str, email: str) -> str:
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    res: AppResources = Depends(get_resources)
+):
     try:
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         user_id = payload.get("user_id")
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token")
-        user = await db.users.find_one({"id": user_id}, {"_id": 0, "password": 0})
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
+        user = res.principal_cache.get(user_id)
+        if user is None:
+            user = await res.db.users.find_one({"id": user_id}, {"_id": 0, "password": 0})
+            if not user:
+                raise HTTPException(status_code=401, detail="User not found")
+            res.principal_cache.set(user_id, user)
         return user
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+# ======================== INDEXES ========================
+
+# (collection, keys, options) for every index the queries below rely on
+INDEXES = [
+    ("users", [("email", 1)], {"name": "email_unique", "unique": True}),
+    ("users", [("id", 1)], {"name": "id_unique", "unique": True}),
+    ("briefs", [("id", 1), ("user_id", 1)], {"name": "id_user", "unique": True}),
+    ("briefs", [("user_id", 1), ("updated_at", -1), ("id", -1)], {"name": "user_updated_id"}),
+    ("briefs", [("conversation_id", 1), ("user_id", 1)], {"name": "conversation_user"}),
+    ("briefs", [("dedup_bands", 1), ("user_id", 1)], {"name": "dedup_bands_user"}),
+    ("brief_versions", [("brief_id", 1), ("version", -1)], {"name": "brief_version", "unique": True}),
+    ("briefs", [("source_content_blob", 1)], {"name": "source_content_blob"}),
+    ("brief_versions", [("source_content_blob", 1)], {"name": "source_content_blob"}),
+    ("blobs", [("id", 1)], {"name": "id_unique", "unique": True}),
+    # Conversation ids are unique across users, so a client cannot open a chat under someone else's id
+    ("conversations", [("id", 1)], {"name": "id_unique", "unique": True}),
+    ("conversations", [("user_id", 1), ("created_at", -1)], {"name": "user_created"}),
+    ("messages", [("conversation_id", 1), ("user_id", 1), ("bucket", 1)], {
+        "name": "conversation_user_bucket",
+        "unique": True
+    }),
+    ("briefs", [("user_id", 1), ("title", "text"), ("objective", "text"), ("deliverables", "text"), ("open_questions", "text")], {
+        "name": "user_text",
+        "weights": {"title": 10, "objective": 5, "deliverables": 2, "open_questions": 1}
+    }),
+    ("messages", [("user_id", 1), ("messages.content", "text")], {"name": "user_text"}),
+    ("ingest_jobs", [("id", 1), ("user_id", 1)], {"name": "id_user", "unique": True}),
+    ("jobs", [("id", 1)], {"name": "id_unique", "unique": True}),
+    ("llm_usage", [("user_id", 1), ("day", 1)], {"name": "user_day", "unique": True}),
+    ("jobs", [("user_id", 1), ("created_at", -1)], {"name": "user_created"}),
+    ("jobs", [("status", 1), ("started_at", 1)], {"name": "status_started"}),
+    ("jobs", [("user_id", 1), ("idempotency_key", 1)], {
+        "name": "user_idempotency_key",
+        "unique": True,
+        "partialFilterExpression": {"idempotency_key": {"$exists": True}}
+    }),
+]
+
+# (collection, name) of indexes an earlier release created that INDEXES replaces
+SUPERSEDED_INDEXES = [
+    ("briefs", "user_updated"),
+    ("conversations", "id_user"),
+    ("messages", "conversation_bucket"),
+]
+
+# Server error code for dropping an index that does not exist
+INDEX_NOT_FOUND = 27
+
+async def ensure_indexes(db):
+    """Create any missing indexes and drop superseded ones. Safe to run on every startup."""
+    started = time.perf_counter()
+    for collection, name in SUPERSEDED_INDEXES:
+        try:
+            await getattr(db, collection).drop_index(name)
+        except OperationFailure as e:
+            if e.code != INDEX_NOT_FOUND:
+                logger.error(f"Failed to drop superseded index {collection}.{name}: {str(e)}")
+            continue
+        logger.info(f"Dropped superseded index {collection}.{name}")
+    for collection, keys, options in INDEXES:
+        index_started = time.perf_counter()
+        try:
+            await getattr(db, collection).create_index(keys, **options)
+        except Exception as e:
+            logger.error(f"Failed to ensure index {collection}.{options['name']}: {str(e)}")
+            continue
+        logger.info(
+            f"Ensured index {collection}.{options['name']} "
+            f"in {(time.perf_counter() - index_started) * 1000:.1f}ms"
+        )
+    logger.info(f"Index provisioning finished in {(time.perf_counter() - started) * 1000:.1f}ms")
+
 # ======================== AUTH ROUTES ========================
 
-@api_router.post("/auth/register", response_model=TokenResponse)
-async def register(user_data: UserCreate):
-    existing = await db.users.find_one({"email": user_data.email})
+@api_router.post("/auth/register", response_model=TokenResponse, dependencies=[Depends(auth_rate_limit)])
+async def register(user_data: UserCreate, res: AppResources = Depends(get_resources)):
+    existing = await res.db.users.find_one({"email": user_data.email})
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
     
@@ -252,10 +845,10 @@ async def register(user_data: UserCreate):
         "id": user_id,
         "email": user_data.email,
         "name": user_data.name,
-        "password": hash_password(user_data.password),
+        "password": await hash_password(res.password_hasher, user_data.password),
         "created_at": now
     }
-    await db.users.insert_one(user_doc)
+    await res.db.users.insert_one(user_doc)
     
     token = create_token(user_id, user_data.email)
     return TokenResponse(
@@ -263,10 +856,10 @@ async def register(user_data: UserCreate):
         user=UserResponse(id=user_id, email=user_data.email, name=user_data.name, created_at=now)
     )
 
-@api_router.post("/auth/login", response_model=TokenResponse)
-async def login(credentials: UserLogin):
-    user = await db.users.find_one({"email": credentials.email})
-    if not user or not verify_password(credentials.password, user["password"]):
+@api_router.post("/auth/login", response_model=TokenResponse, dependencies=[Depends(auth_rate_limit)])
+async def login(credentials: UserLogin, res: AppResources = Depends(get_resources)):
+    user = await res.db.users.find_one({"email": credentials.email})
+    if not user or not await verify_password(res.password_hasher, credentials.password, user["password"]):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
     token = create_token(user["id"], user["email"])
@@ -276,7 +869,8 @@ async def login(credentials: UserLogin):
             id=user["id"],
             email=user["email"],
             name=user["name"],
-            created_at=user["created_at"]
+            created_at=user["created_at"],
+            response_cache=user.get("response_cache", True)
         )
     )
 
@@ -284,10 +878,79 @@ async def login(credentials: UserLogin):
 async def get_me(current_user: dict = Depends(get_current_user)):
     return UserResponse(**current_user)
 
+@api_router.put("/auth/preferences", response_model=UserResponse)
+async def update_preferences(
+    preferences: UserPreferences,
+    current_user: dict = Depends(get_current_user),
+    res: AppResources = Depends(get_resources)
+):
+    update_data = {k: v for k, v in preferences.model_dump().items() if v is not None}
+    if update_data:
+        await res.db.users.update_one({"id": current_user["id"]}, {"$set": update_data})
+        res.principal_cache.invalidate(current_user["id"])
+    return UserResponse(**{**current_user, **update_data})
+
 # ======================== BRIEFS ROUTES ========================
 
+BRIEF_FIELDS = set(BriefResponse.model_fields)
+
+# Full brief reads leave out the dedup fingerprint, which only chat revisions use
+BRIEF_PROJECTION = {"_id": 0, "dedup_bands": 0}
+
+# Stored briefs are encoded directly; the response models only document them
+brief_shaper = DocumentShaper(BriefResponse)
+brief_list_shaper = DocumentShaper(BriefListItem, exclude_unset=True)
+
+# "brief-listing:<user_id>" -> "<newest updated_at>:<count>" in the shared state; dropped on every brief write
+
+def brief_listing_key(user_id: str) -> str:
+    return f"brief-listing:{user_id}"
+
+async def invalidate_brief_listing(res: AppResources, user_id: str):
+    await res.shared_state.delete(brief_listing_key(user_id))
+
+def encode_cursor(updated_at: str, brief_id: str) -> str:
+    raw = json.dumps([updated_at, brief_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        updated_at, brief_id = json.loads(raw)
+        if not isinstance(updated_at, str) or not isinstance(brief_id, str):
+            raise ValueError(cursor)
+        return updated_at, brief_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def brief_listing_etag(res: AppResources, user_id: str, variant: str) -> str:
+    """Weak ETag for a user's brief listing, cached until the next local write."""
+    version = await res.shared_state.get(brief_listing_key(user_id))
+    if version is None:
+        newest = await res.db.briefs.find(
+            {"user_id": user_id},
+            {"_id": 0, "updated_at": 1}
+        ).sort("updated_at", -1).to_list(1)
+        count = await res.db.briefs.count_documents({"user_id": user_id})
+        version = f"{newest[0]['updated_at'] if newest else ''}:{count}"
+        await res.shared_state.set(brief_listing_key(user_id), version, ttl=BRIEF_ETAG_TTL_SECONDS)
+    digest = hashlib.sha1(f"{version}|{variant}".encode('utf-8')).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in tags
+
 @api_router.post("/briefs", response_model=BriefResponse)
-async def create_brief(brief_data: BriefCreate, current_user: dict = Depends(get_current_user)):
+async def create_brief(
+    brief_data: BriefCreate,
+    current_user: dict = Depends(get_current_user),
+    res: AppResources = Depends(get_resources)
+):
     brief_id = str(uuid.uuid4())
     now = datetime.now(timezone.utc).isoformat()
     
@@ -302,88 +965,175 @@ async def create_brief(brief_data: BriefCreate, current_user: dict = Depends(get
         "assets": brief_data.assets or [],
         "open_questions": brief_data.open_questions or [],
         "source_type": brief_data.source_type or "manual",
-        "source_content": brief_data.source_content or "",
+        **await res.blob_store.store(current_user["id"], brief_data.source_content or ""),
         "status": "draft",
         "created_at": now,
-        "updated_at": now
+        "updated_at": now,
+        "version": 1
     }
-    await db.briefs.insert_one(brief_doc)
+    await res.db.briefs.insert_one(brief_doc)
+    await invalidate_brief_listing(res, current_user["id"])
     del brief_doc["_id"]
     return BriefResponse(**brief_doc)
 
-@api_router.get("/briefs", response_model=List[BriefResponse])
-async def list_briefs(current_user: dict = Depends(get_current_user)):
-    briefs = await db.briefs.find(
-        {"user_id": current_user["id"]},
-        {"_id": 0}
-    ).sort("updated_at", -1).to_list(100)
-    return [BriefResponse(**b) for b in briefs]
+@api_router.get("/briefs", response_model=List[BriefListItem], response_model_exclude_unset=True)
+async def list_briefs(
+    request: Request,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: dict = Depends(get_current_user),
+    res: AppResources = Depends(get_resources)
+):
+    """Newest-first brief listing with keyset pagination.
+
+    ``fields`` is a comma-separated projection (``id`` and ``updated_at``
+    are always included). When more briefs remain, ``X-Next-Cursor`` holds
+    the value to pass as ``cursor`` for the next page. Responses carry a
+    weak ETag; a matching ``If-None-Match`` gets a 304. Large
+    ``source_content`` is listed as a preview with
+    ``source_content_truncated`` set.
+    """
+    projection = dict(BRIEF_PROJECTION)
+    if fields:
+        requested = {f.strip() for f in fields.split(",") if f.strip()}
+        unknown = requested - BRIEF_FIELDS
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        if "source_content" in requested:
+            requested.add("source_content_truncated")
+        projection = {"_id": 0, **{f: 1 for f in requested | {"id", "updated_at"}}}
+
+    variant = f"{limit}|{cursor or ''}|{','.join(sorted(projection))}"
+    etag = await brief_listing_etag(res, current_user["id"], variant)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    query = {"user_id": current_user["id"]}
+    if cursor:
+        updated_at, brief_id = decode_cursor(cursor)
+        query["$or"] = [
+            {"updated_at": {"$lt": updated_at}},
+            {"updated_at": updated_at, "id": {"$lt": brief_id}}
+        ]
+    briefs = await res.db.briefs.find(query, projection).sort(
+        [("updated_at", -1), ("id", -1)]
+    ).to_list(limit + 1)
+
+    headers = {"ETag": etag}
+    if len(briefs) > limit:
+        briefs = briefs[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(briefs[-1]["updated_at"], briefs[-1]["id"])
+    return json_response(brief_list_shaper.shape_many(briefs), headers=headers)
+
+def brief_etag(brief: dict) -> str:
+    return f'"{brief.get("version", 0)}"'
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """Brief version named by an If-Match header; None if absent or ``*``."""
+    if not if_match or if_match.strip() == "*":
+        return None
+    try:
+        return int(if_match.strip().removeprefix("W/").strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must be a brief version ETag")
+
+def version_filter(version: int):
+    # Briefs created before versioning have no field and count as version 0
+    return {"$in": [0, None]} if version == 0 else version
 
 @api_router.get("/briefs/{brief_id}", response_model=BriefResponse)
-async def get_brief(brief_id: str, current_user: dict = Depends(get_current_user)):
-    brief = await db.briefs.find_one(
+async def get_brief(
+    brief_id: str,
+    current_user: dict = Depends(get_current_user),
+    res: AppResources = Depends(get_resources)
+):
+    brief = await res.db.briefs.find_one(
         {"id": brief_id, "user_id": current_user["id"]},
-        {"_id": 0}
+        BRIEF_PROJECTION
     )
     if not brief:
         raise HTTPException(status_code=404, detail="Brief not found")
-    return BriefResponse(**brief)
+    await res.blob_store.load(brief, current_user["id"])
+    return json_response(brief_shaper.shape(brief), headers={"ETag": brief_etag(brief)})
 
 @api_router.put("/briefs/{brief_id}", response_model=BriefResponse)
-async def update_brief(brief_id: str, brief_data: BriefUpdate, current_user: dict = Depends(get_current_user)):
+async def update_brief(
+    brief_id: str,
+    brief_data: BriefUpdate,
+    if_match: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user),
+    res: AppResources = Depends(get_resources)
+):
+    """Update a brief in one round trip.
+
+    With ``If-Match: "<version>"`` the update only applies if the brief is
+    still at that version; otherwise the response is 409.
+    """
+    expected_version = parse_if_match(if_match)
     update_data = {k: v for k, v in brief_data.model_dump().items() if v is not None}
     update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
-    
-    result = await db.briefs.update_one(
-        {"id": brief_id, "user_id": current_user["id"]},
-        {"$set": update_data}
+
+    query = {"id": brief_id, "user_id": current_user["id"]}
+    if expected_version is not None:
+        query["version"] = version_filter(expected_version)
+    brief = await res.db.briefs.find_one_and_update(
+        query,
+        {"$set": update_data, "$inc": {"version": 1}},
+        projection=BRIEF_PROJECTION,
+        return_document=ReturnDocument.AFTER
     )
-    if result.matched_count == 0:
+    if not brief:
+        if expected_version is not None and await res.db.briefs.find_one(
+            {"id": brief_id, "user_id": current_user["id"]}, {"_id": 0, "id": 1}
+        ):
+            raise HTTPException(status_code=409, detail="Brief was modified by someone else")
         raise HTTPException(status_code=404, detail="Brief not found")
-    
-    brief = await db.briefs.find_one({"id": brief_id}, {"_id": 0})
-    return BriefResponse(**brief)
+    await invalidate_brief_listing(res, current_user["id"])
+    await res.blob_store.load(brief, current_user["id"])
+    return json_response(brief_shaper.shape(brief), headers={"ETag": brief_etag(brief)})
 
 @api_router.delete("/briefs/{brief_id}")
-async def delete_brief(brief_id: str, current_user: dict = Depends(get_current_user)):
-    result = await db.briefs.delete_one({"id": brief_id, "user_id": current_user["id"]})
-    if result.deleted_count == 0:
+async def delete_brief(
+    brief_id: str,
+    current_user: dict = Depends(get_current_user),
+    res: AppResources = Depends(get_resources)
+):
+    query = {"id": brief_id, "user_id": current_user["id"]}
+    brief = await res.db.briefs.find_one_and_delete(query, projection={"_id": 0, "source_content_blob": 1})
+    if brief is None:
         raise HTTPException(status_code=404, detail="Brief not found")
+    versions = await res.db.brief_versions.find(
+        {"brief_id": brief_id, "user_id": current_user["id"]}, {"_id": 0, "source_content_blob": 1}
+    ).to_list(None)
+    await res.db.brief_versions.delete_many({"brief_id": brief_id, "user_id": current_user["id"]})
+    await res.blob_store.delete_unreferenced(
+        [doc.get("source_content_blob") for doc in [brief, *versions]],
+        current_user["id"],
+        [res.db.briefs, res.db.brief_versions]
+    )
+    await invalidate_brief_listing(res, current_user["id"])
     return {"message": "Brief deleted"}
 
+@api_router.get("/briefs/{brief_id}/versions", response_model=List[BriefVersion])
+async def list_brief_versions(
+    brief_id: str,
+    limit: int = Query(50, ge=1, le=500),
+    current_user: dict = Depends(get_current_user),
+    res: AppResources = Depends(get_resources)
+):
+    """Earlier versions of a brief that chat revisions replaced, newest first."""
+    if not await res.db.briefs.find_one({"id": brief_id, "user_id": current_user["id"]}, {"_id": 0, "id": 1}):
+        raise HTTPException(status_code=404, detail="Brief not found")
+    versions = await res.db.brief_versions.find(
+        {"brief_id": brief_id, "user_id": current_user["id"]},
+        {"_id": 0}
+    ).sort("version", -1).to_list(limit)
+    return await res.blob_store.load_many(versions, current_user["id"])
+
 # ======================== AI CHAT ROUTES ========================
 
-@api_router.post("/chat", response_model=ChatResponse)
-async def chat_with_ai(request: ChatRequest, current_user: dict = Depends(get_current_user)):
-    from emergentintegrations.llm.chat import LlmChat, UserMessage
-    
-    conversation_id = request.conversation_id or str(uuid.uuid4())
-    
-    # Get or create conversation
-    conversation = await db.conversations.find_one({"id": conversation_id, "user_id": current_user["id"]})
-    if not conversation:
-        conversation = {
-            "id": conversation_id,
-            "user_id": current_user["id"],
-            "messages": [],
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-        await db.conversations.insert_one(conversation)
-    
-    # Store user message
-    user_msg = {
-        "role": "user",
-        "content": request.message,
-        "timestamp": datetime.now(timezone.utc).isoformat()
-    }
-    
-    try:
-        # Initialize AI chat
-        api_key = os.environ.get('EMERGENT_LLM_KEY')
-        chat = LlmChat(
-            api_key=api_key,
-            session_id=f"brieflyai-{conversation_id}",
-            system_message="""You are BrieflyAI, an AI assistant that helps create structured creative briefs from conversations.
+BRIEF_SYSTEM_PROMPT = """You are BrieflyAI, an AI assistant that helps create structured creative briefs from conversations.
 
 When a user asks you to create a brief, extract the following information and format it as a structured brief:
 - Objective: The main goal of the campaign/project
@@ -409,110 +1159,782 @@ Format your brief responses like this:
 **Open Questions:**
 - [Question 1]
 - [Question 2]"""
-        )
-        chat.with_model("openai", "gpt-5.2")
-        
-        user_message = UserMessage(text=request.message)
-        ai_response = await chat.send_message(user_message)
-        
-        # Store AI response
-        ai_msg = {
-            "role": "assistant",
-            "content": ai_response,
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
-        
-        # Update conversation
-        await db.conversations.update_one(
-            {"id": conversation_id},
-            {"$push": {"messages": {"$each": [user_msg, ai_msg]}}}
-        )
-        
-        # Check if response contains a brief and auto-create it
-        brief = None
-        if "## Brief:" in ai_response or "**Objective:**" in ai_response:
-            # Extract title from response
-            lines = ai_response.split('\n')
-            title = "Generated Brief"
-            for line in lines:
-                if line.startswith("## Brief:"):
-                    title = line.replace("## Brief:", "").strip()
-                    break
-            
-            # Create brief
-            brief_id = str(uuid.uuid4())
-            now = datetime.now(timezone.utc).isoformat()
-            brief_doc = {
-                "id": brief_id,
-                "user_id": current_user["id"],
-                "title": title,
-                "objective": "",
-                "deliverables": [],
-                "deadline": "",
-                "owners": [],
-                "assets": [],
-                "open_questions": [],
-                "source_type": "ai",
-                "source_content": request.message,
-                "status": "draft",
+
+def response_cache_key(res: AppResources, current_user: dict, message: str) -> Optional[str]:
+    """Cache key for a chat message, or None if the cache is off for this user."""
+    if res.response_cache is None:
+        return None
+    if not current_user.get("response_cache", True):
+        res.response_cache.bypassed += 1
+        return None
+    return cache_key(BRIEF_SYSTEM_PROMPT, f"{LLM_PROVIDER}/{LLM_MODEL}", message)
+
+def admission_error(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=e.status_code,
+        detail=e.detail,
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+async def llm_limits(
+    response: Response,
+    current_user: dict = Depends(get_current_user),
+    res: AppResources = Depends(get_resources)
+) -> Dict[str, str]:
+    """Per-user rate limit and daily quota for routes that call the LLM.
+
+    Returns the budget headers (already set on ``response``) so routes that
+    build their own response can copy them.
+    """
+    try:
+        headers = await res.rate_limiter.hit("chat", current_user["id"])
+        headers.update(await res.usage_meter.check(current_user["id"]))
+    except LimitExceeded as e:
+        raise limit_error(e)
+    response.headers.update(headers)
+    return headers
+
+def prompt_tokens(res: AppResources, prompt: str) -> int:
+    return res.context_builder.system_tokens + estimate_tokens(prompt) + MESSAGE_OVERHEAD_TOKENS
+
+async def record_llm_usage(res: AppResources, user_id: str, prompt: str, reply: str):
+    await res.usage_meter.record(user_id, prompt_tokens(res, prompt), estimate_tokens(reply))
+
+def check_llm_admission(res: AppResources, user_id: str):
+    try:
+        res.llm_admission.check(user_id)
+    except AdmissionRejected as e:
+        raise admission_error(e)
+
+async def get_or_create_conversation(res: AppResources, conversation_id: str, user_id: str):
+    """Create the user's conversation if needed; 404 if the id belongs to another user."""
+    now = datetime.now(timezone.utc).isoformat()
+    try:
+        await res.db.conversations.update_one(
+            {"id": conversation_id, "user_id": user_id},
+            {"$setOnInsert": {
+                "message_count": 0,
+                "last_message": None,
                 "created_at": now,
                 "updated_at": now
-            }
-            
-            # Parse brief content
-            current_section = None
-            for line in lines:
-                line = line.strip()
-                if line.startswith("**Objective:**"):
-                    brief_doc["objective"] = line.replace("**Objective:**", "").strip()
-                elif line.startswith("**Deadline:**"):
-                    brief_doc["deadline"] = line.replace("**Deadline:**", "").strip()
-                elif line.startswith("**Deliverables:**"):
-                    current_section = "deliverables"
-                elif line.startswith("**Owners:**"):
-                    current_section = "owners"
-                    owner_text = line.replace("**Owners:**", "").strip()
-                    if owner_text:
-                        brief_doc["owners"].append(owner_text)
-                elif line.startswith("**Assets:**"):
-                    current_section = "assets"
-                elif line.startswith("**Open Questions:**"):
-                    current_section = "open_questions"
-                elif line.startswith("- ") and current_section:
-                    item = line[2:].strip()
-                    if item and current_section in brief_doc:
-                        brief_doc[current_section].append(item)
-            
-            await db.briefs.insert_one(brief_doc)
-            brief = BriefResponse(**{k: v for k, v in brief_doc.items() if k != "_id"})
-        
+            }},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # The upsert collided with the id_unique index: another user's conversation
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+def new_brief_doc(
+    draft: dict,
+    source: dict,
+    user_id: str,
+    source_type: str = "ai",
+    conversation_id: Optional[str] = None,
+    dedup_bands: Optional[List[str]] = None
+) -> dict:
+    now = datetime.now(timezone.utc).isoformat()
+    doc = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        **draft,
+        "source_type": source_type,
+        **source,
+        "status": "draft",
+        "created_at": now,
+        "updated_at": now,
+        "version": 1,
+        "dedup_bands": fingerprint(draft) if dedup_bands is None else dedup_bands
+    }
+    if conversation_id is not None:
+        doc["conversation_id"] = conversation_id
+    return doc
+
+async def find_revision_candidates(
+    res: AppResources,
+    conversation_id: str,
+    user_id: str,
+    bands: List[str]
+) -> List[dict]:
+    """Briefs linked to the conversation, plus briefs sharing a band with the draft when cross matching is on."""
+    projection = {
+        "_id": 0, "id": 1, "version": 1, "conversation_id": 1, "status": 1, **{f: 1 for f in DEDUP_FIELDS}
+    }
+    candidates = await res.db.briefs.find(
+        {"conversation_id": conversation_id, "user_id": user_id}, projection
+    ).to_list(BRIEF_DEDUP_MAX_CANDIDATES)
+    if bands and BRIEF_DEDUP_CROSS_THRESHOLD:
+        candidates += await res.db.briefs.find(
+            {"dedup_bands": {"$in": bands}, "user_id": user_id}, projection
+        ).to_list(BRIEF_DEDUP_MAX_CANDIDATES)
+    return list({c["id"]: c for c in candidates}.values())
+
+async def revise_brief(
+    res: AppResources,
+    existing: dict,
+    draft: dict,
+    source: dict,
+    conversation_id: str,
+    user_id: str,
+    bands: List[str]
+) -> Optional[dict]:
+    """Apply a draft to the brief it revises and keep the old version.
+
+    Fields the draft leaves empty keep their current value. An exported
+    brief revised in its own conversation goes back to draft, as it no
+    longer matches what was exported; the exported state stays in its
+    versions. A brief from another conversation only takes the draft's
+    content: it keeps its own conversation and source, and is left alone
+    once exported. Returns None if the brief changed since it was read, so
+    the caller inserts instead.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    changes = {k: v for k, v in draft.items() if v and not (k == "title" and v == DEFAULT_TITLE)}
+    changes.update({"dedup_bands": bands, "updated_at": now})
+    query = {"id": existing["id"], "user_id": user_id, "version": version_filter(existing.get("version", 0))}
+    if existing.get("conversation_id") == conversation_id:
+        changes.update(source)
+        if existing.get("status") == "exported":
+            changes["status"] = "draft"
+    else:
+        query["status"] = {"$ne": "exported"}
+    before = await res.db.briefs.find_one_and_update(
+        query,
+        {"$set": changes, "$inc": {"version": 1}},
+        projection=BRIEF_PROJECTION,
+        return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
+        return None
+    await res.db.brief_versions.insert_one(
+        {**{k: v for k, v in before.items() if k != "id"}, "brief_id": before["id"], "replaced_at": now}
+    )
+    return {**before, **changes, "version": before.get("version", 0) + 1}
+
+async def save_chat_briefs(
+    res: AppResources,
+    drafts: List[dict],
+    source_content: str,
+    conversation_id: str,
+    user_id: str
+) -> List[BriefResponse]:
+    """Store the briefs in a chat reply, revising near-duplicates in place.
+
+    Each draft revises the most similar existing brief (see ``brief_dedup``)
+    or becomes a new AI-sourced brief linked to the conversation. Revised
+    briefs come back with ``version`` above 1.
+    """
+    if not drafts:
+        return []
+    source = None
+    saved, new_docs, claimed = [], [], set()
+    for draft in drafts:
+        bands = fingerprint(draft)
+        doc = None
+        if BRIEF_DEDUP_ENABLED:
+            candidates = [
+                c for c in await find_revision_candidates(res, conversation_id, user_id, bands)
+                if c["id"] not in claimed
+            ]
+            match = best_match(draft, candidates, conversation_id, BRIEF_DEDUP_THRESHOLD, BRIEF_DEDUP_CROSS_THRESHOLD)
+            if match is not None:
+                if source is None and match[0].get("conversation_id") == conversation_id:
+                    source = await res.blob_store.store(user_id, source_content)
+                doc = await revise_brief(res, match[0], draft, source or {}, conversation_id, user_id, bands)
+        if doc is None:
+            if source is None:
+                source = await res.blob_store.store(user_id, source_content)
+            doc = new_brief_doc(draft, source, user_id, conversation_id=conversation_id, dedup_bands=bands)
+            new_docs.append(doc)
+        CHAT_BRIEFS.inc("created" if doc["version"] == 1 else "revised")
+        claimed.add(doc["id"])
+        saved.append(doc)
+    if new_docs:
+        await res.db.briefs.insert_many(new_docs)
+    await invalidate_brief_listing(res, user_id)
+    return [BriefResponse(**brief_shaper.shape(doc)) for doc in saved]
+
+async def complete_chat_exchange(
+    res: AppResources,
+    conversation_id: str,
+    user_msg: dict,
+    ai_response: str,
+    user_id: str,
+    drafts: Optional[List[dict]] = None
+) -> List[BriefResponse]:
+    """Persist both sides of an exchange and save any briefs it contains.
+
+    ``drafts`` may be passed in when the reply was already parsed while
+    streaming; otherwise the full reply is parsed here.
+    """
+    # Store AI response
+    ai_msg = {
+        "role": "assistant",
+        "content": ai_response,
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+
+    # Append both messages to the conversation's message buckets
+    await append_messages(res.db, conversation_id, user_id, [user_msg, ai_msg])
+
+    # Check if response contains briefs and auto-create them
+    if drafts is None:
+        with BRIEF_PARSE_SECONDS.time("full"):
+            drafts = parse_briefs(ai_response)
+    return await save_chat_briefs(res, drafts, user_msg["content"], conversation_id, user_id)
+
+def new_user_message(request: ChatRequest) -> dict:
+    return {
+        "role": "user",
+        "content": request.message,
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+
+async def send_llm_message(chat, user_message: UserMessage) -> str:
+    with LLM_SECONDS.time("send"):
+        return await chat.send_message(user_message)
+
+async def stream_llm_message(chat, user_message: UserMessage):
+    with LLM_SECONDS.time("stream"):
+        async for chunk in chat.stream_message(user_message):
+            yield chunk
+
+async def metered_llm_call(res: AppResources, user_id: str, lane: str, chat, prompt: str) -> str:
+    """One admitted LLM call, with its estimated token usage charged to ``user_id``."""
+    user_message = UserMessage(text=prompt)
+    reply = await res.llm_admission.call(lane, lambda: send_llm_message(chat, user_message))
+    await record_llm_usage(res, user_id, prompt, reply)
+    return reply
+
+async def generate_when_admitted(res: AppResources, current_user: dict, message: str, chat, lane: str) -> str:
+    """Get a reply for background work, waiting out overload instead of failing.
+
+    Rejections are retried after their ``Retry-After`` for up to
+    LLM_BACKGROUND_MAX_WAIT_SECONDS; after that the last ``AdmissionRejected``
+    is raised so the job fails. Raises ``LimitExceeded`` once the user's
+    daily quota is spent.
+    """
+    cache_key = response_cache_key(res, current_user, message)
+    if cache_key:
+        cached_response = await res.response_cache.get(cache_key)
+        if cached_response is not None:
+            return cached_response
+    await res.usage_meter.check(current_user["id"])
+    call = lambda: metered_llm_call(res, current_user["id"], lane, chat, message)
+    give_up_at = time.monotonic() + LLM_BACKGROUND_MAX_WAIT_SECONDS
+    while True:
+        try:
+            return await (res.response_cache.fill(cache_key, call) if cache_key else call())
+        except AdmissionRejected as e:
+            if time.monotonic() + e.retry_after > give_up_at:
+                raise
+            await asyncio.sleep(e.retry_after)
+
+@api_router.post("/chat", response_model=ChatResponse, dependencies=[Depends(llm_limits)])
+async def chat_with_ai(
+    request: ChatRequest,
+    current_user: dict = Depends(get_current_user),
+    res: AppResources = Depends(get_resources)
+):
+    context = await res.context_builder.build(request.conversation_id, current_user["id"], request.message)
+    cache_key = response_cache_key(res, current_user, context.prompt)
+    cached_response = await res.response_cache.get(cache_key) if cache_key else None
+    if cached_response is None:
+        check_llm_admission(res, current_user["id"])
+    conversation_id = request.conversation_id or str(uuid.uuid4())
+
+    # Get or create conversation
+    await get_or_create_conversation(res, conversation_id, current_user["id"])
+
+    # Store user message
+    user_msg = new_user_message(request)
+
+    try:
+        if cached_response is not None:
+            ai_response = cached_response
+        else:
+            # Reuse the conversation's AI chat session
+            chat = res.llm_clients.get_chat(current_user["id"], conversation_id)
+
+            call = lambda: metered_llm_call(res, current_user["id"], current_user["id"], chat, context.prompt)
+            ai_response = await (res.response_cache.fill(cache_key, call) if cache_key else call())
+
+        briefs = await complete_chat_exchange(res, conversation_id, user_msg, ai_response, current_user["id"])
+
         return ChatResponse(
             response=ai_response,
             conversation_id=conversation_id,
-            brief=brief
+            brief=briefs[0] if briefs else None,
+            briefs=briefs,
+            revised_brief_ids=[b.id for b in briefs if b.version > 1]
         )
-        
+
+    except AdmissionRejected as e:
+        raise admission_error(e)
+    except asyncio.TimeoutError:
+        logger.error("AI Chat error: timed out")
+        raise HTTPException(status_code=504, detail="AI service timed out")
     except Exception as e:
         logger.error(f"AI Chat error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"AI service error: {str(e)}")
 
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def brief_field_events(parser_events: list) -> List[str]:
+    return [
+        sse_event("brief_field", {"index": index, "field": field, "value": value})
+        for kind, index, field, value in parser_events
+        if kind == "field"
+    ]
+
+@api_router.post("/chat/stream")
+async def chat_with_ai_stream(
+    request: ChatRequest,
+    current_user: dict = Depends(get_current_user),
+    limit_headers: Dict[str, str] = Depends(llm_limits),
+    res: AppResources = Depends(get_resources)
+):
+    """Streaming variant of /chat that forwards tokens as Server-Sent Events.
+
+    Emits ``token`` events as the completion arrives and ``brief_field``
+    events as each brief section closes, then a single ``done`` event
+    carrying the ``conversation_id`` and any briefs that were created or
+    revised, or an ``error`` event if generation fails. A cached reply
+    arrives as a single ``token`` event.
+    """
+    context = await res.context_builder.build(request.conversation_id, current_user["id"], request.message)
+    cache_key = response_cache_key(res, current_user, context.prompt)
+    cached_response = await res.response_cache.get(cache_key) if cache_key else None
+    if cached_response is None:
+        check_llm_admission(res, current_user["id"])
+    conversation_id = request.conversation_id or str(uuid.uuid4())
+    await get_or_create_conversation(res, conversation_id, current_user["id"])
+    user_msg = new_user_message(request)
+    chat = res.llm_clients.get_chat(current_user["id"], conversation_id)
+
+    async def completion_chunks():
+        if cached_response is not None:
+            yield cached_response
+            return
+        user_message = UserMessage(text=context.prompt)
+        async for chunk in res.llm_admission.stream(current_user["id"], lambda: stream_llm_message(chat, user_message)):
+            yield chunk
+
+    async def event_stream():
+        chunks = []
+        parser = BriefParser()
+        parse_seconds = 0.0
+        try:
+            async for chunk in completion_chunks():
+                chunks.append(chunk)
+                yield sse_event("token", {"text": chunk})
+                started = time.perf_counter()
+                parsed = parser.feed(chunk)
+                parse_seconds += time.perf_counter() - started
+                for event in brief_field_events(parsed):
+                    yield event
+            for event in brief_field_events(parser.close()):
+                yield event
+            BRIEF_PARSE_SECONDS.observe(parse_seconds, "stream")
+
+            ai_response = "".join(chunks)
+            if cached_response is None:
+                await record_llm_usage(res, current_user["id"], context.prompt, ai_response)
+                if cache_key:
+                    await res.response_cache.set(cache_key, ai_response)
+            drafts = parser.drafts if contains_brief(ai_response) else []
+            briefs = await complete_chat_exchange(
+                res, conversation_id, user_msg, ai_response, current_user["id"], drafts=drafts
+            )
+            yield sse_event("done", {
+                "conversation_id": conversation_id,
+                "brief": briefs[0].model_dump() if briefs else None,
+                "briefs": [b.model_dump() for b in briefs],
+                "revised_brief_ids": [b.id for b in briefs if b.version > 1]
+            })
+        except AdmissionRejected as e:
+            yield sse_event("error", {"status": e.status_code, "detail": e.detail, "retry_after": e.retry_after})
+        except asyncio.TimeoutError:
+            logger.error("AI Chat stream error: timed out")
+            yield sse_event("error", {"status": 504, "detail": "AI service timed out"})
+        except Exception as e:
+            logger.error(f"AI Chat stream error: {str(e)}")
+            yield sse_event("error", {"status": 500, "detail": f"AI service error: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **limit_headers}
+    )
+
+@api_router.get("/usage", response_model=UsageResponse)
+async def get_usage(current_user: dict = Depends(get_current_user), res: AppResources = Depends(get_resources)):
+    """Today's estimated LLM usage against the daily quotas."""
+    usage = await res.usage_meter.usage(current_user["id"])
+    return UsageResponse(
+        **usage,
+        token_quota=LLM_DAILY_TOKEN_QUOTA or None,
+        cost_quota_usd=LLM_DAILY_COST_QUOTA_USD or None,
+        resets_in_seconds=seconds_until_next_day()
+    )
+
 @api_router.get("/conversations", response_model=List[dict])
-async def list_conversations(current_user: dict = Depends(get_current_user)):
-    conversations = await db.conversations.find(
+async def list_conversations(
+    current_user: dict = Depends(get_current_user),
+    res: AppResources = Depends(get_resources)
+):
+    # Summaries only; unmigrated embedded histories are never sent in lists
+    conversations = await res.db.conversations.find(
         {"user_id": current_user["id"]},
-        {"_id": 0}
+        {"_id": 0, "messages": 0, "context_summary": 0}
     ).sort("created_at", -1).to_list(50)
     return conversations
 
 @api_router.get("/conversations/{conversation_id}")
-async def get_conversation(conversation_id: str, current_user: dict = Depends(get_current_user)):
-    conversation = await db.conversations.find_one(
+async def get_conversation(
+    conversation_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: dict = Depends(get_current_user),
+    res: AppResources = Depends(get_resources)
+):
+    """Conversation summary with the newest page of messages."""
+    conversation = await res.db.conversations.find_one(
         {"id": conversation_id, "user_id": current_user["id"]},
-        {"_id": 0}
+        {"_id": 0, "context_summary": 0}
     )
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    return conversation
+    if "messages" in conversation:
+        # Not migrated yet; the whole history is still embedded
+        conversation["next_cursor"] = None
+        return conversation
+    messages, next_cursor = await read_messages(res.db, conversation_id, current_user["id"], limit=limit)
+    return {**conversation, "messages": messages, "next_cursor": next_cursor}
+
+@api_router.get("/conversations/{conversation_id}/messages", response_model=MessagePage)
+async def list_conversation_messages(
+    conversation_id: str,
+    before: Optional[int] = Query(None, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: dict = Depends(get_current_user),
+    res: AppResources = Depends(get_resources)
+):
+    """Page backwards through history; pass ``next_cursor`` as ``before``."""
+    conversation = await res.db.conversations.find_one(
+        {"id": conversation_id, "user_id": current_user["id"]},
+        {"_id": 0, "id": 1}
+    )
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    messages, next_cursor = await read_messages(
+        res.db, conversation_id, current_user["id"], before=before, limit=limit
+    )
+    return MessagePage(messages=messages, next_cursor=next_cursor)
+
+# ======================== SEARCH ========================
+
+# Brief fields in the order a snippet is looked for
+BRIEF_SEARCH_FIELDS = ["title", "objective", "deliverables", "open_questions"]
+
+def brief_snippet(brief: dict, search) -> tuple:
+    """(field, snippet, highlights) for the first brief field that matches."""
+    for field in BRIEF_SEARCH_FIELDS:
+        value = brief.get(field) or []
+        for text in value if isinstance(value, list) else [value]:
+            found = snippet(text, search)
+            if found:
+                return (field, *found)
+    # Matched on a stem the local tokenizer does not produce
+    return "title", (brief.get("title") or "")[:160], []
+
+async def search_briefs(db, user_id: str, query: str, count: int) -> List[SearchHit]:
+    search = parse_search(query)
+    cursor = db.briefs.find(
+        {"user_id": user_id, "$text": {"$search": query}},
+        {"_id": 0, "id": 1, "updated_at": 1, "score": {"$meta": "textScore"}, **{f: 1 for f in BRIEF_SEARCH_FIELDS}}
+    ).sort([("score", {"$meta": "textScore"})]).limit(count)
+    hits = []
+    async for brief in cursor:
+        field, text, highlights = brief_snippet(brief, search)
+        hits.append(SearchHit(
+            type="brief", brief_id=brief["id"], title=brief.get("title"), field=field,
+            snippet=text, highlights=highlights, score=brief["score"], timestamp=brief.get("updated_at")
+        ))
+    return hits
+
+async def search_messages(db, user_id: str, query: str, count: int) -> List[SearchHit]:
+    """Message hits from the best-scoring buckets, best matches first within a bucket."""
+    search = parse_search(query)
+    cursor = db.messages.find(
+        {"user_id": user_id, "$text": {"$search": query}},
+        {"_id": 0, "conversation_id": 1, "messages": 1, "score": {"$meta": "textScore"}}
+    ).sort([("score", {"$meta": "textScore"})]).limit(count)
+    hits = []
+    async for bucket in cursor:
+        found = []
+        for message in bucket["messages"]:
+            match = snippet(message["content"], search)
+            if match:
+                found.append((len(match[1]), message, match))
+        found.sort(key=lambda f: f[0], reverse=True)
+        for _, message, match in found:
+            hits.append(SearchHit(
+                type="message", conversation_id=bucket["conversation_id"], seq=message.get("seq"),
+                field="content", snippet=match[0], highlights=match[1], score=bucket["score"],
+                timestamp=message.get("timestamp")
+            ))
+        if len(hits) >= count:
+            break
+    return hits[:count]
+
+@api_router.get("/search", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    type: str = Query("all", pattern="^(all|briefs|messages)$"),
+    limit: int = Query(20, ge=1, le=50),
+    offset: int = Query(0, ge=0, le=500),
+    current_user: dict = Depends(get_current_user),
+    res: AppResources = Depends(get_resources)
+):
+    """Rank briefs and past messages against ``q``.
+
+    Supports Mongo ``$text`` syntax: ``"exact phrase"`` and ``-excluded``.
+    With ``type=all`` both result kinds are merged by score.
+    """
+    count = offset + limit + 1
+    results = []
+    if type in ("all", "briefs"):
+        results.extend(await search_briefs(res.db, current_user["id"], q, count))
+    if type in ("all", "messages"):
+        results.extend(await search_messages(res.db, current_user["id"], q, count))
+    results.sort(key=lambda hit: hit.score, reverse=True)
+    return SearchResponse(
+        query=q,
+        results=results[offset:offset + limit],
+        next_offset=offset + limit if len(results) > offset + limit else None
+    )
+
+# ======================== BULK INGESTION ========================
+
+class IngestJob:
+    """Turns a batch of source items into briefs; runs as an ``ingest`` queue job.
+
+    Items go to the LLM with bounded parallelism under their own admission
+    lane (``<user_id>:batch``), so a backfill cannot starve the user's
+    interactive chat, and each item spends a token from the user's
+    ``ingest`` rate limit, waiting for it to refill when empty. Parsed
+    briefs are written with ``insert_many`` in batches, and progress is
+    persisted to ``ingest_jobs`` at most every INGEST_PROGRESS_INTERVAL_SECONDS
+    so clients can poll it.
+
+    Every item ends up ``done`` or ``failed`` on its own: a failed LLM call
+    or brief write fails only the items involved. If the job queue stops
+    mid-run the briefs made so far are saved and the job ends ``cancelled``.
+    """
+
+    def __init__(self, res: AppResources, job: dict, items: List[dict], current_user: dict):
+        self.res = res
+        self.job = job
+        self.items = items
+        self.current_user = current_user
+        self.pending_briefs = []  # (item index, brief docs) waiting for the next insert_many
+        self.last_progress = 0.0
+
+    async def run(self):
+        job = self.job
+        job["status"] = "running"
+        indexes = await self.unfinished_items()
+        await self.save_progress(force=True)
+        semaphore = asyncio.Semaphore(INGEST_MAX_PARALLEL)
+
+        async def process(index: int):
+            async with semaphore:
+                await self.process_item(index)
+
+        try:
+            outcomes = await asyncio.gather(*(process(i) for i in indexes), return_exceptions=True)
+            for index, outcome in zip(indexes, outcomes):
+                if isinstance(outcome, Exception):
+                    logger.error(f"Ingest job {job['id']} item {index} error: {str(outcome)}")
+                    if job["items"][index]["status"] not in ("done", "failed"):
+                        self.fail_item(index, str(outcome) or type(outcome).__name__)
+            await self.flush_briefs()
+        except asyncio.CancelledError:
+            # The queue is stopping: keep what finished and close the job out
+            await self.flush_briefs()
+            for index, state in enumerate(job["items"]):
+                if state["status"] in ("pending", "processing"):
+                    self.fail_item(index, "Cancelled before this item was processed")
+            job["status"] = "cancelled"
+            job["error"] = "Stopped before every item was processed"
+            await self.finish()
+            raise
+        if job["failed"] == 0:
+            job["status"] = "completed"
+        elif job["succeeded"] == 0:
+            job["status"] = "failed"
+        else:
+            job["status"] = "completed_with_errors"
+        await self.finish()
+
+    async def unfinished_items(self) -> List[int]:
+        """Indexes left to process. On a rerun after a crash, items whose briefs were saved are kept."""
+        done_ids = [bid for state in self.job["items"] if state["status"] == "done" for bid in state["brief_ids"]]
+        saved = set()
+        if done_ids:
+            saved = {b["id"] for b in await self.res.db.briefs.find(
+                {"id": {"$in": done_ids}, "user_id": self.current_user["id"]}, {"_id": 0, "id": 1}
+            ).to_list(None)}
+        indexes = []
+        for index, state in enumerate(self.job["items"]):
+            if state["status"] == "failed" or (state["status"] == "done" and saved.issuperset(state["brief_ids"])):
+                continue
+            if state["status"] == "done":
+                self.job["succeeded"] -= 1
+            state.update(status="pending", brief_ids=[], error=None)
+            indexes.append(index)
+        return indexes
+
+    def fail_item(self, index: int, error: str):
+        state = self.job["items"][index]
+        if state["status"] == "done":
+            self.job["succeeded"] -= 1
+        state.update(status="failed", brief_ids=[], error=error)
+        self.job["failed"] += 1
+
+    async def take_rate_limit(self):
+        """Spend this item's ``ingest`` token, waiting out an empty bucket like admission rejections."""
+        give_up_at = time.monotonic() + LLM_BACKGROUND_MAX_WAIT_SECONDS
+        while True:
+            try:
+                await self.res.rate_limiter.hit("ingest", self.current_user["id"])
+                return
+            except LimitExceeded as e:
+                if time.monotonic() + e.retry_after > give_up_at:
+                    raise
+                await asyncio.sleep(e.retry_after)
+
+    async def generate(self, message: str) -> str:
+        chat = self.res.llm_clients.new_chat(f"brieflyai-ingest-{self.job['id']}-{uuid.uuid4()}")
+        lane = f"{self.current_user['id']}:batch"
+        return await generate_when_admitted(self.res, self.current_user, message, chat, lane)
+
+    async def process_item(self, index: int):
+        item = self.items[index]
+        state = self.job["items"][index]
+        state["status"] = "processing"
+        try:
+            await self.take_rate_limit()
+            ai_response = await self.generate(item["source_content"])
+            with BRIEF_PARSE_SECONDS.time("full"):
+                drafts = parse_briefs(ai_response)
+            if not drafts:
+                raise ValueError("No brief found in AI response")
+            source = await self.res.blob_store.store(self.current_user["id"], item["source_content"])
+            docs = [
+                new_brief_doc(draft, source, self.current_user["id"], item.get("source_type") or "ai")
+                for draft in drafts
+            ]
+            self.pending_briefs.append((index, docs))
+            state["brief_ids"] = [doc["id"] for doc in docs]
+            state["status"] = "done"
+            self.job["succeeded"] += 1
+        except asyncio.TimeoutError:
+            self.fail_item(index, "AI service timed out")
+        except Exception as e:
+            self.fail_item(index, str(e))
+        if sum(len(docs) for _, docs in self.pending_briefs) >= INGEST_WRITE_BATCH:
+            await self.flush_briefs()
+        await self.save_progress()
+
+    async def flush_briefs(self):
+        batch, self.pending_briefs = self.pending_briefs, []
+        if not batch:
+            return
+        try:
+            await self.res.db.briefs.insert_many([doc for _, docs in batch for doc in docs])
+        except Exception as e:
+            # Only the items whose briefs were in this write fail; the rest of the run carries on
+            logger.error(f"Ingest job {self.job['id']} brief write error: {str(e)}")
+            for index, _ in batch:
+                self.fail_item(index, f"Could not save briefs: {str(e)}")
+            return
+        await invalidate_brief_listing(self.res, self.current_user["id"])
+
+    async def finish(self):
+        self.job["finished_at"] = datetime.now(timezone.utc).isoformat()
+        await self.save_progress(force=True)
+
+    async def save_progress(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self.last_progress < INGEST_PROGRESS_INTERVAL_SECONDS:
+            return
+        self.last_progress = now
+        job = self.job
+        job["updated_at"] = datetime.now(timezone.utc).isoformat()
+        await self.res.db.ingest_jobs.update_one(
+            {"id": job["id"]},
+            {"$set": {k: v for k, v in job.items() if k not in ("id", "user_id", "_id")}}
+        )
+
+async def run_ingest_job(res: AppResources, job: dict) -> dict:
+    ingest = await res.db.ingest_jobs.find_one(
+        {"id": job["payload"]["ingest_job_id"], "user_id": job["user_id"]}, {"_id": 0}
+    )
+    if ingest is None:
+        raise PermanentJobError("Ingest job not found")
+    items = ingest.pop("sources")
+    if ingest["finished_at"] is None:
+        current_user = await load_job_user(res, job["user_id"])
+        await IngestJob(res, ingest, items, current_user).run()
+    return {"ingest_job_id": ingest["id"], "status": ingest["status"]}
+
+@api_router.post(
+    "/briefs/ingest", response_model=IngestJobResponse, status_code=202, dependencies=[Depends(llm_limits)]
+)
+async def ingest_briefs(
+    request: IngestRequest,
+    current_user: dict = Depends(get_current_user),
+    res: AppResources = Depends(get_resources)
+):
+    """Queue a batch of Slack threads or emails for brief extraction."""
+    if not request.items:
+        raise HTTPException(status_code=400, detail="No items to ingest")
+    if len(request.items) > INGEST_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {INGEST_MAX_ITEMS} items per batch")
+
+    now = datetime.now(timezone.utc).isoformat()
+    job = {
+        "id": str(uuid.uuid4()),
+        "user_id": current_user["id"],
+        "status": "queued",
+        "total": len(request.items),
+        "succeeded": 0,
+        "failed": 0,
+        "items": [
+            {"index": i, "status": "pending", "brief_ids": [], "error": None}
+            for i in range(len(request.items))
+        ],
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+        "finished_at": None
+    }
+    # The sources stay in the ingest job document, out of the queue's payload and job listings
+    await res.db.ingest_jobs.insert_one({**job, "sources": [item.model_dump() for item in request.items]})
+    await res.job_queue.enqueue("ingest", {"ingest_job_id": job["id"]}, current_user["id"])
+    return IngestJobResponse(**job)
+
+@api_router.get("/briefs/ingest/{job_id}", response_model=IngestJobResponse)
+async def get_ingest_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_user),
+    res: AppResources = Depends(get_resources)
+):
+    job = await res.db.ingest_jobs.find_one({"id": job_id, "user_id": current_user["id"]}, {"_id": 0, "sources": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingest job not found")
+    return IngestJobResponse(**job)
 
 # ======================== INTEGRATIONS (MOCKED) ========================
 
@@ -539,33 +1961,244 @@ async def connect_integration(integration_name: str, current_user: dict = Depend
         "auth_url": f"https://example.com/oauth/{integration_name}?demo=true"
     }
 
-@api_router.post("/export", response_model=ExportResponse)
-async def export_brief(request: ExportRequest, current_user: dict = Depends(get_current_user)):
-    # Verify brief exists
-    brief = await db.briefs.find_one(
-        {"id": request.brief_id, "user_id": current_user["id"]},
-        {"_id": 0}
+EXPORT_DESTINATIONS = ["asana", "clickup", "sheets"]
+
+def check_export_destination(destination: str):
+    if destination not in EXPORT_DESTINATIONS:
+        raise HTTPException(status_code=400, detail="Invalid export destination")
+
+def exported_update() -> dict:
+    return {
+        "$set": {"status": "exported", "updated_at": datetime.now(timezone.utc).isoformat()},
+        "$inc": {"version": 1}
+    }
+
+async def perform_export(res: AppResources, brief_id: str, destination: str, user_id: str) -> ExportResponse:
+    check_export_destination(destination)
+    adapter = res.export_adapters[destination]
+    query = {"id": brief_id, "user_id": user_id}
+    brief = {"id": brief_id}
+    if not adapter.demo:
+        brief = await res.blob_store.load(await res.db.briefs.find_one(query, BRIEF_PROJECTION), user_id)
+        if not brief:
+            raise HTTPException(status_code=404, detail="Brief not found")
+    export_url = await adapter.export(brief)
+
+    # Verify brief exists and update its status in one round trip
+    brief = await res.db.briefs.find_one_and_update(
+        query,
+        exported_update(),
+        projection={"_id": 0, "id": 1},
+        return_document=ReturnDocument.AFTER
     )
     if not brief:
         raise HTTPException(status_code=404, detail="Brief not found")
-    
-    # Mocked export
-    valid_destinations = ["asana", "clickup", "sheets"]
-    if request.destination not in valid_destinations:
-        raise HTTPException(status_code=400, detail="Invalid export destination")
-    
-    # Update brief status
-    await db.briefs.update_one(
-        {"id": request.brief_id},
-        {"$set": {"status": "exported", "updated_at": datetime.now(timezone.utc).isoformat()}}
-    )
-    
+    await invalidate_brief_listing(res, user_id)
+
+    mode = " (Demo Mode)" if adapter.demo else ""
     return ExportResponse(
         success=True,
-        message=f"Brief exported to {request.destination} successfully (Demo Mode)",
-        export_url=f"https://example.com/{request.destination}/task/demo-123"
+        message=f"Brief exported to {destination} successfully{mode}",
+        export_url=export_url
     )
 
+async def perform_batch_export(res: AppResources, items: List[ExportRequest], user_id: str) -> BatchExportResponse:
+    """Export many briefs with one adapter call per destination, all destinations at once.
+
+    Briefs are read in one query and every brief exported at least once is
+    marked in a single ``update_many``. Failures, including a destination
+    erroring outright, are reported per item; repeated (brief, destination)
+    pairs are exported once.
+    """
+    if not items or len(items) > EXPORT_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A batch holds 1 to {EXPORT_BATCH_MAX_ITEMS} items")
+    for item in items:
+        check_export_destination(item.destination)
+    pairs = list(dict.fromkeys((item.brief_id, item.destination) for item in items))
+
+    briefs = await res.db.briefs.find(
+        {"id": {"$in": list({brief_id for brief_id, _ in pairs})}, "user_id": user_id},
+        BRIEF_PROJECTION
+    ).to_list(None)
+    if any(not res.export_adapters[destination].demo for _, destination in pairs):
+        await res.blob_store.load_many(briefs, user_id)
+    briefs_by_id = {brief["id"]: brief for brief in briefs}
+
+    groups: Dict[str, List[dict]] = {}
+    for brief_id, destination in pairs:
+        if brief_id in briefs_by_id:
+            groups.setdefault(destination, []).append(briefs_by_id[brief_id])
+    outcomes = await asyncio.gather(*(
+        res.export_adapters[destination].export_many(group) for destination, group in groups.items()
+    ), return_exceptions=True)
+    results = {}
+    for (destination, group), outcome in zip(groups.items(), outcomes):
+        if isinstance(outcome, Exception):
+            # One destination failing outright still leaves the others' results to report
+            logger.error(f"Batch export to {destination} failed: {str(outcome)}")
+            error = f"{destination} error: {str(outcome) or type(outcome).__name__}"
+            outcome = [ExportResult(brief["id"], error=error) for brief in group]
+        elif isinstance(outcome, BaseException):
+            raise outcome
+        for result in outcome:
+            results[(result.brief_id, destination)] = result
+
+    exported_ids = list({brief_id for (brief_id, _), result in results.items() if not result.error})
+    if exported_ids:
+        await res.db.briefs.update_many({"id": {"$in": exported_ids}, "user_id": user_id}, exported_update())
+        await invalidate_brief_listing(res, user_id)
+
+    item_results = []
+    for brief_id, destination in pairs:
+        result = results.get((brief_id, destination))
+        item_results.append(BatchExportItemResult(
+            brief_id=brief_id,
+            destination=destination,
+            success=result is not None and not result.error,
+            export_url=result.url if result else None,
+            error=result.error if result else "Brief not found"
+        ))
+    exported = sum(r.success for r in item_results)
+    return BatchExportResponse(exported=exported, failed=len(item_results) - exported, results=item_results)
+
+@api_router.post("/export", response_model=ExportResponse)
+async def export_brief(
+    request: ExportRequest,
+    current_user: dict = Depends(get_current_user),
+    res: AppResources = Depends(get_resources)
+):
+    try:
+        return await perform_export(res, request.brief_id, request.destination, current_user["id"])
+    except (httpx.HTTPError, ExportError) as e:
+        logger.error(f"Export error: {str(e)}")
+        raise HTTPException(status_code=502, detail=f"Export destination error: {str(e)}")
+
+@api_router.post("/export/batch", response_model=BatchExportResponse)
+async def export_briefs(
+    request: BatchExportRequest,
+    current_user: dict = Depends(get_current_user),
+    res: AppResources = Depends(get_resources)
+):
+    """Export up to EXPORT_BATCH_MAX_ITEMS (brief, destination) pairs in one call."""
+    return await perform_batch_export(res, request.items, current_user["id"])
+
+# ======================== BACKGROUND JOBS ========================
+
+async def load_job_user(res: AppResources, user_id: str) -> dict:
+    user = res.principal_cache.get(user_id)
+    if user is None:
+        user = await res.db.users.find_one({"id": user_id}, {"_id": 0, "password": 0})
+        if not user:
+            raise PermanentJobError("User not found")
+        res.principal_cache.set(user_id, user)
+    return user
+
+async def run_chat_job(res: AppResources, job: dict) -> dict:
+    payload = job["payload"]
+    current_user = await load_job_user(res, job["user_id"])
+    conversation_id = payload["conversation_id"]
+    try:
+        await get_or_create_conversation(res, conversation_id, current_user["id"])
+    except HTTPException as e:
+        raise PermanentJobError(e.detail)
+    user_msg = {"role": "user", "content": payload["message"], "timestamp": job["created_at"]}
+    context = await res.context_builder.build(conversation_id, current_user["id"], payload["message"])
+    chat = res.llm_clients.get_chat(current_user["id"], conversation_id)
+    ai_response = await generate_when_admitted(res, current_user, context.prompt, chat, current_user["id"])
+    briefs = await complete_chat_exchange(res, conversation_id, user_msg, ai_response, current_user["id"])
+    return ChatResponse(
+        response=ai_response,
+        conversation_id=conversation_id,
+        brief=briefs[0] if briefs else None,
+        briefs=briefs,
+        revised_brief_ids=[b.id for b in briefs if b.version > 1]
+    ).model_dump()
+
+async def run_export_job(res: AppResources, job: dict) -> dict:
+    payload = job["payload"]
+    try:
+        result = await perform_export(res, payload["brief_id"], payload["destination"], job["user_id"])
+    except HTTPException as e:
+        raise PermanentJobError(e.detail)
+    except ExportError as e:
+        raise PermanentJobError(str(e))
+    except httpx.HTTPStatusError as e:
+        # Client errors will not go away on retry; 429 and 5xx might
+        if e.response.status_code < 500 and e.response.status_code != 429:
+            raise PermanentJobError(str(e))
+        raise
+    return result.model_dump()
+
+@api_router.post("/chat/jobs", response_model=JobResponse, status_code=202, dependencies=[Depends(llm_limits)])
+async def queue_chat(
+    request: ChatRequest,
+    current_user: dict = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None),
+    res: AppResources = Depends(get_resources)
+):
+    """Queue a chat message; poll GET /jobs/{id} for the ChatResponse."""
+    payload = {"message": request.message, "conversation_id": request.conversation_id or str(uuid.uuid4())}
+    # Refuse another user's conversation now rather than in the job
+    await get_or_create_conversation(res, payload["conversation_id"], current_user["id"])
+    job = await res.job_queue.enqueue("chat", payload, current_user["id"], idempotency_key)
+    return JobResponse(**job)
+
+@api_router.post("/export/jobs", response_model=JobResponse, status_code=202)
+async def queue_export(
+    request: ExportRequest,
+    current_user: dict = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None),
+    res: AppResources = Depends(get_resources)
+):
+    """Queue an export; poll GET /jobs/{id} for the ExportResponse."""
+    check_export_destination(request.destination)
+    if not await res.db.briefs.find_one({"id": request.brief_id, "user_id": current_user["id"]}, {"_id": 0, "id": 1}):
+        raise HTTPException(status_code=404, detail="Brief not found")
+    job = await res.job_queue.enqueue("export", request.model_dump(), current_user["id"], idempotency_key)
+    return JobResponse(**job)
+
+@api_router.get("/jobs", response_model=List[JobResponse])
+async def list_jobs(
+    limit: int = Query(50, ge=1, le=200),
+    current_user: dict = Depends(get_current_user),
+    res: AppResources = Depends(get_resources)
+):
+    return [JobResponse(**job) for job in await res.job_queue.list(current_user["id"], limit)]
+
+@api_router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_user),
+    res: AppResources = Depends(get_resources)
+):
+    job = await res.job_queue.get(job_id, current_user["id"])
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobResponse(**job)
+
+# ======================== METRICS ========================
+
+metrics_registry.gauge("brieflyai_llm_calls_in_flight", "LLM calls holding an admission slot",
+                       callback=lambda: sum(r.llm_admission.in_flight for r in running_resources))
+metrics_registry.gauge("brieflyai_llm_calls_waiting", "LLM calls queued for an admission slot",
+                       callback=lambda: sum(r.llm_admission.waiting for r in running_resources))
+metrics_registry.gauge("brieflyai_password_hash_queue_depth", "bcrypt jobs waiting for a worker",
+                       callback=lambda: sum(r.password_hasher.queue_depth for r in running_resources))
+metrics_registry.gauge("brieflyai_job_queue_depth", "Background jobs waiting for a worker",
+                       callback=lambda: sum(r.job_queue.stats()["queued"] for r in running_resources))
+metrics_registry.gauge("brieflyai_event_loop_lag_seconds", "Latest event loop lag sample",
+                       callback=lambda: max((r.loop_monitor.lag for r in running_resources), default=0.0))
+metrics_registry.gauge("brieflyai_event_loop_max_lag_seconds", "Largest event loop lag seen",
+                       callback=lambda: max((r.loop_monitor.max_lag for r in running_resources), default=0.0))
+
+metrics_router = APIRouter()
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def metrics():
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(content=metrics_registry.render(), media_type=CONTENT_TYPE)
+
 # ======================== HEALTH CHECK ========================
 
 @api_router.get("/")
@@ -573,13 +2206,88 @@ async def root():
     return {"message": "BrieflyAI API is running", "version": "1.0.0"}
 
 @api_router.get("/health")
-async def health():
-    return {"status": "healthy"}
+async def health(res: AppResources = Depends(get_resources)):
+    return {
+        "status": "healthy",
+        "password_hasher": res.password_hasher.stats(),
+        "principal_cache": res.principal_cache.stats(),
+        "llm_clients": res.llm_clients.stats(),
+        "llm_admission": res.llm_admission.stats(),
+        "response_cache": res.response_cache.stats() if res.response_cache else None,
+        "context_builder": res.context_builder.stats(),
+        "job_queue": res.job_queue.stats(),
+        "rate_limiter": res.rate_limiter.stats(),
+        "usage_meter": res.usage_meter.stats(),
+        "shared_state": res.shared_state.stats(),
+        "blob_store": res.blob_store.stats(),
+        "export_adapters": {name: adapter.stats() for name, adapter in res.export_adapters.items()}
+    }
+
+# ======================== APP ========================
+
+async def provision_indexes(res: AppResources):
+    """Create indexes once per deployment start rather than once per worker.
+
+    The mock database lives in each worker, so every worker provisions its own.
+    """
+    if not use_mock_db and not await res.shared_state.add("startup:indexes", os.getpid(), ttl=60):
+        logger.info("Index provisioning is running in another worker")
+        return
+    try:
+        await ensure_indexes(res.db)
+    finally:
+        if not use_mock_db:
+            await res.shared_state.delete("startup:indexes")
+
+def warn_about_per_process_state():
+    if WORKER_COUNT <= 1:
+        return
+    if use_mock_db:
+        logger.warning("USE_MOCK_DB keeps data in each worker; requests only see writes made by the same worker")
+    if SHARED_STATE_BACKEND == "memory":
+        logger.warning("SHARED_STATE_BACKEND=memory is per worker; use sqlite with several workers")
+    if JOB_QUEUE_BACKEND == "memory":
+        logger.warning("JOB_QUEUE_BACKEND=memory is per worker; job status is only visible to the worker that queued it")
+
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    resources = AppResources()
+    application.state.resources = resources
+    await resources.start()
+    try:
+        yield
+    finally:
+        await resources.close()
+
+def create_app() -> FastAPI:
+    """Build the ASGI app; ``uvicorn server:create_app --factory`` calls this in each worker."""
+    application = FastAPI(title="BrieflyAI API", lifespan=lifespan)
+    application.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["ETag", "X-Next-Cursor", "Retry-After", *RATE_LIMIT_HEADERS],
+    )
+    if METRICS_ENABLED:
+        application.add_middleware(
+            MetricsMiddleware,
+            requests=HTTP_REQUESTS,
+            latency=HTTP_REQUEST_SECONDS,
+            in_flight=HTTP_IN_FLIGHT
+        )
+    if GZIP_ENABLED:
+        application.add_middleware(CompressionMiddleware, minimum_size=GZIP_MINIMUM_SIZE, level=GZIP_COMPRESSION_LEVEL)
+    application.include_router(api_router)
+    application.include_router(metrics_router)
+    return application
 
-# Include router
-app.include_router(api_router)
+def __getattr__(name: str):
+    # ``uvicorn server:app`` without --factory: build the app on first use, so
+    # importing this module (or running the factory) does not create one
+    if name == "app":
+        globals()["app"] = application = create_app()
+        return application
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    if client:
-        client.close()
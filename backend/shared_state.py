@@ -0,0 +1,257 @@
+"""Small key/value state shared by every worker process on a host.
+
+Caches and counters that live in a module-level dict are per process, so
+with several uvicorn workers an invalidation or a rate limit only applies to
+the worker that happened to serve the request. Code that needs the numbers
+to agree across workers goes through a ``SharedState`` instead:
+
+* ``MemorySharedState`` - a dict; correct for a single worker and the
+  default.
+* ``SqliteSharedState`` - one SQLite file in WAL mode. Every write is a
+  single statement or an ``IMMEDIATE`` transaction, so ``incr``, ``add`` and
+  ``take`` are atomic across processes.
+  Calls run on a one-thread executor to keep file I/O off the event loop.
+
+Values are anything JSON can encode. ``ttl`` is in seconds; expired keys read
+as missing and are purged lazily. ``take`` is a token bucket: it refills and
+spends in one atomic step and forgets the key once the bucket is full again.
+"""
+import asyncio
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+PURGE_EVERY_WRITES = 1000
+
+
+class TakeResult(NamedTuple):
+    allowed: bool
+    remaining: float      # tokens left after this call
+    retry_after: float    # seconds until ``cost`` tokens are available; 0 if allowed
+    full_after: float     # seconds until the bucket is full again
+
+
+def refill_bucket(bucket, now: float, capacity: float, rate: float, cost: float):
+    """Apply one token-bucket step; ``bucket`` is [tokens, updated_at] or None for a full bucket."""
+    tokens, updated = bucket if bucket else (capacity, now)
+    tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+    allowed = tokens >= cost
+    if allowed:
+        tokens -= cost
+    retry_after = 0.0 if allowed else (cost - tokens) / rate
+    return [tokens, now], TakeResult(allowed, tokens, retry_after, (capacity - tokens) / rate)
+
+
+class MemorySharedState:
+    backend = "memory"
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self._writes = 0
+
+    def _live(self, key: str):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    def _expiry(self, ttl: Optional[float]) -> Optional[float]:
+        return time.monotonic() + ttl if ttl is not None else None
+
+    def _wrote(self):
+        self._writes += 1
+        if self._writes % PURGE_EVERY_WRITES == 0:
+            now = time.monotonic()
+            for key in [k for k, (_, expires) in self._data.items() if expires is not None and expires <= now]:
+                del self._data[key]
+
+    async def get(self, key: str, default=None):
+        entry = self._live(key)
+        return default if entry is None else entry[0]
+
+    async def set(self, key: str, value, ttl: Optional[float] = None):
+        self._data[key] = (value, self._expiry(ttl))
+        self._wrote()
+
+    async def add(self, key: str, value, ttl: Optional[float] = None) -> bool:
+        """Set ``key`` only if it is missing; True if this call set it."""
+        if self._live(key) is not None:
+            return False
+        await self.set(key, value, ttl)
+        return True
+
+    async def delete(self, key: str):
+        self._data.pop(key, None)
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """Add ``amount`` and return the new value; ``ttl`` applies when the key is created."""
+        entry = self._live(key)
+        if entry is None:
+            value, expires = amount, self._expiry(ttl)
+        else:
+            value, expires = entry[0] + amount, entry[1]
+        self._data[key] = (value, expires)
+        self._wrote()
+        return value
+
+    async def take(self, key: str, capacity: float, rate: float, cost: float = 1.0) -> TakeResult:
+        """Spend ``cost`` tokens from a bucket of ``capacity`` refilling at ``rate`` per second."""
+        now = time.monotonic()
+        entry = self._live(key)
+        bucket, result = refill_bucket(entry[0] if entry else None, now, capacity, rate, cost)
+        self._data[key] = (bucket, now + result.full_after)
+        self._wrote()
+        return result
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, "keys": len(self._data)}
+
+
+class SqliteSharedState:
+    backend = "sqlite"
+
+    def __init__(self, path: Path, busy_timeout: float = 5.0):
+        self.path = Path(path)
+        self.busy_timeout = busy_timeout
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shared-state")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=self.busy_timeout, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS shared_state (key TEXT PRIMARY KEY, value, expires_at REAL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def _wrote(self, conn: sqlite3.Connection, now: float):
+        self._writes += 1
+        if self._writes % PURGE_EVERY_WRITES == 0:
+            conn.execute("DELETE FROM shared_state WHERE expires_at <= ?", (now,))
+
+    @staticmethod
+    def _expiry(now: float, ttl: Optional[float]) -> Optional[float]:
+        return now + ttl if ttl is not None else None
+
+    def _get(self, key: str):
+        row = self._connection().execute(
+            "SELECT value FROM shared_state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        # incr stores numbers natively; everything else is JSON text
+        return json.loads(row[0]) if isinstance(row[0], str) else row[0]
+
+    def _set(self, key: str, value, ttl: Optional[float]):
+        conn, now = self._connection(), time.time()
+        conn.execute(
+            "INSERT INTO shared_state (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+            (key, json.dumps(value), self._expiry(now, ttl))
+        )
+        self._wrote(conn, now)
+
+    def _add(self, key: str, value, ttl: Optional[float]) -> bool:
+        conn, now = self._connection(), time.time()
+        cursor = conn.execute(
+            "INSERT INTO shared_state (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+            "WHERE shared_state.expires_at IS NOT NULL AND shared_state.expires_at <= ?",
+            (key, json.dumps(value), self._expiry(now, ttl), now)
+        )
+        self._wrote(conn, now)
+        return cursor.rowcount > 0
+
+    def _delete(self, key: str):
+        self._connection().execute("DELETE FROM shared_state WHERE key = ?", (key,))
+
+    def _incr(self, key: str, amount: int, ttl: Optional[float]) -> int:
+        conn, now = self._connection(), time.time()
+        row = conn.execute(
+            "INSERT INTO shared_state (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET "
+            "value = CASE WHEN shared_state.expires_at <= ? THEN excluded.value "
+            "ELSE shared_state.value + excluded.value END, "
+            "expires_at = CASE WHEN shared_state.expires_at <= ? THEN excluded.expires_at "
+            "ELSE shared_state.expires_at END "
+            "RETURNING value",
+            (key, amount, self._expiry(now, ttl), now, now)
+        ).fetchone()
+        self._wrote(conn, now)
+        return row[0]
+
+    def _take(self, key: str, capacity: float, rate: float, cost: float) -> TakeResult:
+        conn, now = self._connection(), time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value FROM shared_state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, now)
+            ).fetchone()
+            bucket, result = refill_bucket(json.loads(row[0]) if row else None, now, capacity, rate, cost)
+            conn.execute(
+                "INSERT OR REPLACE INTO shared_state (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(bucket), now + result.full_after)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._wrote(conn, now)
+        return result
+
+    async def get(self, key: str, default=None):
+        value = await self._run(self._get, key)
+        return default if value is None else value
+
+    async def set(self, key: str, value, ttl: Optional[float] = None):
+        await self._run(self._set, key, value, ttl)
+
+    async def add(self, key: str, value, ttl: Optional[float] = None) -> bool:
+        return await self._run(self._add, key, value, ttl)
+
+    async def delete(self, key: str):
+        await self._run(self._delete, key)
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        return await self._run(self._incr, key, amount, ttl)
+
+    async def take(self, key: str, capacity: float, rate: float, cost: float = 1.0) -> TakeResult:
+        return await self._run(self._take, key, capacity, rate, cost)
+
+    async def close(self):
+        if self._conn is not None:
+            await self._run(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, "path": str(self.path)}
+
+
+def create_shared_state(backend: str, path: Path):
+    if backend == "sqlite":
+        return SqliteSharedState(path)
+    if backend == "memory":
+        return MemorySharedState()
+    raise ValueError(f"Unknown shared state backend: {backend}")
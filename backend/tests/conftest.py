@@ -0,0 +1,47 @@
+import os
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# The backend modules are imported top level, as uvicorn runs them from backend/
+sys.path.insert(0, str(BACKEND_DIR))
+
+# server.py reads its settings at import time
+os.environ.setdefault("USE_MOCK_DB", "true")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ.setdefault("LLM_STUB_LATENCY_SECONDS", "0")
+os.environ.setdefault("METRICS_ENABLED", "false")
+os.environ.setdefault("SHARED_STATE_BACKEND", "memory")
+os.environ.setdefault("RESPONSE_CACHE_BACKEND", "memory")
+
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+
+
+@pytest.fixture
+def client():
+    with TestClient(server.create_app()) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def register():
+    """Registers a fresh user on a test client and returns its Authorization headers."""
+    def register_user(test_client: TestClient) -> dict:
+        response = test_client.post("/api/auth/register", json={
+            "email": f"user-{uuid.uuid4().hex[:12]}@example.com", "password": "pw-123456", "name": "Test"
+        })
+        assert response.status_code == 200
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return register_user
+
+
+@pytest.fixture
+def auth_headers(client, register):
+    return register(client)
@@ -0,0 +1,38 @@
+from fastapi.testclient import TestClient
+
+import server
+
+
+def test_each_app_opens_its_own_resources(register):
+    first, second = server.create_app(), server.create_app()
+    with TestClient(first) as client:
+        register(client)
+        first_resources = first.state.resources
+    with TestClient(second) as client:
+        # bcrypt pool, shared state and job queue were closed with the first app
+        register(client)
+        assert second.state.resources is not first_resources
+        assert second.state.resources.db is not first_resources.db
+
+
+def test_an_app_survives_several_lifespan_cycles(register):
+    application = server.create_app()
+    for _ in range(2):
+        with TestClient(application) as client:
+            me = client.get("/api/auth/me", headers=register(client))
+            assert me.status_code == 200
+            assert client.get("/api/health").json()["status"] == "healthy"
+
+
+
+def test_apps_open_at_the_same_time_keep_their_own_data(register):
+    with TestClient(server.create_app()) as alpha, TestClient(server.create_app()) as beta:
+        headers = register(alpha)
+        created = alpha.post("/api/briefs", json={"title": "Alpha only"}, headers=headers)
+        assert created.status_code == 200
+
+        # The second app has its own mock database, so the first app's user is unknown there
+        assert beta.get("/api/auth/me", headers=headers).status_code == 401
+        register(beta)
+        assert [b["title"] for b in alpha.get("/api/briefs", headers=headers).json()] == ["Alpha only"]
+        assert alpha.get("/api/health").json()["status"] == "healthy"
@@ -0,0 +1,66 @@
+from export_adapters import DemoAdapter
+
+
+class BrokenDestination(DemoAdapter):
+    """export_many itself blows up, as an adapter bug or lost client would."""
+
+    async def export_many(self, briefs):
+        raise RuntimeError("client has been closed")
+
+
+class BadPayloadDestination(DemoAdapter):
+    async def create_tasks(self, briefs):
+        raise TypeError("Object of type datetime is not JSON serializable")
+
+
+def create_briefs(client, headers, count):
+    return [
+        client.post("/api/briefs", json={"title": f"Brief {i}"}, headers=headers).json()["id"]
+        for i in range(count)
+    ]
+
+
+def test_batch_export_reports_each_item(client, auth_headers):
+    first, second = create_briefs(client, auth_headers, 2)
+    items = [
+        {"brief_id": first, "destination": "asana"},
+        {"brief_id": second, "destination": "sheets"},
+        {"brief_id": "missing", "destination": "clickup"},
+        {"brief_id": first, "destination": "asana"},
+    ]
+    body = client.post("/api/export/batch", json={"items": items}, headers=auth_headers).json()
+    assert (body["exported"], body["failed"]) == (2, 1)
+    assert [(r["brief_id"], r["success"]) for r in body["results"]] == [
+        (first, True), (second, True), ("missing", False)
+    ]
+    assert body["results"][2]["error"] == "Brief not found"
+    assert client.get(f"/api/briefs/{first}", headers=auth_headers).json()["status"] == "exported"
+
+
+def test_a_failing_destination_does_not_fail_the_batch(client, auth_headers):
+    adapters = client.app.state.resources.export_adapters
+    adapters["clickup"] = BrokenDestination("clickup")
+    adapters["sheets"] = BadPayloadDestination("sheets")
+    first, second, third = create_briefs(client, auth_headers, 3)
+    items = [
+        {"brief_id": first, "destination": "asana"},
+        {"brief_id": second, "destination": "clickup"},
+        {"brief_id": third, "destination": "sheets"},
+    ]
+    response = client.post("/api/export/batch", json={"items": items}, headers=auth_headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["exported"], body["failed"]) == (1, 2)
+    results = body["results"]
+    assert results[0]["success"] and results[0]["export_url"]
+    assert results[1]["error"] == "clickup error: client has been closed"
+    assert results[2]["error"] == "sheets error: Object of type datetime is not JSON serializable"
+
+    statuses = {b["id"]: b["status"] for b in client.get("/api/briefs", headers=auth_headers).json()}
+    assert statuses == {first: "exported", second: "draft", third: "draft"}
+
+
+def test_batch_size_is_validated(client, auth_headers):
+    assert client.post("/api/export/batch", json={"items": []}, headers=auth_headers).status_code == 400
+    invalid = [{"brief_id": "x", "destination": "trello"}]
+    assert client.post("/api/export/batch", json={"items": invalid}, headers=auth_headers).status_code == 400
@@ -0,0 +1,105 @@
+import uuid
+
+import server
+from brief_dedup import best_match, fingerprint
+
+DRAFT = {
+    "title": "Spring Launch",
+    "objective": "Grow newsletter signups by twenty percent before the spring sale",
+    "deliverables": ["Landing page refresh", "Three social posts", "Launch email"],
+    "deadline": "2025-03-31",
+    "owners": ["Dana"],
+    "assets": [],
+    "open_questions": ["What is the budget?"],
+}
+
+
+def candidate(conversation_id, **overrides):
+    return {"id": str(uuid.uuid4()), "conversation_id": conversation_id, "status": "draft", **DRAFT, **overrides}
+
+
+def test_same_conversation_match():
+    existing = candidate("c1", objective=DRAFT["objective"] + " and retention")
+    assert best_match(DRAFT, [existing], "c1", 0.5)[0] is existing
+
+
+def test_same_title_in_the_same_conversation_is_a_revision():
+    existing = candidate("c1", objective="Something else entirely", deliverables=[], open_questions=[])
+    assert best_match(DRAFT, [existing], "c1", 0.9)[0] is existing
+
+
+def test_other_conversations_are_ignored_by_default():
+    assert best_match(DRAFT, [candidate("c2")], "c1", 0.5) is None
+    assert best_match(DRAFT, [candidate(None)], "c1", 0.5) is None
+
+
+def test_cross_conversation_match_needs_title_and_an_unexported_brief():
+    assert best_match(DRAFT, [candidate("c2")], "c1", 0.5, 0.85) is not None
+    assert best_match(DRAFT, [candidate("c2", title="Autumn Launch")], "c1", 0.5, 0.85) is None
+    assert best_match(DRAFT, [candidate("c2", status="exported")], "c1", 0.5, 0.85) is None
+
+
+def test_fingerprint_is_stable_and_empty_without_text():
+    assert fingerprint(DRAFT) == fingerprint(dict(DRAFT))
+    assert fingerprint({"title": "", "objective": ""}) == []
+
+
+def chat(client, headers, conversation_id=None) -> dict:
+    response = client.post("/api/chat", headers=headers, json={
+        "message": f"Brief for {uuid.uuid4()}", "conversation_id": conversation_id
+    })
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_a_new_conversation_creates_its_own_brief(client, auth_headers):
+    # The stub LLM returns the same brief every time
+    first, second = chat(client, auth_headers), chat(client, auth_headers)
+    assert first["brief"]["id"] != second["brief"]["id"]
+    assert second["revised_brief_ids"] == []
+    assert second["brief"]["conversation_id"] == second["conversation_id"]
+
+
+def test_iterating_in_a_conversation_revises_its_brief(client, auth_headers):
+    first = chat(client, auth_headers)
+    second = chat(client, auth_headers, first["conversation_id"])
+    assert second["revised_brief_ids"] == [first["brief"]["id"]]
+    assert second["brief"]["version"] == 2
+    versions = client.get(f"/api/briefs/{first['brief']['id']}/versions", headers=auth_headers).json()
+    assert [v["version"] for v in versions] == [1]
+
+
+def test_cross_conversation_revision_keeps_the_original_brief(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(server, "BRIEF_DEDUP_CROSS_THRESHOLD", 0.85)
+    first = chat(client, auth_headers)
+    second = chat(client, auth_headers)
+    assert second["revised_brief_ids"] == [first["brief"]["id"]]
+    revised = second["brief"]
+    assert revised["conversation_id"] == first["conversation_id"]
+    assert revised["source_content"] == first["brief"]["source_content"]
+
+
+def test_exported_briefs_are_not_revised_from_other_conversations(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(server, "BRIEF_DEDUP_CROSS_THRESHOLD", 0.85)
+    first = chat(client, auth_headers)
+    exported = client.post("/api/export", headers=auth_headers,
+                           json={"brief_id": first["brief"]["id"], "destination": "asana"})
+    assert exported.status_code == 200
+    second = chat(client, auth_headers)
+    assert second["revised_brief_ids"] == []
+    assert second["brief"]["id"] != first["brief"]["id"]
+
+
+def test_revising_an_exported_brief_returns_it_to_draft(client, auth_headers):
+    first = chat(client, auth_headers)
+    brief_id = first["brief"]["id"]
+    exported = client.post("/api/export", headers=auth_headers, json={"brief_id": brief_id, "destination": "asana"})
+    assert exported.status_code == 200
+
+    second = chat(client, auth_headers, first["conversation_id"])
+    assert second["revised_brief_ids"] == [brief_id]
+    assert second["brief"]["status"] == "draft"
+    assert client.get(f"/api/briefs/{brief_id}", headers=auth_headers).json()["status"] == "draft"
+    # The exported state is kept as the version the revision replaced
+    versions = client.get(f"/api/briefs/{brief_id}/versions", headers=auth_headers).json()
+    assert versions[0]["status"] == "exported"
@@ -0,0 +1,68 @@
+def create_briefs(client, headers, count: int) -> list:
+    ids = []
+    for i in range(count):
+        response = client.post("/api/briefs", headers=headers, json={"title": f"Brief {i}", "objective": "Ship it"})
+        assert response.status_code == 200
+        ids.append(response.json()["id"])
+    return ids
+
+
+def walk_pages(client, headers, limit: int) -> list:
+    pages, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/briefs", headers=headers, params=params)
+        assert response.status_code == 200
+        pages.append([b["id"] for b in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return pages
+
+
+def test_cursor_pages_cover_every_brief_once_newest_first(client, auth_headers):
+    created = create_briefs(client, auth_headers, 4)
+    # Briefs sharing an updated_at are ordered by id, so a page boundary inside the tie loses nothing
+    user_id = client.get("/api/auth/me", headers=auth_headers).json()["id"]
+    tied = [f"tied-{i}" for i in range(5)]
+    client.portal.call(client.app.state.resources.db.briefs.insert_many, [
+        {"id": brief_id, "user_id": user_id, "title": brief_id, "status": "draft", "version": 1,
+         "created_at": "2020-01-01T00:00:00+00:00", "updated_at": "2020-01-01T00:00:00+00:00"}
+        for brief_id in tied
+    ])
+
+    pages = walk_pages(client, auth_headers, limit=3)
+    seen = [brief_id for page in pages for brief_id in page]
+    assert [len(page) for page in pages] == [3, 3, 3]
+    assert seen == created[::-1] + sorted(tied, reverse=True)
+    assert len(set(seen)) == len(seen)
+
+
+def test_fields_projects_the_listing(client, auth_headers):
+    create_briefs(client, auth_headers, 2)
+    briefs = client.get("/api/briefs", headers=auth_headers, params={"fields": "title"}).json()
+    assert [set(b) for b in briefs] == [{"id", "updated_at", "title"}] * 2
+    response = client.get("/api/briefs", headers=auth_headers, params={"fields": "title,password"})
+    assert response.status_code == 400
+    assert client.get("/api/briefs", headers=auth_headers, params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_unchanged_listing_is_not_modified_until_a_write(client, auth_headers):
+    first, second = create_briefs(client, auth_headers, 2)
+    listing = client.get("/api/briefs", headers=auth_headers)
+    etag = listing.headers["ETag"]
+    assert client.get("/api/briefs", headers={**auth_headers, "If-None-Match": etag}).status_code == 304
+    # The ETag covers the page shape as well as the data
+    assert client.get("/api/briefs", headers={**auth_headers, "If-None-Match": etag},
+                      params={"fields": "title"}).status_code == 200
+
+    assert client.put(f"/api/briefs/{first}", headers=auth_headers, json={"title": "Renamed"}).status_code == 200
+    updated = client.get("/api/briefs", headers={**auth_headers, "If-None-Match": etag})
+    assert updated.status_code == 200
+    assert updated.json()[0]["title"] == "Renamed"
+    etag = updated.headers["ETag"]
+
+    assert client.delete(f"/api/briefs/{second}", headers=auth_headers).status_code == 200
+    remaining = client.get("/api/briefs", headers={**auth_headers, "If-None-Match": etag})
+    assert remaining.status_code == 200
+    assert [b["id"] for b in remaining.json()] == [first]
+    assert remaining.headers["ETag"] != etag
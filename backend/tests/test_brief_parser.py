@@ -0,0 +1,106 @@
+from brief_parser import DEFAULT_TITLE, BriefParser, contains_brief, parse_briefs
+
+REPLY = """Here is a brief based on your request:
+
+## Brief: Spring Launch
+**Objective:** Grow newsletter signups by 20%
+**Deliverables:**
+- Landing page
+- Three social posts
+**Deadline:** 2025-03-31
+**Owners:** Dana, Lee
+**Assets:** https://example.com/kit
+**Open Questions:**
+- What is the budget?
+- Who signs off on copy?
+"""
+
+EXPECTED = {
+    "title": "Spring Launch",
+    "objective": "Grow newsletter signups by 20%",
+    "deliverables": ["Landing page", "Three social posts"],
+    "deadline": "2025-03-31",
+    "owners": ["Dana, Lee"],
+    "assets": ["https://example.com/kit"],
+    "open_questions": ["What is the budget?", "Who signs off on copy?"],
+}
+
+
+def feed_in_chunks(text: str, size: int):
+    parser = BriefParser()
+    events = []
+    for start in range(0, len(text), size):
+        events.extend(parser.feed(text[start:start + size]))
+    events.extend(parser.close())
+    return parser, events
+
+
+def field_events(events):
+    return [(index, field, value) for kind, index, field, value in events if kind == "field"]
+
+
+def test_parse_briefs_reads_every_section():
+    assert parse_briefs(REPLY) == [EXPECTED]
+
+
+def test_reply_without_brief_parses_to_nothing():
+    assert not contains_brief("Sure, what should the brief cover?")
+    assert parse_briefs("Sure, what should the brief cover?") == []
+
+
+def test_any_chunk_size_gives_the_same_drafts():
+    # Small sizes split "## Brief:", "**Objective:**" and "\n" across chunks
+    for size in (1, 2, 3, 5, 7, 13, 64, len(REPLY)):
+        parser, _ = feed_in_chunks(REPLY, size)
+        assert parser.drafts == [EXPECTED], size
+
+
+def test_markers_split_at_every_position():
+    for cut in range(1, len(REPLY)):
+        parser = BriefParser()
+        parser.feed(REPLY[:cut])
+        parser.feed(REPLY[cut:])
+        parser.close()
+        assert parser.drafts == [EXPECTED], cut
+
+
+def test_fields_are_emitted_as_their_sections_close():
+    parser = BriefParser()
+    events = parser.feed("## Brief: Spring Launch\n**Objective:** Grow signups\n**Deliverables:**\n- Landing")
+    assert field_events(events) == [(0, "title", "Spring Launch"), (0, "objective", "Grow signups")]
+
+    # The deliverables list stays open until the next section header arrives
+    events = parser.feed(" page\n**Deadline:** Friday\n")
+    assert field_events(events) == [(0, "deliverables", ["Landing page"]), (0, "deadline", "Friday")]
+
+    events = parser.close()
+    assert [kind for kind, *_ in events] == ["brief"]
+    assert events[0][3]["deadline"] == "Friday"
+
+
+def test_unterminated_last_line_is_parsed_on_close():
+    parser = BriefParser()
+    assert parser.feed("**Objective:** No trailing newline") == []
+    events = parser.close()
+    assert (0, "objective", "No trailing newline") in field_events(events)
+    assert parser.drafts[0]["title"] == DEFAULT_TITLE
+
+
+def test_each_heading_starts_a_new_brief():
+    reply = REPLY + "\n## Brief: Autumn Webinar\n**Objective:** Fill 200 seats\n"
+    parser, events = feed_in_chunks(reply, 4)
+    assert [draft["title"] for draft in parser.drafts] == ["Spring Launch", "Autumn Webinar"]
+    assert parser.drafts[1]["objective"] == "Fill 200 seats"
+    assert parser.drafts[1]["deliverables"] == []
+    assert [index for kind, index, *_ in events if kind == "brief"] == [0, 1]
+
+
+def test_inline_list_text_becomes_first_item():
+    drafts = parse_briefs("**Objective:** X\n**Deliverables:** Video\n- Poster\n")
+    assert drafts[0]["deliverables"] == ["Video", "Poster"]
+
+
+def test_bullets_outside_a_list_section_are_ignored():
+    drafts = parse_briefs("## Brief: T\n- stray bullet\n**Objective:** Y\n- not a list item\n")
+    assert drafts[0]["objective"] == "Y"
+    assert all(drafts[0][field] == [] for field in ("deliverables", "owners", "assets", "open_questions"))
@@ -0,0 +1,58 @@
+def create_brief(client, headers) -> str:
+    response = client.post("/api/briefs", headers=headers, json={"title": "Launch", "objective": "Ship it"})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def put(client, headers, brief_id, body, if_match=None):
+    if if_match is not None:
+        headers = {**headers, "If-Match": if_match}
+    return client.put(f"/api/briefs/{brief_id}", headers=headers, json=body)
+
+
+def test_update_applies_only_at_the_expected_version(client, auth_headers):
+    brief_id = create_brief(client, auth_headers)
+    etag = client.get(f"/api/briefs/{brief_id}", headers=auth_headers).headers["ETag"]
+    assert etag == '"1"'
+
+    updated = put(client, auth_headers, brief_id, {"title": "Launch v2"}, if_match=etag)
+    assert updated.status_code == 200
+    assert (updated.json()["title"], updated.json()["version"], updated.headers["ETag"]) == ("Launch v2", 2, '"2"')
+
+    # A writer still holding version 1 is refused and changes nothing
+    stale = put(client, auth_headers, brief_id, {"title": "Lost update"}, if_match=etag)
+    assert stale.status_code == 409
+    brief = client.get(f"/api/briefs/{brief_id}", headers=auth_headers).json()
+    assert (brief["title"], brief["version"]) == ("Launch v2", 2)
+
+    assert put(client, auth_headers, brief_id, {"title": "Weak"}, if_match='W/"2"').status_code == 200
+    assert put(client, auth_headers, brief_id, {"title": "Any"}, if_match="*").json()["version"] == 4
+    assert put(client, auth_headers, brief_id, {"title": "Unconditional"}).json()["version"] == 5
+
+
+def test_missing_and_foreign_briefs_are_not_found(client, auth_headers, register):
+    brief_id = create_brief(client, auth_headers)
+    other = register(client)
+    for headers, target in ((auth_headers, "missing"), (other, brief_id)):
+        assert put(client, headers, target, {"title": "x"}).status_code == 404
+        # A stale version on a brief the caller cannot see is still a 404, not a conflict
+        assert put(client, headers, target, {"title": "x"}, if_match='"1"').status_code == 404
+    assert client.get(f"/api/briefs/{brief_id}", headers=auth_headers).json()["title"] == "Launch"
+
+
+def test_malformed_if_match_is_rejected(client, auth_headers):
+    brief_id = create_brief(client, auth_headers)
+    assert put(client, auth_headers, brief_id, {"title": "x"}, if_match='"one"').status_code == 400
+
+
+def test_briefs_from_before_versioning_match_version_zero(client, auth_headers):
+    user_id = client.get("/api/auth/me", headers=auth_headers).json()["id"]
+    client.portal.call(client.app.state.resources.db.briefs.insert_one, {
+        "id": "legacy", "user_id": user_id, "title": "Old", "objective": "", "deliverables": [], "deadline": "",
+        "owners": [], "assets": [], "open_questions": [], "source_type": "manual", "source_content": "",
+        "status": "draft", "created_at": "2020-01-01T00:00:00+00:00", "updated_at": "2020-01-01T00:00:00+00:00"
+    })
+    assert client.get("/api/briefs/legacy", headers=auth_headers).headers["ETag"] == '"0"'
+    assert put(client, auth_headers, "legacy", {"title": "x"}, if_match='"3"').status_code == 409
+    updated = put(client, auth_headers, "legacy", {"title": "New"}, if_match='"0"')
+    assert (updated.status_code, updated.json()["version"]) == (200, 1)
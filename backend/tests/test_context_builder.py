@@ -0,0 +1,97 @@
+import asyncio
+
+from context_builder import ContextBuilder, extend_summary, message_tokens
+from message_store import append_messages
+from mock_db import MockDB
+
+
+def turn(i: int) -> dict:
+    return {"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i} " + "x" * 800}
+
+
+async def conversation_with(db, count: int) -> str:
+    await db.conversations.insert_one({"id": "c1", "user_id": "u1", "message_count": 0})
+    await append_messages(db, "c1", "u1", [turn(i) for i in range(count)])
+    return "c1"
+
+
+def test_new_conversation_gets_the_bare_message():
+    async def scenario():
+        builder = ContextBuilder(MockDB(), "System prompt")
+        return await builder.build(None, "u1", "Hello")
+
+    context = asyncio.run(scenario())
+    assert (context.prompt, context.turns, context.summary) == ("Hello", 0, "")
+
+
+def test_recent_turns_fill_the_window_newest_first():
+    async def scenario():
+        db = MockDB()
+        await conversation_with(db, 3)
+        return await ContextBuilder(db, "S", token_budget=4000, max_turns=20).build("c1", "u1", "Next")
+
+    context = asyncio.run(scenario())
+    assert context.turns == 3
+    assert context.summary == ""
+    assert context.prompt.endswith("Current message:\nNext")
+
+
+def test_context_only_uses_the_users_own_messages():
+    async def scenario():
+        db = MockDB()
+        await conversation_with(db, 3)
+        # Another user's conversation under the same id, as the pre-fix upsert created
+        await db.conversations.insert_one({"id": "c1", "user_id": "u2", "message_count": 0})
+        await append_messages(db, "c1", "u2", [{"role": "user", "content": "only u2 said this"}])
+        builder = ContextBuilder(db, "S", token_budget=4000, max_turns=20)
+        return await builder.build("c1", "u2", "Next"), await builder.build("c1", "u3", "Next")
+
+    other, stranger = asyncio.run(scenario())
+    assert other.turns == 1
+    assert "only u2 said this" in other.prompt
+    assert "message 0" not in other.prompt
+    assert (stranger.prompt, stranger.turns) == ("Next", 0)
+
+
+def test_turns_squeezed_out_by_the_summary_are_folded_into_it():
+    async def scenario():
+        db = MockDB()
+        await conversation_with(db, 8)
+        # Four turns fit the budget on their own; summarizing the four older
+        # ones then leaves room for fewer of them
+        builder = ContextBuilder(db, "S", token_budget=900, max_turns=4, summary_tokens=500)
+        context = await builder.build("c1", "u1", "Next")
+        stored = (await db.conversations.find_one({"id": "c1"}))["context_summary"]
+        return context, stored
+
+    context, stored = asyncio.run(scenario())
+    assert 0 < context.turns < 4
+    assert stored["through_seq"] == 8 - context.turns - 1
+    assert stored["text"] == context.summary
+    # Every earlier turn is in the prompt, either summarized or in the window
+    for i in range(8):
+        assert f"message {i} " in context.prompt, i
+    assert context.tokens <= 900
+
+
+def test_summary_is_extended_incrementally():
+    async def scenario():
+        db = MockDB()
+        await conversation_with(db, 8)
+        builder = ContextBuilder(db, "S", token_budget=900, max_turns=4, summary_tokens=500)
+        first = await builder.build("c1", "u1", "Next")
+        await append_messages(db, "c1", "u1", [turn(8), turn(9)])
+        second = await builder.build("c1", "u1", "Next")
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert second.summary.startswith(first.summary)
+    for i in range(10):
+        assert f"message {i} " in second.prompt, i
+
+
+def test_extend_summary_drops_the_oldest_lines_past_the_limit():
+    summary = extend_summary("", [turn(i) for i in range(10)], max_tokens=100)
+    assert "message 9 " in summary
+    assert "message 0 " not in summary
+    assert sum(message_tokens({"content": line}) - 3 for line in summary.split("\n")) <= 100
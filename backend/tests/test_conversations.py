@@ -0,0 +1,28 @@
+def chat(client, headers, message, conversation_id=None):
+    return client.post("/api/chat", headers=headers, json={"message": message, "conversation_id": conversation_id})
+
+
+def test_another_users_conversation_id_is_refused(client, auth_headers, register):
+    alice, bob = auth_headers, register(client)
+    conversation_id = chat(client, alice, "SECRET alice plan").json()["conversation_id"]
+
+    body = {"message": "what did we say?", "conversation_id": conversation_id}
+    assert client.post("/api/chat", headers=bob, json=body).status_code == 404
+    assert client.post("/api/chat/stream", headers=bob, json=body).status_code == 404
+    assert client.post("/api/chat/jobs", headers=bob, json=body).status_code == 404
+    assert client.get(f"/api/conversations/{conversation_id}", headers=bob).status_code == 404
+    assert client.get(f"/api/conversations/{conversation_id}/messages", headers=bob).status_code == 404
+    assert client.get("/api/conversations", headers=bob).json() == []
+
+    # Alice's history is untouched: one exchange, no duplicated seqs
+    page = client.get(f"/api/conversations/{conversation_id}/messages", headers=alice).json()
+    assert [(m["seq"], m["role"]) for m in page["messages"]] == [(0, "user"), (1, "assistant")]
+    assert page["messages"][0]["content"] == "SECRET alice plan"
+
+
+def test_a_conversation_continues_for_its_owner(client, auth_headers):
+    conversation_id = chat(client, auth_headers, "first").json()["conversation_id"]
+    assert chat(client, auth_headers, "second", conversation_id).status_code == 200
+    conversation = client.get(f"/api/conversations/{conversation_id}", headers=auth_headers).json()
+    assert conversation["message_count"] == 4
+    assert [m["seq"] for m in conversation["messages"]] == [0, 1, 2, 3]
@@ -0,0 +1,142 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import fake_destination
+from export_adapters import AsanaAdapter, ClickUpAdapter
+
+
+@pytest.fixture(autouse=True)
+def fresh_destination(monkeypatch):
+    monkeypatch.setattr(fake_destination, "LATENCY_SECONDS", 0)
+    monkeypatch.setattr(fake_destination, "ERROR_RATE", 0)
+    monkeypatch.setattr(fake_destination, "RATE_LIMIT", 0)
+    monkeypatch.setattr(fake_destination, "counters", {"requests": 0, "created": 0, "errors": 0, "throttled": 0})
+    monkeypatch.setattr(fake_destination, "buckets", {})
+
+
+@pytest.fixture
+def client():
+    return TestClient(fake_destination.app)
+
+
+def brief(i: int) -> dict:
+    return {"id": f"brief-{i}", "title": f"Brief {i}", "deliverables": ["Landing page"]}
+
+
+def adapter_for(adapter_class, **kwargs):
+    transport = httpx.ASGITransport(app=fake_destination.app)
+    return adapter_class(httpx.AsyncClient(transport=transport, base_url="http://fake"), **kwargs)
+
+
+def test_creates_tasks(client):
+    response = client.post("/clickup/tasks", json=brief(1))
+    assert response.status_code == 201
+    assert response.json()["title"] == "Brief 1"
+    assert response.json()["url"].startswith("http://fake-clickup.local/task/")
+    assert client.get("/stats").json() == {"requests": 1, "created": 1, "errors": 0, "throttled": 0}
+
+
+def test_unknown_destination_is_404(client):
+    assert client.post("/trello/tasks", json=brief(1)).status_code == 404
+
+
+def test_latency_is_applied_per_request(client, monkeypatch):
+    monkeypatch.setattr(fake_destination, "LATENCY_SECONDS", 0.05)
+    started = time.perf_counter()
+    assert client.post("/asana/tasks", json=brief(1)).status_code == 201
+    assert time.perf_counter() - started >= 0.05
+
+
+def test_error_rate_answers_503(client, monkeypatch):
+    monkeypatch.setattr(fake_destination, "ERROR_RATE", 1)
+    response = client.post("/asana/tasks", json=brief(1))
+    assert response.status_code == 503
+    assert client.get("/stats").json()["errors"] == 1
+
+
+def test_rate_limit_answers_429_with_retry_after(client, monkeypatch):
+    monkeypatch.setattr(fake_destination, "RATE_LIMIT", 2)
+    statuses = [client.post("/sheets/tasks", json=brief(i)).status_code for i in range(3)]
+    assert statuses == [201, 201, 429]
+    throttled = client.post("/sheets/tasks", json=brief(4))
+    assert throttled.headers["retry-after"] == "1"
+    # Each destination has its own bucket
+    assert client.post("/asana/tasks", json=brief(5)).status_code == 201
+    assert client.get("/stats").json()["throttled"] == 2
+
+
+def test_asana_batch_limit(client):
+    actions = [{"data": brief(i)} for i in range(fake_destination.ASANA_BATCH_LIMIT + 1)]
+    assert client.post("/asana/batch", json={"data": {"actions": actions}}).status_code == 400
+    response = client.post("/asana/batch", json={"data": {"actions": actions[:3]}})
+    assert [outcome["status_code"] for outcome in response.json()["data"]] == [201] * 3
+
+
+def test_adapter_pauses_on_429_then_retries(monkeypatch):
+    monkeypatch.setattr(fake_destination, "RATE_LIMIT", 10)
+
+    async def scenario():
+        adapter = adapter_for(ClickUpAdapter, max_retry_after=0.2)
+        # Start with an empty bucket so the first request is throttled
+        fake_destination.buckets["clickup"] = (0.0, time.monotonic())
+        started = time.perf_counter()
+        try:
+            url = await adapter.export(brief(1))
+        finally:
+            await adapter.close()
+        return url, time.perf_counter() - started, adapter.stats()
+
+    url, elapsed, stats = asyncio.run(scenario())
+    assert url.startswith("http://fake-clickup.local/task/")
+    # Retry-After: 1 was capped at max_retry_after, and honoured before the retry
+    assert elapsed >= 0.2
+    assert (stats["requests"], stats["throttled"], stats["exported"]) == (2, 1, 1)
+
+
+def test_pause_holds_back_every_request_to_the_destination(monkeypatch):
+    monkeypatch.setattr(fake_destination, "RATE_LIMIT", 10)
+
+    async def scenario():
+        adapter = adapter_for(ClickUpAdapter, max_retry_after=0.2)
+        fake_destination.buckets["clickup"] = (0.0, time.monotonic())
+        try:
+            first = asyncio.create_task(adapter.export(brief(1)))
+            await asyncio.sleep(0.05)
+            # The destination would accept again, but the adapter is still paused
+            fake_destination.buckets["clickup"] = (10.0, time.monotonic())
+            started = time.perf_counter()
+            await adapter.export(brief(2))
+            waited = time.perf_counter() - started
+            await first
+        finally:
+            await adapter.close()
+        return waited, adapter.stats()
+
+    waited, stats = asyncio.run(scenario())
+    assert waited >= 0.1
+    assert (stats["throttled"], stats["exported"]) == (1, 2)
+
+
+def test_adapter_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(fake_destination, "RATE_LIMIT", 10)
+
+    async def scenario():
+        adapter = adapter_for(AsanaAdapter, max_retries=0)
+        fake_destination.buckets["asana"] = (0.0, time.monotonic())
+        try:
+            with pytest.raises(httpx.HTTPStatusError):
+                await adapter.export(brief(1))
+            fake_destination.buckets["asana"] = (0.0, time.monotonic())
+            results = await adapter.export_many([brief(2), brief(3)])
+        finally:
+            await adapter.close()
+        return results
+
+    results = asyncio.run(scenario())
+    assert [result.brief_id for result in results] == ["brief-2", "brief-3"]
+    assert all(result.error and "429" in result.error for result in results)
+
@@ -0,0 +1,53 @@
+import asyncio
+
+import server
+from benchmarks.plans import QUICK, check_plans, plan_indexes, provision
+from mock_db import MockDB
+
+
+def test_hot_queries_run_on_their_declared_indexes():
+    async def scenario():
+        db = MockDB()
+        await provision(db, QUICK)
+        return await check_plans(db)
+
+    results = asyncio.run(scenario())
+    assert [(r["label"], r["used"], r["expected"]) for r in results if not r["ok"]] == []
+    # Every shape names an index INDEXES actually declares
+    declared = {(collection, options["name"]) for collection, _, options in server.INDEXES}
+    assert {(r["collection"], r["expected"]) for r in results} <= declared
+
+
+def test_undeclared_fields_scan_the_collection():
+    async def scenario():
+        db = MockDB()
+        await db.users.insert_many([{"id": f"u{i}", "email": f"u{i}@example.com"} for i in range(10)])
+        before = await db.users.find({"email": "u1@example.com"}).explain()
+        await server.ensure_indexes(db)
+        after = await db.users.find({"email": "u1@example.com"}).explain()
+        return before, after, await db.users.find_one({"email": "u1@example.com"}, {"_id": 0})
+
+    before, after, user = asyncio.run(scenario())
+    assert before["queryPlanner"]["winningPlan"] == {"stage": "COLLSCAN"}
+    assert plan_indexes(before) == []
+    assert plan_indexes(after) == ["email_unique"]
+    assert user == {"id": "u1", "email": "u1@example.com"}
+
+
+def test_superseded_indexes_are_dropped_and_stop_serving_queries():
+    async def scenario():
+        db = MockDB()
+        await db.briefs.create_index([("user_id", 1), ("updated_at", -1)], name="user_updated")
+        await db.briefs.insert_one({"id": "b1", "user_id": "u1", "updated_at": "t1"})
+        await server.ensure_indexes(db)
+        listing = db.briefs.find({"user_id": "u1"}).sort([("updated_at", -1), ("id", -1)])
+        served = plan_indexes(await listing.explain())
+        await db.briefs.drop_index("user_updated_id")
+        return db.briefs.indexes, served, await listing.explain(), await listing.to_list(None)
+
+    indexes, served, plan, briefs = asyncio.run(scenario())
+    assert "user_updated" not in indexes
+    assert served == ["user_updated_id"]
+    # Nothing else declares user_id first, so the listing falls back to a sorted scan
+    assert plan["queryPlanner"]["winningPlan"] == {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}
+    assert [b["id"] for b in briefs] == ["b1"]
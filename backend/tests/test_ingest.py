@@ -0,0 +1,185 @@
+import asyncio
+import time
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from emergentintegrations.llm.chat import LlmChat
+
+import server
+from rate_limit import RateLimit
+
+NO_BRIEF_MARKER = "nothing to brief here"
+
+
+@pytest.fixture
+def stub_llm(monkeypatch):
+    """The offline stub, except that marked items get a reply without a brief."""
+    stub_send = LlmChat.send_message
+
+    async def send_message(self, message):
+        if NO_BRIEF_MARKER in message.text:
+            return "I could not find a brief in that thread."
+        return await stub_send(self, message)
+
+    monkeypatch.setattr(LlmChat, "send_message", send_message)
+
+
+def wait_for_job(client, job_id, headers, timeout=10.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/api/briefs/ingest/{job_id}", headers=headers).json()
+        if job["finished_at"]:
+            return job
+        assert time.monotonic() < deadline, f"ingest job still {job['status']}"
+        time.sleep(0.02)
+
+
+def test_ingest_creates_briefs_and_reports_progress(client, auth_headers, stub_llm):
+    items = [{"source_content": f"#launch thread {i}: {uuid.uuid4()}", "source_type": "slack"} for i in range(3)]
+    response = client.post("/api/briefs/ingest", json={"items": items}, headers=auth_headers)
+    assert response.status_code == 202
+    queued = response.json()
+    assert queued["status"] == "queued"
+    assert queued["total"] == 3
+    assert [item["status"] for item in queued["items"]] == ["pending"] * 3
+
+    job = wait_for_job(client, queued["id"], auth_headers)
+    assert job["status"] == "completed"
+    assert (job["succeeded"], job["failed"]) == (3, 0)
+    assert all(item["status"] == "done" and len(item["brief_ids"]) == 1 for item in job["items"])
+
+    briefs = {b["id"]: b for b in client.get("/api/briefs", headers=auth_headers).json()}
+    for item, state in zip(items, job["items"]):
+        brief = briefs[state["brief_ids"][0]]
+        assert brief["title"] == "Generated Campaign Brief"
+        assert brief["source_type"] == "slack"
+        assert brief["source_content"] == item["source_content"]
+
+
+def test_items_without_a_brief_fail_individually(client, auth_headers, stub_llm):
+    items = [
+        {"source_content": f"kickoff notes {uuid.uuid4()}"},
+        {"source_content": f"{NO_BRIEF_MARKER} {uuid.uuid4()}"},
+    ]
+    queued = client.post("/api/briefs/ingest", json={"items": items}, headers=auth_headers).json()
+
+    job = wait_for_job(client, queued["id"], auth_headers)
+    assert job["status"] == "completed_with_errors"
+    assert (job["succeeded"], job["failed"]) == (1, 1)
+    assert job["items"][0]["status"] == "done"
+    assert job["items"][1] == {
+        "index": 1, "status": "failed", "brief_ids": [], "error": "No brief found in AI response"
+    }
+
+
+def test_every_item_failing_fails_the_job(client, auth_headers, stub_llm):
+    items = [{"source_content": f"{NO_BRIEF_MARKER} {i}"} for i in range(2)]
+    queued = client.post("/api/briefs/ingest", json={"items": items}, headers=auth_headers).json()
+
+    job = wait_for_job(client, queued["id"], auth_headers)
+    assert job["status"] == "failed"
+    assert (job["succeeded"], job["failed"]) == (0, 2)
+
+
+def test_ingest_validates_the_batch(client, auth_headers):
+    assert client.post("/api/briefs/ingest", json={"items": []}, headers=auth_headers).status_code == 400
+    too_many = [{"source_content": "x"}] * (server.INGEST_MAX_ITEMS + 1)
+    assert client.post("/api/briefs/ingest", json={"items": too_many}, headers=auth_headers).status_code == 400
+
+
+def test_ingest_jobs_are_private(client, auth_headers, register, stub_llm):
+    queued = client.post("/api/briefs/ingest", json={"items": [{"source_content": "a"}]}, headers=auth_headers).json()
+    other_headers = register(client)
+    assert client.get(f"/api/briefs/ingest/{queued['id']}", headers=other_headers).status_code == 404
+    wait_for_job(client, queued["id"], auth_headers)
+
+
+def test_a_failed_brief_write_only_fails_its_items(client, auth_headers, stub_llm, monkeypatch):
+    monkeypatch.setattr(server, "INGEST_WRITE_BATCH", 1)
+    briefs = client.app.state.resources.db.briefs
+    insert_many, calls = briefs.insert_many, []
+
+    async def flaky_insert_many(docs, **kwargs):
+        calls.append(len(docs))
+        if len(calls) == 1:
+            raise RuntimeError("write concern timeout")
+        return await insert_many(docs, **kwargs)
+
+    monkeypatch.setattr(briefs, "insert_many", flaky_insert_many)
+    items = [{"source_content": f"thread {i} {uuid.uuid4()}"} for i in range(3)]
+    queued = client.post("/api/briefs/ingest", json={"items": items}, headers=auth_headers).json()
+
+    job = wait_for_job(client, queued["id"], auth_headers)
+    assert job["status"] == "completed_with_errors"
+    assert (job["succeeded"], job["failed"]) == (2, 1)
+    failed = [item for item in job["items"] if item["status"] == "failed"]
+    assert failed[0]["error"] == "Could not save briefs: write concern timeout"
+    assert failed[0]["brief_ids"] == []
+    assert len(client.get("/api/briefs", headers=auth_headers).json()) == 2
+
+
+def test_each_item_spends_an_ingest_rate_limit_token(client, auth_headers, stub_llm, monkeypatch):
+    limiter = client.app.state.resources.rate_limiter
+    limiter.limits["ingest"] = RateLimit(per_minute=1, burst=2)
+    # Background work normally waits for the bucket to refill; give up at once instead
+    monkeypatch.setattr(server, "LLM_BACKGROUND_MAX_WAIT_SECONDS", 0)
+    items = [{"source_content": f"thread {i} {uuid.uuid4()}"} for i in range(3)]
+    queued = client.post("/api/briefs/ingest", json={"items": items}, headers=auth_headers).json()
+
+    job = wait_for_job(client, queued["id"], auth_headers)
+    assert (job["succeeded"], job["failed"]) == (2, 1)
+    assert [item["error"] for item in job["items"] if item["error"]] == ["Too many requests, please slow down"]
+    assert (limiter.allowed["ingest"], limiter.rejected["ingest"]) == (2, 1)
+
+
+def test_shutdown_leaves_a_running_ingest_cancelled(register, monkeypatch):
+    async def never_answers(self, message):
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(LlmChat, "send_message", never_answers)
+    application = server.create_app()
+    with TestClient(application) as client:
+        headers = register(client)
+        items = [{"source_content": f"thread {i}"} for i in range(3)]
+        queued = client.post("/api/briefs/ingest", json={"items": items}, headers=headers).json()
+        deadline = time.monotonic() + 5
+        while client.get(f"/api/briefs/ingest/{queued['id']}", headers=headers).json()["status"] != "running":
+            assert time.monotonic() < deadline
+            time.sleep(0.02)
+
+    db = application.state.resources.db
+    job = asyncio.run(db.ingest_jobs.find_one({"id": queued["id"]}, {"_id": 0}))
+    assert job["status"] == "cancelled"
+    assert job["finished_at"] is not None
+    assert (job["succeeded"], job["failed"]) == (0, 3)
+    assert {item["error"] for item in job["items"]} == {"Cancelled before this item was processed"}
+
+
+def test_a_rerun_keeps_saved_items_and_redoes_the_rest(client, auth_headers, stub_llm):
+    """A job requeued after its worker died must not duplicate briefs it already saved."""
+    resources = client.app.state.resources
+    user_id = client.get("/api/auth/me", headers=auth_headers).json()["id"]
+    saved = client.post("/api/briefs", json={"title": "Saved before the crash"}, headers=auth_headers).json()
+    now = "2025-01-01T00:00:00+00:00"
+    job = {
+        "id": str(uuid.uuid4()), "user_id": user_id, "status": "running", "total": 3, "succeeded": 2, "failed": 0,
+        "items": [
+            {"index": 0, "status": "done", "brief_ids": [saved["id"]], "error": None},
+            # Parsed, but its brief was still waiting for insert_many when the worker died
+            {"index": 1, "status": "done", "brief_ids": ["never-written"], "error": None},
+            {"index": 2, "status": "processing", "brief_ids": [], "error": None},
+        ],
+        "error": None, "created_at": now, "updated_at": now, "finished_at": None,
+        "sources": [{"source_content": f"thread {i}", "source_type": "slack"} for i in range(3)]
+    }
+    client.portal.call(resources.db.ingest_jobs.insert_one, job)
+    client.portal.call(resources.job_queue.enqueue, "ingest", {"ingest_job_id": job["id"]}, user_id)
+
+    finished = wait_for_job(client, job["id"], auth_headers)
+    assert finished["status"] == "completed"
+    assert (finished["succeeded"], finished["failed"]) == (3, 0)
+    assert finished["items"][0]["brief_ids"] == [saved["id"]]
+    assert finished["items"][1]["brief_ids"] != ["never-written"]
+    assert len(client.get("/api/briefs", headers=auth_headers).json()) == 3
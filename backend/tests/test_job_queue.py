@@ -0,0 +1,152 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from job_queue import CollectionJobStore, JobQueue, MemoryJobStore, PermanentJobError
+from mock_db import MockDB
+
+
+async def collection_store() -> CollectionJobStore:
+    jobs = MockDB().jobs
+    await jobs.create_index([("id", 1)], name="id_unique", unique=True)
+    await jobs.create_index([("user_id", 1), ("idempotency_key", 1)], name="user_idempotency_key", unique=True,
+                            partialFilterExpression={"idempotency_key": {"$exists": True}})
+    return CollectionJobStore(jobs)
+
+
+async def memory_store() -> MemoryJobStore:
+    return MemoryJobStore()
+
+
+@pytest.fixture(params=[memory_store, collection_store], ids=["memory", "collection"])
+def make_store(request):
+    return request.param
+
+
+def flaky(failures: int, error=RuntimeError):
+    """Handler that raises ``error`` on its first ``failures`` calls, then succeeds."""
+    calls = []
+
+    async def handler(job):
+        calls.append(job["attempts"])
+        if len(calls) <= failures:
+            raise error(f"attempt {len(calls)} failed")
+        return {"echo": job["payload"]["value"]}
+
+    return handler, calls
+
+
+def run_queue(make_store, scenario, **options):
+    async def main():
+        queue = JobQueue(await make_store(), concurrency=2, backoff_base=0.001, **options)
+        try:
+            return await scenario(queue)
+        finally:
+            await queue.stop()
+
+    return asyncio.run(main())
+
+
+def test_failed_job_is_retried_until_it_succeeds(make_store):
+    handler, calls = flaky(2)
+
+    async def scenario(queue):
+        queue.register("work", handler, max_attempts=3)
+        await queue.start()
+        job = await queue.enqueue("work", {"value": 7}, "u1")
+        await queue.join()
+        return await queue.get(job["id"], "u1"), queue.stats()
+
+    job, stats = run_queue(make_store, scenario)
+    assert (job["status"], job["attempts"], job["result"], job["error"]) == ("succeeded", 3, {"echo": 7}, None)
+    assert job["finished_at"] is not None
+    assert calls == [1, 2, 3]
+    assert (stats["retried"], stats["succeeded"], stats["failed"]) == (2, 1, 0)
+
+
+def test_job_fails_once_attempts_run_out(make_store):
+    handler, calls = flaky(5)
+
+    async def scenario(queue):
+        queue.register("work", handler, max_attempts=2)
+        await queue.start()
+        job = await queue.enqueue("work", {"value": 1}, "u1")
+        await queue.join()
+        return await queue.get(job["id"])
+
+    job = run_queue(make_store, scenario)
+    assert (job["status"], job["attempts"], job["error"]) == ("failed", 2, "attempt 2 failed")
+    assert len(calls) == 2
+
+
+def test_permanent_errors_are_not_retried(make_store):
+    handler, calls = flaky(1, error=PermanentJobError)
+
+    async def scenario(queue):
+        queue.register("work", handler, max_attempts=3)
+        await queue.start()
+        job = await queue.enqueue("work", {"value": 1}, "u1")
+        await queue.join()
+        return await queue.get(job["id"])
+
+    job = run_queue(make_store, scenario)
+    assert (job["status"], job["attempts"]) == ("failed", 1)
+    assert len(calls) == 1
+
+
+def test_repeated_idempotency_key_returns_the_first_job(make_store):
+    handler, calls = flaky(0)
+
+    async def scenario(queue):
+        queue.register("work", handler)
+        await queue.start()
+        first = await queue.enqueue("work", {"value": 1}, "u1", idempotency_key="k1")
+        repeat = await queue.enqueue("work", {"value": 2}, "u1", idempotency_key="k1")
+        other_user = await queue.enqueue("work", {"value": 3}, "u2", idempotency_key="k1")
+        no_key = [await queue.enqueue("work", {"value": 4}, "u1") for _ in range(2)]
+        await queue.join()
+        return first, repeat, other_user, no_key, await queue.get(first["id"])
+
+    first, repeat, other_user, no_key, finished = run_queue(make_store, scenario)
+    assert repeat["id"] == first["id"]
+    assert repeat["payload"] == {"value": 1}
+    assert other_user["id"] != first["id"]
+    assert no_key[0]["id"] != no_key[1]["id"]
+    # The repeat was not queued again: one run each for k1/u1, k1/u2 and the two keyless jobs
+    assert len(calls) == 4
+    assert finished["result"] == {"echo": 1}
+
+
+def test_stale_claim_from_a_crashed_worker_is_reclaimed(make_store):
+    handler, calls = flaky(0)
+
+    async def scenario(queue):
+        queue.register("work", handler)
+        long_ago = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+        just_now = datetime.now(timezone.utc).isoformat()
+        for job_id, started_at in (("crashed", long_ago), ("still-running", just_now)):
+            await queue.store.insert({
+                "id": job_id, "type": "work", "user_id": "u1", "payload": {"value": job_id},
+                "status": "running", "attempts": 1, "max_attempts": 3, "result": None, "error": None,
+                "idempotency_key": None, "created_at": long_ago, "updated_at": started_at,
+                "started_at": started_at, "finished_at": None
+            })
+        await queue.start()
+        await queue.join()
+        return await queue.get("crashed"), await queue.get("still-running")
+
+    crashed, still_running = run_queue(make_store, scenario, stale_after_seconds=60)
+    assert (crashed["status"], crashed["attempts"], crashed["result"]) == ("succeeded", 2, {"echo": "crashed"})
+    # A claim younger than stale_after_seconds may belong to a live worker elsewhere
+    assert still_running["status"] == "running"
+    assert len(calls) == 1
+
+
+def test_unknown_job_type_is_rejected(make_store):
+    async def scenario(queue):
+        await queue.start()
+        with pytest.raises(ValueError):
+            await queue.enqueue("missing", {}, "u1")
+
+    run_queue(make_store, scenario)
@@ -0,0 +1,160 @@
+import asyncio
+import time
+
+import pytest
+
+import llm_admission
+from llm_admission import AdmissionRejected, LlmAdmissionController
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"provider answered {status_code}")
+        self.status_code = status_code
+
+
+class FakeLlm:
+    """Completion stub that raises the queued errors first, then answers, tracking concurrency."""
+
+    def __init__(self, failures=(), delay: float = 0):
+        self.failures = list(failures)
+        self.delay = delay
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+
+    async def complete(self):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.failures:
+                raise self.failures.pop(0)
+            return "ok"
+        finally:
+            self.active -= 1
+
+
+def controller(**options) -> LlmAdmissionController:
+    settings = {"max_concurrency": 2, "max_per_user": 10, "max_queue": 10, "queue_timeout": 5, "timeout": 5,
+                "backoff_base": 0.001, "backoff_max": 0.01}
+    return LlmAdmissionController(**{**settings, **options})
+
+
+def test_concurrency_is_capped_and_the_rest_wait_their_turn():
+    async def scenario():
+        admission, llm = controller(max_concurrency=2), FakeLlm(delay=0.02)
+        results = await asyncio.gather(*(admission.call(f"u{i}", llm.complete) for i in range(6)))
+        return admission, llm, results
+
+    admission, llm, results = asyncio.run(scenario())
+    assert results == ["ok"] * 6
+    assert llm.peak == 2
+    assert (admission.in_flight, admission.waiting, admission.rejected) == (0, 0, 0)
+
+
+def test_full_queue_and_per_user_cap_are_rejected_straight_away():
+    async def scenario():
+        admission, llm = controller(max_concurrency=1, max_queue=0, max_per_user=1), FakeLlm(delay=0.05)
+        first = asyncio.ensure_future(admission.call("u1", llm.complete))
+        await asyncio.sleep(0.01)
+        with pytest.raises(AdmissionRejected) as same_user:
+            await admission.call("u1", llm.complete)
+        with pytest.raises(AdmissionRejected) as queue_full:
+            await admission.call("u2", llm.complete)
+        return await first, same_user.value, queue_full.value, llm.calls, admission.rejected
+
+    result, same_user, queue_full, calls, rejected = asyncio.run(scenario())
+    assert result == "ok"
+    assert (same_user.status_code, same_user.retry_after) == (429, 1)
+    assert queue_full.status_code == 503
+    assert (calls, rejected) == (1, 2)
+
+
+def test_transient_errors_are_retried_with_full_jitter_backoff(monkeypatch):
+    bounds = []
+
+    def uniform(low, high):
+        bounds.append((low, high))
+        return 0
+
+    monkeypatch.setattr(llm_admission.random, "uniform", uniform)
+
+    async def scenario():
+        admission, llm = controller(max_retries=3, backoff_base=0.01, backoff_max=0.03), FakeLlm(
+            [ProviderError(503), asyncio.TimeoutError(), ProviderError(429)]
+        )
+        return await admission.call("u1", llm.complete), llm.calls, admission.stats()
+
+    result, calls, stats = asyncio.run(scenario())
+    assert (result, calls) == ("ok", 4)
+    assert (stats["retries"], stats["timeouts"], stats["breaker"]) == (3, 1, "closed")
+    # Each delay is drawn from [0, base * 2^attempt], capped at backoff_max
+    assert bounds == [(0, 0.01), (0, 0.02), (0, 0.03)]
+
+
+def test_permanent_errors_and_exhausted_retries_are_raised():
+    async def scenario():
+        admission = controller(max_retries=1)
+        permanent = FakeLlm([ProviderError(400)])
+        with pytest.raises(ProviderError):
+            await admission.call("u1", permanent.complete)
+        flaky = FakeLlm([ProviderError(502)] * 3)
+        with pytest.raises(ProviderError):
+            await admission.call("u1", flaky.complete)
+        return permanent.calls, flaky.calls, admission.breaker.failures
+
+    permanent_calls, flaky_calls, failures = asyncio.run(scenario())
+    assert permanent_calls == 1
+    assert flaky_calls == 2
+    # Only transient failures count against the provider
+    assert failures == 2
+
+
+def test_breaker_opens_then_lets_one_trial_through():
+    async def scenario():
+        admission = controller(max_retries=0, breaker_threshold=2, breaker_reset_seconds=0.05)
+        breaker = admission.breaker
+        failing = FakeLlm([ProviderError(500)] * 3)
+        for _ in range(2):
+            with pytest.raises(ProviderError):
+                await admission.call("u1", failing.complete)
+        states = [breaker.state]
+
+        # Open: calls fail fast without reaching the provider
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.call("u1", failing.complete)
+        assert failing.calls == 2
+        assert (rejected.value.status_code, rejected.value.retry_after) == (503, 1)
+
+        await asyncio.sleep(0.06)
+        states.append(breaker.state)
+        # A failed trial re-opens the breaker for another window
+        with pytest.raises(ProviderError):
+            await admission.call("u1", failing.complete)
+        states.append(breaker.state)
+
+        await asyncio.sleep(0.06)
+        assert breaker.allow() and not breaker.allow()
+        breaker.release_trial()
+        assert await admission.call("u1", FakeLlm().complete) == "ok"
+        states.append(breaker.state)
+        return states, breaker.failures
+
+    states, failures = asyncio.run(scenario())
+    assert states == ["open", "half_open", "open", "closed"]
+    assert failures == 0
+
+
+def test_deadline_covers_slow_attempts():
+    async def scenario():
+        admission, llm = controller(timeout=0.05, max_retries=5), FakeLlm(delay=1)
+        started = time.monotonic()
+        with pytest.raises(asyncio.TimeoutError):
+            await admission.call("u1", llm.complete)
+        return time.monotonic() - started, admission.timeouts
+
+    elapsed, timeouts = asyncio.run(scenario())
+    assert elapsed < 0.5
+    assert timeouts == 1
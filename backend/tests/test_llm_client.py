@@ -0,0 +1,25 @@
+from llm_client import LlmClientRegistry
+
+
+def registry(**kwargs) -> LlmClientRegistry:
+    return LlmClientRegistry(api_key="test", provider="openai", model="test-model", system_message="S", **kwargs)
+
+
+def test_sessions_are_cached_per_user_and_conversation():
+    clients = registry()
+    alice = clients.get_chat("alice", "c1")
+    assert clients.get_chat("alice", "c1") is alice
+    # The same conversation id from another user gets its own session
+    assert clients.get_chat("bob", "c1") is not alice
+    assert clients.get_chat("alice", "c2") is not alice
+    assert (clients.hits, clients.misses) == (1, 3)
+
+
+def test_least_recently_used_session_is_evicted():
+    clients = registry(max_sessions=2)
+    first = clients.get_chat("u1", "c1")
+    clients.get_chat("u1", "c2")
+    clients.get_chat("u1", "c1")
+    clients.get_chat("u1", "c3")
+    assert clients.get_chat("u1", "c1") is first
+    assert clients.stats()["sessions"] == 2
@@ -0,0 +1,126 @@
+import asyncio
+
+from message_store import BUCKET_SIZE, append_messages, migrate_embedded_messages, read_messages
+from mock_db import MockDB
+
+
+def message(i: int, role: str = "user") -> dict:
+    return {"role": role, "content": f"message {i}", "timestamp": f"2025-01-01T00:00:{i % 60:02d}+00:00"}
+
+
+async def conversation_with(db, count: int, conversation_id: str = "c1", user_id: str = "u1"):
+    await db.conversations.insert_one({"id": conversation_id, "user_id": user_id, "message_count": 0})
+    for start in range(0, count, 2):
+        await append_messages(db, conversation_id, user_id, [message(i) for i in range(start, min(start + 2, count))])
+
+
+def test_messages_get_consecutive_seqs_in_order():
+    async def scenario():
+        db = MockDB()
+        await conversation_with(db, 5)
+        page, cursor = await read_messages(db, "c1", "u1")
+        assert [m["seq"] for m in page] == [0, 1, 2, 3, 4]
+        assert [m["content"] for m in page] == [f"message {i}" for i in range(5)]
+        assert cursor is None
+        conversation = await db.conversations.find_one({"id": "c1"}, {"_id": 0})
+        assert conversation["message_count"] == 5
+        assert conversation["last_message"]["content"] == "message 4"
+
+    asyncio.run(scenario())
+
+
+def test_history_rolls_over_into_new_buckets():
+    async def scenario():
+        db = MockDB()
+        # An odd bucket size boundary: one append straddles buckets 0 and 1
+        await conversation_with(db, BUCKET_SIZE + 3)
+        buckets = await db.messages.find({"conversation_id": "c1"}, {"_id": 0}).sort("bucket", 1).to_list(None)
+        assert [(b["bucket"], b["count"]) for b in buckets] == [(0, BUCKET_SIZE), (1, 3)]
+        assert [m["seq"] for m in buckets[1]["messages"]] == [BUCKET_SIZE, BUCKET_SIZE + 1, BUCKET_SIZE + 2]
+
+    asyncio.run(scenario())
+
+
+def test_pages_walk_back_across_buckets_without_gaps():
+    async def scenario():
+        db = MockDB()
+        total = 2 * BUCKET_SIZE + 7
+        await conversation_with(db, total)
+        seen, before = [], None
+        while True:
+            page, before = await read_messages(db, "c1", "u1", before=before, limit=30)
+            seen = [m["seq"] for m in page] + seen
+            if before is None:
+                break
+        assert seen == list(range(total))
+        assert await read_messages(db, "c1", "u1", before=0) == ([], None)
+
+    asyncio.run(scenario())
+
+
+def test_users_never_see_each_others_messages_under_one_conversation_id():
+    async def scenario():
+        db = MockDB()
+        await conversation_with(db, 2, user_id="alice")
+        # A second conversation document under the same id, as a pre-fix upsert created
+        await db.conversations.insert_one({"id": "c1", "user_id": "bob", "message_count": 0})
+        await append_messages(db, "c1", "bob", [{"role": "user", "content": "bob here"}])
+
+        alice, _ = await read_messages(db, "c1", "alice")
+        bob, _ = await read_messages(db, "c1", "bob")
+        assert [(m["seq"], m["content"]) for m in alice] == [(0, "message 0"), (1, "message 1")]
+        assert [(m["seq"], m["content"]) for m in bob] == [(0, "bob here")]
+        assert await read_messages(db, "c1", "mallory") == ([], None)
+
+    asyncio.run(scenario())
+
+
+def test_appending_to_another_users_conversation_stores_nothing():
+    async def scenario():
+        db = MockDB()
+        await conversation_with(db, 2, user_id="alice")
+        assert await append_messages(db, "c1", "bob", [message(9)]) is None
+        assert await db.messages.count_documents({"conversation_id": "c1"}) == 1
+
+    asyncio.run(scenario())
+
+
+def test_migration_moves_embedded_history_into_buckets():
+    async def scenario():
+        db = MockDB()
+        history = [message(i, "user" if i % 2 == 0 else "assistant") for i in range(BUCKET_SIZE + 1)]
+        await db.conversations.insert_one({"id": "c1", "user_id": "u1", "messages": history, "created_at": "t0"})
+        await db.conversations.insert_one({"id": "c2", "user_id": "u2", "messages": [], "created_at": "t0"})
+
+        assert await migrate_embedded_messages(db, batch_size=1) == 2
+        conversation = await db.conversations.find_one({"id": "c1"}, {"_id": 0})
+        assert "messages" not in conversation
+        assert conversation["message_count"] == BUCKET_SIZE + 1
+        assert conversation["last_message"]["content"] == f"message {BUCKET_SIZE}"
+        page, _ = await read_messages(db, "c1", "u1", limit=BUCKET_SIZE + 1)
+        assert [m["seq"] for m in page] == list(range(BUCKET_SIZE + 1))
+        assert page[1]["role"] == "assistant"
+        assert (await db.conversations.find_one({"id": "c2"}, {"_id": 0}))["message_count"] == 0
+
+        # Migrated conversations are skipped, and appends continue the sequence
+        assert await migrate_embedded_messages(db) == 0
+        stored = await append_messages(db, "c1", "u1", [message(99)])
+        assert stored[0]["seq"] == BUCKET_SIZE + 1
+
+    asyncio.run(scenario())
+
+
+def test_migration_only_replaces_the_owners_buckets():
+    async def scenario():
+        db = MockDB()
+        await conversation_with(db, 2, user_id="bob")
+        await db.conversations.insert_one({"id": "c1", "user_id": "alice", "messages": [message(0)]})
+
+        assert await migrate_embedded_messages(db) == 1
+        bob, _ = await read_messages(db, "c1", "bob")
+        alice, _ = await read_messages(db, "c1", "alice")
+        assert [m["content"] for m in bob] == ["message 0", "message 1"]
+        assert [m["content"] for m in alice] == ["message 0"]
+        assert (await db.conversations.find_one({"id": "c1", "user_id": "bob"}, {"_id": 0}))["message_count"] == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,12 @@
+import asyncio
+
+from benchmarks import micro
+from benchmarks.harness import Recorder
+
+
+def test_serialization_benchmark_runs_on_public_apis():
+    recorder = Recorder()
+    asyncio.run(micro.serialization(recorder, {"iterations": 0}))
+    results = recorder.summary()
+    assert results["serialize 100 briefs (response_model)"]["count"] == 100
+    assert results["serialize 100 briefs (orjson fast path)"]["count"] == 100
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from mock_db import MockDB
+from rate_limit import LimitExceeded, RateLimit, RateLimiter, UsageMeter
+from shared_state import MemorySharedState, SqliteSharedState
+
+
+def test_bucket_allows_the_burst_then_rejects():
+    async def scenario():
+        limiter = RateLimiter(MemorySharedState(), {"chat": RateLimit(per_minute=60, burst=3)})
+        remaining = [(await limiter.hit("chat", "u1"))["X-RateLimit-Remaining"] for _ in range(3)]
+        with pytest.raises(LimitExceeded) as exceeded:
+            await limiter.hit("chat", "u1")
+        # Buckets are per key
+        await limiter.hit("chat", "u2")
+        return remaining, exceeded.value, limiter.stats()
+
+    remaining, exceeded, stats = asyncio.run(scenario())
+    assert remaining == ["2", "1", "0"]
+    assert (exceeded.status_code, exceeded.limit, exceeded.retry_after) == (429, "chat", 1)
+    assert exceeded.headers["Retry-After"] == "1"
+    assert exceeded.headers["X-RateLimit-Remaining"] == "0"
+    assert (stats["allowed"], stats["rejected"]) == ({"chat": 4}, {"chat": 1})
+
+
+def test_disabled_limiter_lets_everything_through():
+    async def scenario():
+        limiter = RateLimiter(MemorySharedState(), {"chat": RateLimit(per_minute=1, burst=1)}, enabled=False)
+        return [await limiter.hit("chat", "u1") for _ in range(5)]
+
+    assert asyncio.run(scenario()) == [{}] * 5
+
+
+def test_workers_sharing_sqlite_state_draw_from_one_bucket(tmp_path):
+    async def scenario():
+        states = [SqliteSharedState(tmp_path / "state.db") for _ in range(2)]
+        limits = {"chat": RateLimit(per_minute=60, burst=2)}
+        first, second = (RateLimiter(state, limits) for state in states)
+        try:
+            await first.hit("chat", "u1")
+            await second.hit("chat", "u1")
+            with pytest.raises(LimitExceeded):
+                await first.hit("chat", "u1")
+        finally:
+            for state in states:
+                await state.close()
+
+    asyncio.run(scenario())
+
+
+def meter(**quotas) -> UsageMeter:
+    settings = {"daily_tokens": 0, "daily_cost": 0, "input_cost_per_1k": 1.0, "output_cost_per_1k": 2.0}
+    return UsageMeter(MockDB().llm_usage, **{**settings, **quotas})
+
+
+def test_daily_token_quota_rejects_once_spent():
+    async def scenario():
+        usage = meter(daily_tokens=100)
+        before = await usage.check("u1")
+        await usage.record("u1", prompt_tokens=40, completion_tokens=20)
+        during = await usage.check("u1")
+        totals = await usage.record("u1", prompt_tokens=30, completion_tokens=10)
+        with pytest.raises(LimitExceeded) as exceeded:
+            await usage.check("u1")
+        other = await usage.check("u2")
+        return before, during, totals, exceeded.value, other
+
+    before, during, totals, exceeded, other = asyncio.run(scenario())
+    assert before["X-Quota-Tokens-Remaining"] == "100"
+    assert during["X-Quota-Tokens-Remaining"] == "40"
+    assert (totals["requests"], totals["tokens"], totals["cost_usd"]) == (2, 100, pytest.approx(0.13))
+    assert (exceeded.status_code, exceeded.limit) == (429, "quota")
+    assert exceeded.headers["X-Quota-Tokens-Remaining"] == "0"
+    assert int(exceeded.headers["Retry-After"]) == int(exceeded.headers["X-Quota-Reset"])
+    assert other["X-Quota-Tokens-Remaining"] == "100"
+
+
+def test_cost_quota_applies_and_zero_quotas_are_not_enforced():
+    async def scenario():
+        capped, unlimited = meter(daily_cost=0.05), meter()
+        for usage in (capped, unlimited):
+            await usage.record("u1", prompt_tokens=50, completion_tokens=0)
+        with pytest.raises(LimitExceeded):
+            await capped.check("u1")
+        return await unlimited.check("u1")
+
+    assert asyncio.run(scenario()) == {}
+
+
+def chat(client, headers):
+    return client.post("/api/chat", headers=headers, json={"message": "Plan the launch"})
+
+
+def test_chat_is_rate_limited_per_user(client, auth_headers, register):
+    client.app.state.resources.rate_limiter.limits["chat"] = RateLimit(per_minute=1, burst=2)
+    assert [chat(client, auth_headers).status_code for _ in range(2)] == [200, 200]
+    limited = chat(client, auth_headers)
+    assert limited.status_code == 429
+    assert limited.headers["X-RateLimit-Remaining"] == "0"
+    assert int(limited.headers["Retry-After"]) >= 1
+    assert chat(client, register(client)).status_code == 200
+
+
+def test_usage_endpoint_tracks_chats_until_the_quota_is_hit(client, auth_headers):
+    assert client.get("/api/usage", headers=auth_headers).json()["requests"] == 0
+    assert chat(client, auth_headers).status_code == 200
+    usage = client.get("/api/usage", headers=auth_headers).json()
+    assert usage["requests"] == 1
+    assert usage["tokens"] == usage["prompt_tokens"] + usage["completion_tokens"] > 0
+
+    client.app.state.resources.usage_meter.daily_tokens = usage["tokens"]
+    exhausted = chat(client, auth_headers)
+    assert exhausted.status_code == 429
+    assert exhausted.json()["detail"] == "Daily LLM quota exhausted"
+    assert exhausted.headers["X-Quota-Tokens-Remaining"] == "0"
+    # A rejected chat is not billed
+    assert client.get("/api/usage", headers=auth_headers).json()["requests"] == 1
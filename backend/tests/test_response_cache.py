@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from response_cache import MemoryCacheBackend, ResponseCache
+
+
+def new_cache() -> ResponseCache:
+    return ResponseCache(MemoryCacheBackend(max_entries=100, ttl=60))
+
+
+def test_concurrent_misses_share_one_call():
+    async def scenario():
+        cache = new_cache()
+        calls = 0
+
+        async def generate():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "reply"
+
+        results = await asyncio.gather(*(cache.fill("k", generate) for _ in range(5)))
+        assert results == ["reply"] * 5
+        assert calls == 1
+        assert await cache.get("k") == "reply"
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_leader_does_not_cancel_waiters():
+    async def scenario():
+        cache = new_cache()
+        release = asyncio.Event()
+
+        async def generate():
+            await release.wait()
+            return "reply"
+
+        leader = asyncio.create_task(cache.fill("k", generate))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.fill("k", generate))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await waiter == "reply"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        # The call finished for the waiter and was still stored
+        assert await cache.get("k") == "reply"
+
+    asyncio.run(scenario())
+
+
+def test_waiters_retry_when_the_shared_call_is_cancelled():
+    async def scenario():
+        cache = new_cache()
+        calls = 0
+
+        async def generate():
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise asyncio.CancelledError()
+            return "second try"
+
+        results = await asyncio.gather(cache.fill("k", generate), cache.fill("k", generate))
+        assert results == ["second try", "second try"]
+        assert calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_errors_reach_every_caller_and_are_not_cached():
+    async def scenario():
+        cache = new_cache()
+
+        async def generate():
+            await asyncio.sleep(0.01)
+            raise ConnectionError("provider down")
+
+        results = await asyncio.gather(
+            cache.fill("k", generate), cache.fill("k", generate), return_exceptions=True
+        )
+        assert all(isinstance(r, ConnectionError) for r in results)
+        assert await cache.get("k") is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,171 @@
+"""Tokenizing, snippets and an inverted index for full-text search.
+
+In production, search runs on MongoDB ``$text`` indexes. ``InvertedIndex``
+gives the mock database the same ``$text`` behaviour in-process: terms are
+OR-ed, ``"quoted phrases"`` are required, ``-term`` excludes documents, and
+each matched term adds ``weight * tf / (tf + 1)`` for every indexed field it
+appears in. The stemmer is a light suffix stripper, not Snowball, so mock
+and Mongo rankings agree in spirit rather than to the digit.
+
+``snippet`` is shared by both modes: it cuts a window of text around the
+first match and returns the offsets of every matched word inside it.
+"""
+import re
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_QUERY = re.compile(r'"([^"]*)"|(-?)(\w+)', re.UNICODE)
+
+_NO_POSTINGS: Dict[int, float] = {}
+
+STOP_WORDS = frozenset("""
+a an and are as at be but by for from has have he her his i if in into is it its
+me my not of on or our she so than that the their them then there these they this
+to was we were what when where which who will with you your
+""".split())
+
+
+def stem(word: str) -> str:
+    word = word.lower()
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 5 and word.endswith("ing"):
+        return word[:-3]
+    if len(word) > 4 and word.endswith("ed"):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[Tuple[str, int, int]]:
+    """``(stem, start, end)`` for every non-stop word in ``text``."""
+    return [
+        (stem(m.group()), m.start(), m.end())
+        for m in _WORD.finditer(text)
+        if m.group().lower() not in STOP_WORDS
+    ]
+
+
+class ParsedSearch(NamedTuple):
+    terms: frozenset
+    phrases: Tuple[str, ...]
+    negated: frozenset
+
+    @property
+    def stems(self) -> frozenset:
+        return self.terms | {s for phrase in self.phrases for s, _, _ in tokenize(phrase)}
+
+
+def parse_search(query: str) -> ParsedSearch:
+    terms, phrases, negated = set(), [], set()
+    for phrase, minus, word in _QUERY.findall(query):
+        if phrase.strip():
+            phrases.append(phrase.strip().lower())
+        elif word and word.lower() not in STOP_WORDS:
+            (negated if minus else terms).add(stem(word))
+    return ParsedSearch(frozenset(terms), tuple(phrases), frozenset(negated))
+
+
+def field_texts(doc: dict, path: str) -> List[str]:
+    """Strings under a dotted path, descending into lists like MongoDB does."""
+    values = [doc]
+    for part in path.split("."):
+        found = []
+        for value in values:
+            if isinstance(value, list):
+                found.extend(v.get(part) for v in value if isinstance(v, dict))
+            elif isinstance(value, dict):
+                found.append(value.get(part))
+        values = found
+    texts = []
+    for value in values:
+        if isinstance(value, str):
+            texts.append(value)
+        elif isinstance(value, list):
+            texts.extend(v for v in value if isinstance(v, str))
+    return texts
+
+
+def snippet(text: str, search: ParsedSearch, width: int = 160) -> Optional[Tuple[str, List[List[int]]]]:
+    """Window of ``text`` around the first match, with match offsets; None if no match."""
+    stems = search.stems
+    spans = [(start, end) for s, start, end in tokenize(text) if s in stems]
+    lowered = text.lower()
+    for phrase in search.phrases:
+        i = lowered.find(phrase)
+        while i != -1:
+            spans.append((i, i + len(phrase)))
+            i = lowered.find(phrase, i + 1)
+    if not spans:
+        return None
+    spans.sort()
+
+    start = max(0, spans[0][0] - width // 3)
+    if start > 0:
+        space = text.find(" ", start)
+        if space != -1 and space < spans[0][0]:
+            start = space + 1
+    end = min(len(text), start + width)
+    if end < len(text):
+        space = text.rfind(" ", start, end)
+        if space > spans[0][1]:
+            end = space
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if end < len(text) else ""
+    shift = len(prefix) - start
+    highlights = [[s + shift, e + shift] for s, e in spans if s >= start and e <= end]
+    return prefix + text[start:end] + suffix, highlights
+
+
+class InvertedIndex:
+    """Term -> {document key: score} postings for a set of weighted fields."""
+
+    def __init__(self, weights: Dict[str, float]):
+        self.weights = weights
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._doc_terms: Dict[int, Iterable[str]] = {}
+
+    def add(self, key: int, doc: dict):
+        scores: Dict[str, float] = {}
+        for field, weight in self.weights.items():
+            counts: Dict[str, int] = {}
+            for text in field_texts(doc, field):
+                for term, _, _ in tokenize(text):
+                    counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                scores[term] = scores.get(term, 0.0) + weight * tf / (tf + 1)
+        for term, score in scores.items():
+            self._postings.setdefault(term, {})[key] = score
+        self._doc_terms[key] = tuple(scores)
+
+    def remove(self, key: int):
+        for term in self._doc_terms.pop(key, ()):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[term]
+
+    def phrase_text(self, doc: dict) -> str:
+        return "\n".join(text for field in self.weights for text in field_texts(doc, field)).lower()
+
+    def search(self, query: str, get_doc: Callable[[int], dict]) -> Dict[int, float]:
+        """Scores of the documents matching a ``$text`` search string."""
+        search = parse_search(query)
+        scores: Dict[int, float] = {}
+        for term in search.stems:
+            for key, score in self._postings.get(term, _NO_POSTINGS).items():
+                scores[key] = scores.get(key, 0.0) + score
+        for term in search.negated:
+            for key in self._postings.get(term, _NO_POSTINGS):
+                scores.pop(key, None)
+        if search.phrases:
+            scores = {
+                key: score for key, score in scores.items()
+                if all(phrase in self.phrase_text(get_doc(key)) for phrase in search.phrases)
+            }
+        return scores
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
@@ -68,12 +68,17 @@ export default function BriefEditor() {
   const saveBrief = async () => {
     setSaving(true);
     try {
-      await axios.put(`${API}/briefs/${id}`, brief, {
-        headers: getAuthHeaders(),
+      const response = await axios.put(`${API}/briefs/${id}`, brief, {
+        headers: { ...getAuthHeaders(), "If-Match": `"${brief.version ?? 0}"` },
       });
+      setBrief(response.data);
       toast.success("Brief saved successfully");
     } catch (error) {
-      toast.error("Failed to save brief");
+      if (error.response?.status === 409) {
+        toast.error("This brief was changed elsewhere. Reload to see the latest version.");
+      } else {
+        toast.error("Failed to save brief");
+      }
     } finally {
       setSaving(false);
     }